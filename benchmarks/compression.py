@@ -0,0 +1,55 @@
+"""
+Микробенчмарк сжатия страницы ленты твитов.
+
+Страница ленты `TweetListOut` рендерится в JSON и сжимается gzip и brotli
+на разных уровнях. Результат - время сжатия одной страницы и размер сжатой страницы,
+по которым выбираются `RESPONSE_GZIP_LEVEL` и `RESPONSE_BROTLI_QUALITY`.
+
+Запуск (БД не нужна)::
+
+    python -m benchmarks.compression --tweets 100 --likes 10 --rounds 50
+"""
+import argparse
+import time
+
+from tweetty import settings
+from tweetty.api.compression import BROTLI, GZIP, compress
+from tweetty.api.responses import render_model
+
+from .responses import make_page
+
+GZIP_LEVELS = (1, 6, 9)
+BROTLI_QUALITIES = (1, 4, 5, 6, 11)
+
+
+def measure(body: bytes, encoding: str, rounds: int) -> tuple[float, int]:
+    compressed = compress(body, encoding)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        compress(body, encoding)
+    return (time.perf_counter() - started) / rounds, len(compressed)
+
+
+def main(args: argparse.Namespace) -> None:
+    body = render_model(make_page(args.tweets, args.likes))
+    print(f"tweets={args.tweets}, likes per tweet={args.likes}, rounds={args.rounds}, json={len(body)} bytes")
+
+    for level in GZIP_LEVELS:
+        settings.RESPONSE_GZIP_LEVEL = level
+        elapsed, size = measure(body, GZIP, args.rounds)
+        print(f"  gzip {level:>2}: {elapsed * 1000:8.2f} ms, {size:8d} bytes")
+
+    for quality in BROTLI_QUALITIES:
+        settings.RESPONSE_BROTLI_QUALITY = quality
+        # высокое качество brotli слишком медленное, чтобы повторять его много раз
+        elapsed, size = measure(body, BROTLI, args.rounds if quality < 10 else 1)
+        print(f"    br {quality:>2}: {elapsed * 1000:8.2f} ms, {size:8d} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=100, help="tweets on the page")
+    parser.add_argument("--likes", type=int, default=10, help="likers per tweet")
+    parser.add_argument("--rounds", type=int, default=50, help="timed rounds")
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""
+Бенчмарк счетчиков лайков под конкурентной нагрузкой.
+
+Много сессий одновременно ставят лайки одному и тому же твиту.
+Сравнивается счетчик в строке твита (`LIKE_COUNTER_SHARDS=0`)
+и шардированный счетчик с разным количеством шардов.
+
+Запуск (нужна доступная БД из `POSTGRES_URL`, для бенчмарка создается отдельная БД)::
+
+    python -m benchmarks.like_counters --workers 64 --likes 50 --shards 0 8 32
+"""
+import argparse
+import asyncio
+import time
+
+import sqlalchemy_utils as sautils
+from sqlalchemy import NullPool, delete
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from tweetty.db import counters, models, pg
+from tweetty.settings import POSTGRES_URL
+
+BenchSession = sessionmaker(expire_on_commit=False, class_=AsyncSession)
+
+
+async def prepare_tweet(engine: AsyncEngine) -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+
+    async with BenchSession(bind=engine) as db_session:
+        await db_session.execute(delete(models.User))
+        user = models.User(nickname="bench", api_key="b" * 30)
+        db_session.add(user)
+        await db_session.commit()
+
+        tweet = models.Tweet(content="viral tweet", user_id=user.id)
+        db_session.add(tweet)
+        await db_session.commit()
+        return tweet.id
+
+
+async def like_worker(engine: AsyncEngine, tweet_id: int, likes: int) -> None:
+    async with BenchSession(bind=engine) as db_session:
+        for _ in range(likes):
+            # как в `like_tweet`: изменение счетчика и коммит в одной транзакции
+            await counters.change_like_count(db_session, tweet_id, 1)
+            await db_session.commit()
+
+
+async def run(engine: AsyncEngine, shards: int, workers: int, likes: int) -> float:
+    counters.LIKE_COUNTER_SHARDS = shards
+    tweet_id = await prepare_tweet(engine)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[like_worker(engine, tweet_id, likes) for _ in range(workers)])
+    elapsed = time.perf_counter() - started
+
+    # проверяем, что ни один лайк не потерялся
+    async with BenchSession(bind=engine) as db_session:
+        await counters.compact_like_counters(db_session)
+        tweet = await db_session.get(models.Tweet, tweet_id)
+        assert tweet is not None and tweet.like_count == workers * likes, "lost likes"
+
+    return workers * likes / elapsed
+
+
+async def main(args: argparse.Namespace) -> None:
+    bench_pg_uri = pg.change_database_name(POSTGRES_URL, "benchmark")
+    if not sautils.database_exists(bench_pg_uri):
+        sautils.create_database(bench_pg_uri)
+
+    engine = create_async_engine(pg.make_async_postgres_url(bench_pg_uri), poolclass=NullPool)
+    try:
+        print(f"workers={args.workers}, likes per worker={args.likes}")
+        for shards in args.shards:
+            rate = await run(engine, shards, args.workers, args.likes)
+            mode = "tweet row" if shards == 0 else f"{shards} shards"
+            print(f"{mode:>12}: {rate:10.1f} likes/s")
+    finally:
+        await engine.dispose()
+        sautils.drop_database(bench_pg_uri)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=64, help="concurrent sessions")
+    parser.add_argument("--likes", type=int, default=50, help="likes per session")
+    parser.add_argument("--shards", type=int, nargs="+", default=[0, 8, 32], help="shard counts to compare")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,94 @@
+"""
+Микробенчмарк ранжирования кандидатов персональной ленты.
+
+Кандидаты (лайки, дата-время публикации, близость к автору) ранжируются так же,
+как в персональной ленте: колонки-массивы из БД передаются в NumPy, рейтинги считаются
+векторным проходом `personalized_scores`, а порядок - устойчивым `argsort`.
+Для сравнения те же рейтинги считаются арифметикой по строкам на Python.
+Результат - время ранжирования страницы из всех кандидатов, отдельно - время только рейтингов.
+
+Запуск (БД не нужна)::
+
+    python -m benchmarks.personalized --candidates 2000 --limit 20 --rounds 200
+"""
+import argparse
+import math
+import random
+import time
+from collections.abc import Callable
+
+import numpy as np
+
+from tweetty import settings
+from tweetty.api.personalized import personalized_scores
+
+# колонки кандидатов, как их возвращает `personalized_columns_stmt`: id, лайки, дата-время публикации, близость
+Columns = tuple[list[int], list[int], list[float], list[int]]
+
+
+def make_columns(count: int) -> Columns:
+    now = time.time()
+    # кандидаты приходят из БД в порядке публикации, от новых к старым
+    posted_at = sorted((now - random.uniform(0, 7 * 86400) for _ in range(count)), reverse=True)
+    return (
+        list(range(count)),
+        [random.randrange(100) for _ in range(count)],
+        posted_at,
+        [random.randrange(10) for _ in range(count)],
+    )
+
+
+def rank_numpy(columns: Columns, limit: int) -> list[int]:
+    tweet_ids = np.array(columns[0], dtype=np.int64)
+    scores = personalized_scores(
+        np.array(columns[1], dtype=np.int64),
+        np.array(columns[2], dtype=np.float64),
+        np.array(columns[3], dtype=np.int64),
+    )
+    return tweet_ids[np.argsort(-scores, kind="stable")[:limit]].tolist()
+
+
+def rank_python(columns: Columns, limit: int) -> list[int]:
+    half_life = settings.FEED_SCORE_HALF_LIFE * 3600
+    scored = [
+        (
+            math.log2(1 + max(like_count, 0))
+            + settings.FEED_AFFINITY_WEIGHT * math.log2(1 + max(affinity, 0))
+            + posted_at / half_life,
+            tweet_id,
+        )
+        for tweet_id, like_count, posted_at, affinity in zip(*columns)
+    ]
+    scored.sort(key=lambda item: -item[0])
+    return [tweet_id for _, tweet_id in scored[:limit]]
+
+
+def measure(rank: Callable[[], object], rounds: int) -> float:
+    rank()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        rank()
+    return (time.perf_counter() - started) / rounds
+
+
+def main(args: argparse.Namespace) -> None:
+    columns = make_columns(args.candidates)
+    assert rank_numpy(columns, args.limit) == rank_python(columns, args.limit)
+    print(f"candidates={args.candidates}, limit={args.limit}, rounds={args.rounds}")
+
+    for name, rank in [("numpy", rank_numpy), ("python", rank_python)]:
+        elapsed = measure(lambda: rank(columns, args.limit), args.rounds)
+        print(f"  {name:>6}: {elapsed * 1000:8.3f} ms")
+
+    like_counts, posted_at, affinities = (np.array(column) for column in columns[1:])
+    elapsed = measure(lambda: personalized_scores(like_counts, posted_at, affinities), args.rounds)
+    print(f"  scores: {elapsed * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=2000, help="candidate tweets")
+    parser.add_argument("--limit", type=int, default=20, help="tweets on the page")
+    parser.add_argument("--rounds", type=int, default=200, help="timed rounds")
+    main(parser.parse_args())
@@ -0,0 +1,191 @@
+"""
+Бенчмарк путей чтения ленты твитов и профиля пользователя.
+
+Один воркер последовательно выполняет обработчики `get_tweets` и `get_me`
+и сериализует ответ в JSON. Сравниваются чтение через ORM,
+через репозиторий на asyncpg (`RAW_READ_REPOSITORY`) и, для ленты,
+сборка JSON в БД (`FEED_SQL_JSON`) и сборка из кэша JSON твитов
+(`TWEET_FRAGMENT_CACHE_MAX_ENTRIES`). Результат - строк (твитов или
+пользователей в подписчиках и подписках) в секунду на воркер.
+Лента ранжируется по `--ranking` (`FEED_RANKING`) и читается в порядке `--order`
+(для персональной ленты сборка JSON в БД не сравнивается).
+
+Запуск (нужна доступная БД из `POSTGRES_URL`, для бенчмарка создается отдельная БД)::
+
+    python -m benchmarks.read_paths --authors 50 --tweets 20 --requests 200 --ranking likes --order ranked
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy_utils as sautils
+from fastapi import BackgroundTasks, Response
+from sqlalchemy import NullPool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from tweetty import settings
+from tweetty.api.caches import tweet_fragment_cache
+from tweetty.api.feeds import chronological_page_stmt, feed_page_stmt
+from tweetty.api.json_feed import stream_feed_json
+from tweetty.api.models import FeedOrder, FeedShape, LikesMode
+from tweetty.api.responses import render_model
+from tweetty.api.routers.tweets import get_tweets
+from tweetty.api.routers.users import UserGetter
+from tweetty.api.serializers import UserResultDTO, serialize_user_with_followers
+from tweetty.db import models, pg
+from tweetty.db.ranking import rescore_stmt
+
+BenchSession = sessionmaker(expire_on_commit=False, class_=AsyncSession)
+
+
+async def prepare_data(engine: AsyncEngine, authors: int, tweets: int) -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.drop_all)
+        await conn.run_sync(models.Base.metadata.create_all)
+
+    async with BenchSession(bind=engine) as db_session:
+        reader = models.User(nickname="reader", api_key="r" * 30)
+        users = [models.User(nickname=f"author{i}", api_key=f"{i:030d}") for i in range(authors)]
+        db_session.add_all([reader, *users])
+        await db_session.commit()
+
+        db_session.add_all([models.Follower(user_id=user.id, follower_id=reader.id) for user in users])
+        db_session.add_all([models.Follower(user_id=reader.id, follower_id=user.id) for user in users])
+        now = datetime.now()
+        new_tweets = [
+            models.Tweet(
+                content=f"tweet {i} of {user.nickname}",
+                user_id=user.id,
+                posted_at=now - timedelta(hours=random.uniform(0, 7 * 24)),
+            )
+            for user in users
+            for i in range(tweets)
+        ]
+        db_session.add_all(new_tweets)
+        await db_session.commit()
+
+        for tweet in new_tweets:
+            likers = random.sample(users, random.randint(0, min(5, len(users))))
+            db_session.add_all([models.Like(tweet_id=tweet.id, user_id=liker.id) for liker in likers])
+            db_session.add(models.TweetMedia(rel_uri=f"{settings.STATIC_DIR}/{tweet.id}.png", tweet_id=tweet.id))
+            tweet.like_count = len(likers)
+        await db_session.commit()
+
+        await db_session.execute(rescore_stmt())
+        await db_session.commit()
+
+        return reader.id
+
+
+async def bench_feed(
+    engine: AsyncEngine, reader_id: int, requests: int, limit: int, mode: str, order: FeedOrder
+) -> float:
+    settings.RAW_READ_REPOSITORY = mode == "repository"
+    tweet_fragment_cache.max_entries = 100000 if mode == "fragments" else 0
+    tweet_fragment_cache.clear()
+
+    rows = 0
+    async with BenchSession(bind=engine) as db_session:
+        reader = await db_session.get(models.User, reader_id)
+        assert reader is not None
+
+        started = time.perf_counter()
+        for _ in range(requests):
+            if mode == "sql-json":
+                page_keys = None
+                if order == FeedOrder.chronological:
+                    stmt = chronological_page_stmt(reader, None, None, limit)
+                else:
+                    stmt, page_keys = await feed_page_stmt(db_session, reader, None, None, limit)
+                body = b"".join([chunk async for chunk in stream_feed_json(db_session, stmt, limit, order, page_keys)])
+                rows += body.count(b'"author"')
+            else:
+                response = await get_tweets(
+                    db_session,
+                    reader,
+                    cursor=None,
+                    since_cursor=None,
+                    if_none_match=None,
+                    fields=None,
+                    encoding=None,
+                    response=Response(),
+                    background_tasks=BackgroundTasks(),
+                    offset=None,
+                    limit=limit,
+                    since_id=None,
+                    likes=LikesMode.full,
+                    shape=FeedShape.nested,
+                    order=order,
+                )
+                if isinstance(response, Response):
+                    rows += response.body.count(b'"author"')
+                else:
+                    render_model(response)
+                    rows += len(response.tweets)
+            # как в обработчике: каждый запрос в своей транзакции
+            await db_session.commit()
+            db_session.expunge_all()
+        elapsed = time.perf_counter() - started
+
+    return rows / elapsed
+
+
+async def bench_user(engine: AsyncEngine, reader_id: int, requests: int, mode: str) -> float:
+    settings.RAW_READ_REPOSITORY = mode == "repository"
+    user_getter = UserGetter(full_user=True, raise_404=True)
+
+    rows = 0
+    async with BenchSession(bind=engine) as db_session:
+        started = time.perf_counter()
+        for _ in range(requests):
+            response = UserResultDTO(True, serialize_user_with_followers(await user_getter(db_session, reader_id)))
+            render_model(response)
+            rows += len(response.user.followers) + len(response.user.following)
+            await db_session.commit()
+            db_session.expunge_all()
+        elapsed = time.perf_counter() - started
+
+    return rows / elapsed
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings.FEED_RANKING = args.ranking
+    bench_pg_uri = pg.change_database_name(settings.POSTGRES_URL, "benchmark")
+    if not sautils.database_exists(bench_pg_uri):
+        sautils.create_database(bench_pg_uri)
+
+    engine = create_async_engine(pg.make_async_postgres_url(bench_pg_uri), poolclass=NullPool)
+    try:
+        reader_id = await prepare_data(engine, args.authors, args.tweets)
+        print(
+            f"authors={args.authors}, tweets per author={args.tweets}, requests={args.requests}, "
+            f"ranking={args.ranking}, order={args.order}"
+        )
+
+        order = FeedOrder(args.order)
+        for mode in ["orm", "repository", "sql-json", "fragments"]:
+            if mode == "sql-json" and order == FeedOrder.personalized:
+                continue
+            rate = await bench_feed(engine, reader_id, args.requests, args.limit, mode, order)
+            print(f"get_tweets {mode:>10}: {rate:10.1f} rows/s")
+
+        for mode in ["orm", "repository"]:
+            rate = await bench_user(engine, reader_id, args.requests, mode)
+            print(f"get_me     {mode:>10}: {rate:10.1f} rows/s")
+    finally:
+        await engine.dispose()
+        sautils.drop_database(bench_pg_uri)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--authors", type=int, default=50, help="authors followed by the reader")
+    parser.add_argument("--tweets", type=int, default=20, help="tweets per author")
+    parser.add_argument("--requests", type=int, default=200, help="requests per path")
+    parser.add_argument("--limit", type=int, default=settings.TWEETS_PAGE_MAX_LIMIT, help="tweets per page")
+    parser.add_argument("--ranking", choices=["likes", "score"], default=settings.FEED_RANKING, help="feed ranking")
+    parser.add_argument("--order", choices=[order.value for order in FeedOrder], default="ranked", help="feed order")
+    asyncio.run(main(parser.parse_args()))
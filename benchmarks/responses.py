@@ -0,0 +1,118 @@
+"""
+Бенчмарк сериализации ответа ленты твитов.
+
+Обработчик отдает заранее собранную страницу ленты `TweetListOut`, поэтому
+измеряется только работа FastAPI после обработчика. Сравнивается стандартный
+маршрут (повторная валидация по `response_model`, `jsonable_encoder` и `JSONResponse`),
+`ValidatedModelRoute`, который сериализует готовую модель orjson, и `NegotiatedRoute`
+с ответом в MessagePack (`Accept: application/msgpack`). Результат - процессорное
+время сервера на запрос, размер ответа и время разбора ответа клиентом.
+
+Запуск (БД не нужна)::
+
+    python -m benchmarks.responses --tweets 100 --likes 10 --requests 200
+"""
+import argparse
+import asyncio
+import time
+from collections.abc import Callable
+from typing import Any, Optional, Union
+
+import msgpack
+import orjson
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from httpx import AsyncClient
+
+from tweetty.api.models import (
+    BaseUser,
+    CompactTweetListOut,
+    NormalizedCompactTweetListOut,
+    NormalizedTweetListOut,
+    TweetDeltaOut,
+    TweetListOut,
+    TweetOut,
+)
+from tweetty.api.negotiation import MSGPACK_MEDIA_TYPE, NegotiatedRoute
+from tweetty.api.responses import FastJSONResponse, ValidatedModelRoute
+
+
+def make_page(tweets: int, likes: int) -> TweetListOut:
+    users = [BaseUser(id=i, name=f"user{i}") for i in range(max(likes, 1) * 5)]
+    return TweetListOut(
+        result=True,
+        tweets=[
+            TweetOut(
+                id=i,
+                content=f"tweet {i} " * 20,
+                author=users[i % len(users)],
+                attachments=[f"/static/{i}.png"],
+                likes=users[:likes],
+            )
+            for i in range(tweets)
+        ],
+        next_cursor="cursor",
+    )
+
+
+def make_api(page: TweetListOut, route_class: type[APIRoute], response_class: type[JSONResponse]) -> FastAPI:
+    router = APIRouter(route_class=route_class)
+
+    # модель ответа как у `get_tweets`
+    @router.get(
+        "/tweets",
+        response_model=Union[
+            TweetDeltaOut, NormalizedCompactTweetListOut, NormalizedTweetListOut, CompactTweetListOut, TweetListOut
+        ],
+    )
+    async def get_tweets() -> TweetListOut:
+        return page
+
+    api = FastAPI(default_response_class=response_class)
+    api.include_router(router)
+    return api
+
+
+async def bench(
+    api: FastAPI, requests: int, accept: Optional[str], parse: Callable[[bytes], Any]
+) -> tuple[float, int, float]:
+    headers = {"Accept": accept} if accept is not None else dict()
+    async with AsyncClient(app=api, base_url="http://testserver", headers=headers) as client:
+        body = (await client.get("/tweets")).content
+
+        started = time.process_time()
+        for _ in range(requests):
+            await client.get("/tweets")
+        elapsed = time.process_time() - started
+
+    started = time.process_time()
+    for _ in range(requests):
+        parse(body)
+    parse_elapsed = time.process_time() - started
+
+    return elapsed / requests, len(body), parse_elapsed / requests
+
+
+async def main(args: argparse.Namespace) -> None:
+    page = make_page(args.tweets, args.likes)
+    print(f"tweets={args.tweets}, likes per tweet={args.likes}, requests={args.requests}")
+
+    for name, route_class, response_class, accept, parse in [
+        ("fastapi", APIRoute, JSONResponse, None, orjson.loads),
+        ("validated", ValidatedModelRoute, FastJSONResponse, None, orjson.loads),
+        ("msgpack", NegotiatedRoute, FastJSONResponse, MSGPACK_MEDIA_TYPE, msgpack.unpackb),
+    ]:
+        cpu, size, parse_cpu = await bench(make_api(page, route_class, response_class), args.requests, accept, parse)
+        print(
+            f"get_tweets {name:>10}: {cpu * 1000:8.2f} ms CPU/request, {size} bytes, "
+            f"{parse_cpu * 1000:6.2f} ms to parse"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=100, help="tweets per page")
+    parser.add_argument("--likes", type=int, default=10, help="likers per tweet")
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Микробенчмарк сериализации твитов в DTO.
+
+Твиты из ORM (с загруженными автором, медиа и лайками) и записи репозитория
+(`TweetRecord`) сериализуются в DTO `serializers`. Для сравнения те же DTO
+валидируются в модель pydantic `TweetOut`, как это делал бы FastAPI, и сериализуются в JSON.
+Результат - время и выделения памяти (количество блоков и пик по `tracemalloc`)
+на тысячу твитов.
+
+Запуск (БД не нужна)::
+
+    python -m benchmarks.serializers --tweets 1000 --likes 10 --rounds 5
+"""
+import argparse
+import time
+import tracemalloc
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from typing import Any
+
+from tweetty.api.models import TweetOut
+from tweetty.api.responses import render_model
+from tweetty.api.serializers import serialize_tweet
+from tweetty.db import models
+from tweetty.db.repository import TweetRecord, UserRecord
+
+
+def make_orm_tweets(tweets: int, likes: int) -> list[models.Tweet]:
+    users = [models.User(id=i, nickname=f"user{i}", api_key=f"{i:030d}") for i in range(max(likes, 1) * 5)]
+    return [
+        models.Tweet(
+            id=i,
+            content=f"tweet {i}",
+            user=users[i % len(users)],
+            medias=[models.TweetMedia(rel_uri=f"static/{i}.png")],
+            likes=[models.Like(user=user) for user in users[:likes]],
+        )
+        for i in range(tweets)
+    ]
+
+
+def make_tweet_records(tweets: int, likes: int) -> list[TweetRecord]:
+    users = [UserRecord(i, f"user{i}") for i in range(max(likes, 1) * 5)]
+    posted_at = datetime.now()
+    return [
+        TweetRecord(i, f"tweet {i}", likes, posted_at, users[i % len(users)], [f"static/{i}.png"], users[:likes])
+        for i in range(tweets)
+    ]
+
+
+def measure(serialize: Callable[[Sequence[Any]], Any], sources: Sequence[Any], rounds: int) -> tuple[float, int, int]:
+    serialize(sources)
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        serialize(sources)
+    elapsed = (time.perf_counter() - started) / rounds
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = serialize(sources)  # noqa: F841 (результат удерживается, чтобы учесть его в снимке)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+
+    per_thousand = 1000 / len(sources)
+    return elapsed * per_thousand, int(blocks * per_thousand), int(peak * per_thousand)
+
+
+def main(args: argparse.Namespace) -> None:
+    sources: dict[str, Sequence[Any]] = {
+        "orm": make_orm_tweets(args.tweets, args.likes),
+        "record": make_tweet_records(args.tweets, args.likes),
+    }
+    modes: dict[str, Callable[[Sequence[Any]], Any]] = {
+        "dto": serialize_tweet.many,
+        "dto+json": lambda tweets: [render_model(tweet) for tweet in serialize_tweet.many(tweets)],
+        "pydantic": lambda tweets: [TweetOut.from_orm(tweet) for tweet in serialize_tweet.many(tweets)],
+        "pydantic+json": lambda tweets: [
+            render_model(TweetOut.from_orm(tweet)) for tweet in serialize_tweet.many(tweets)
+        ],
+    }
+    print(f"tweets={args.tweets}, likes per tweet={args.likes}, rounds={args.rounds}")
+
+    for source, tweets in sources.items():
+        for mode, serialize in modes.items():
+            elapsed, blocks, peak = measure(serialize, tweets, args.rounds)
+            print(
+                f"{source:>6} {mode:>13}: {elapsed * 1000:8.2f} ms, "
+                f"{blocks:8d} blocks, {peak / 1024:8.1f} KiB peak per 1000 tweets"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tweets", type=int, default=1000, help="tweets to serialize")
+    parser.add_argument("--likes", type=int, default=10, help="likers per tweet")
+    parser.add_argument("--rounds", type=int, default=5, help="timed rounds")
+    main(parser.parse_args())
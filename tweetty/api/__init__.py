@@ -6,9 +6,12 @@ from fastapi.staticfiles import StaticFiles
 import tweetty
 
 from ..settings import DEBUG, STATIC_DIR, STATIC_URL
+from .compression import CompressionMiddleware
 from .exception_handlers import common_exception_handler
 from .models import HTTPErrorModel
+from .responses import FastJSONResponse
 from .routers import api_router
+from .tasks import lifespan
 
 
 def create_api() -> FastAPI:
@@ -20,6 +23,7 @@ def create_api() -> FastAPI:
             allow_methods=["*"],
             allow_headers=["*"],
         ),
+        Middleware(cls=CompressionMiddleware),
     ]
 
     api = FastAPI(
@@ -34,7 +38,9 @@ def create_api() -> FastAPI:
         license_info={
             "name": tweetty.__license__,
         },
+        default_response_class=FastJSONResponse,
         middleware=middlewares,
+        lifespan=lifespan,
         exception_handlers={
             Exception: common_exception_handler,
         },
@@ -0,0 +1,399 @@
+import sys
+import time
+from collections import OrderedDict, deque
+from collections.abc import Callable, Hashable, Iterable
+from typing import NamedTuple, Optional
+
+from ..db import events
+from ..settings import (
+    FEED_CACHE_EVENTS_WINDOW,
+    FEED_CACHE_MAX_ENTRIES,
+    FEED_CACHE_TTL,
+    TWEET_FRAGMENT_CACHE_EVENTS_WINDOW,
+    TWEET_FRAGMENT_CACHE_MAX_ENTRIES,
+    TWEET_FRAGMENT_CACHE_TTL,
+)
+from .models import CacheStats
+
+
+class CountingCache:
+    def __init__(self, max_entries: int):
+        """
+        Базовый класс кэшей со статистикой.
+
+        :param max_entries: максимальное количество записей. При 0 кэш выключен.
+        """
+        self.max_entries = max_entries
+        self._memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> CacheStats:
+        """Возвращает статистику кэша."""
+        requests = self.hits + self.misses
+        return CacheStats(
+            entries=len(self),
+            memory_bytes=self._memory_bytes,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / requests if requests else 0.0,
+            evictions=self.evictions,
+            invalidations=self.invalidations,
+        )
+
+
+class FeedPage(NamedTuple):
+    body: bytes
+    # курсор следующей страницы, чтобы не разбирать JSON страницы
+    next_cursor: Optional[str]
+
+
+class FeedCacheEntry(NamedTuple):
+    expires_at: float
+    user_id: int
+    page: FeedPage
+    # сжатые варианты страницы по кодировкам сжатия
+    encoded: dict[str, bytes]
+
+
+class FeedCache(CountingCache):
+    def __init__(self, max_entries: int, ttl: float, events_window: int):
+        """
+        Кэш отрендеренных страниц ленты твитов.
+
+        Страница хранится по ключу (пользователь, параметры страницы) и удаляется,
+        когда меняются подписки пользователя или твиты и лайки авторов, на которых
+        он подписан. Лайк может переместить твит на другую страницу, поэтому
+        по лайку удаляются все страницы подписчиков автора, а не только страницы,
+        на которых есть твит.
+
+        Страница, рендеринг которой начался до события, влияющего на нее,
+        в кэш не сохраняется. Для этого кэш помнит последние `events_window` событий.
+
+        Вместе со страницей хранятся ее сжатые варианты, поэтому повторные запросы
+        страницы не сжимают ее заново.
+
+        :param max_entries: максимальное количество страниц. При 0 кэш выключен.
+        :param ttl: время жизни страницы в секундах.
+        :param events_window: количество последних событий, по которым проверяются сохраняемые страницы.
+        """
+        super().__init__(max_entries)
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, FeedCacheEntry] = OrderedDict()
+        self._user_keys: dict[int, set[Hashable]] = dict()
+        self._author_readers: dict[int, set[int]] = dict()
+        self._reader_authors: dict[int, frozenset[int]] = dict()
+        self._events: deque[tuple[int, events.Event]] = deque(maxlen=events_window)
+        self._events_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[FeedPage]:
+        """
+        Возвращает страницу или `None`, если страницы нет в кэше.
+
+        :param key: ключ страницы.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry.page
+
+    def begin(self) -> int:
+        """Возвращает метку начала рендеринга страницы для `set`."""
+        return self._events_seq
+
+    def set(self, token: int, key: Hashable, user_id: int, author_ids: Iterable[int], page: FeedPage) -> bool:
+        """
+        Сохраняет страницу, если с начала ее рендеринга не было влияющих на нее событий.
+        Возвращает `True`, если страница сохранена.
+
+        :param token: метка начала рендеринга страницы из `begin`.
+        :param key: ключ страницы.
+        :param user_id: id владельца ленты.
+        :param author_ids: id авторов, твиты которых могут попасть в ленту.
+        :param page: страница.
+        """
+        author_ids = frozenset(author_ids)
+        if self._missed_events(token, user_id, author_ids):
+            return False
+
+        self._remove(key)
+        self._entries[key] = FeedCacheEntry(time.monotonic() + self.ttl, user_id, page, dict())
+        self._memory_bytes += sys.getsizeof(page.body)
+        self._user_keys.setdefault(user_id, set()).add(key)
+
+        old_author_ids = self._reader_authors.get(user_id, frozenset())
+        if old_author_ids != author_ids:
+            for author_id in old_author_ids - author_ids:
+                self._drop_reader(author_id, user_id)
+            for author_id in author_ids - old_author_ids:
+                self._author_readers.setdefault(author_id, set()).add(user_id)
+            self._reader_authors[user_id] = author_ids
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def encode(self, key: Hashable, body: bytes, encoding: str, encoder: Callable[[bytes, str], bytes]) -> bytes:
+        """
+        Возвращает сжатую страницу. Страница сжимается один раз и сохраняется
+        вместе с несжатой, если это та же страница, что хранится в кэше.
+
+        :param key: ключ страницы.
+        :param body: страница.
+        :param encoding: кодировка сжатия.
+        :param encoder: функция сжатия страницы в кодировку.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry.page.body is not body:
+            return encoder(body, encoding)
+
+        encoded = entry.encoded.get(encoding)
+        if encoded is None:
+            encoded = entry.encoded[encoding] = encoder(body, encoding)
+            self._memory_bytes += sys.getsizeof(encoded)
+        return encoded
+
+    def _missed_events(self, token: int, user_id: int, author_ids: frozenset[int]) -> bool:
+        if self._events_seq - token > len(self._events):
+            # события с начала рендеринга уже не помещаются в окно
+            return True
+
+        for seq, ev in reversed(self._events):
+            if seq <= token:
+                break
+            if ev.kind == events.EVENTS_RESET:
+                return True
+            if ev.kind == events.FOLLOWINGS_CHANGED and ev.user_id == user_id:
+                return True
+            if ev.kind in (events.TWEETS_CHANGED, events.LIKES_CHANGED) and ev.user_id in author_ids:
+                return True
+        return False
+
+    def _drop_reader(self, author_id: int, user_id: int) -> None:
+        readers = self._author_readers.get(author_id)
+        if readers is not None:
+            readers.discard(user_id)
+            if not readers:
+                del self._author_readers[author_id]
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        self._memory_bytes -= sys.getsizeof(entry.page.body) + sum(map(sys.getsizeof, entry.encoded.values()))
+        user_keys = self._user_keys[entry.user_id]
+        user_keys.discard(key)
+        if not user_keys:
+            # у пользователя не осталось страниц, поэтому и его авторы больше не нужны
+            del self._user_keys[entry.user_id]
+            for author_id in self._reader_authors.pop(entry.user_id, frozenset()):
+                self._drop_reader(author_id, entry.user_id)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """
+        Удаляет все страницы ленты пользователя.
+
+        :param user_id: id владельца ленты.
+        """
+        keys = self._user_keys.get(user_id, set())
+        self.invalidations += len(keys)
+        for key in list(keys):
+            self._remove(key)
+
+    def invalidate_author(self, author_id: int) -> None:
+        """
+        Удаляет страницы лент всех пользователей, в ленты которых попадают твиты автора.
+
+        :param author_id: id автора.
+        """
+        for user_id in list(self._author_readers.get(author_id, set())):
+            self.invalidate_user(user_id)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._entries.clear()
+        self._user_keys.clear()
+        self._author_readers.clear()
+        self._reader_authors.clear()
+        self._memory_bytes = 0
+
+    def handle_event(self, ev: events.Event) -> None:
+        """
+        Удаляет страницы, на которые влияет событие.
+
+        :param ev: событие.
+        """
+        self._events_seq += 1
+        self._events.append((self._events_seq, ev))
+
+        if ev.kind == events.EVENTS_RESET:
+            self.clear()
+        elif ev.kind == events.FOLLOWINGS_CHANGED:
+            self.invalidate_user(ev.user_id)
+        elif ev.kind in (events.TWEETS_CHANGED, events.LIKES_CHANGED):
+            self.invalidate_author(ev.user_id)
+
+
+class TweetFragmentEntry(NamedTuple):
+    expires_at: float
+    body: bytes
+
+
+class TweetFragmentCache(CountingCache):
+    def __init__(self, max_entries: int, ttl: float, events_window: int):
+        """
+        Кэш JSON-представлений твитов, из которых собираются страницы ленты.
+
+        Версия твита - номер последнего события, изменившего твит (лайк, снятие лайка, удаление).
+        Представление, рендеринг которого начался до изменения твита, в кэш не сохраняется,
+        поэтому твит сериализуется один раз на изменение, а не на каждый показ в ленте.
+        Для этого кэш помнит версии последних `events_window` измененных твитов.
+
+        :param max_entries: максимальное количество твитов. При 0 кэш выключен.
+        :param ttl: время жизни представления в секундах.
+        :param events_window: количество последних измененных твитов, версии которых хранит кэш.
+        """
+        super().__init__(max_entries)
+        self.ttl = ttl
+        self.events_window = events_window
+        self._entries: OrderedDict[int, TweetFragmentEntry] = OrderedDict()
+        self._versions: OrderedDict[int, int] = OrderedDict()
+        self._events_seq = 0
+        self._reset_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def version(self, tweet_id: int) -> int:
+        """
+        Возвращает версию твита.
+
+        :param tweet_id: id твита.
+        """
+        return self._versions.get(tweet_id, self._reset_seq)
+
+    def get(self, tweet_id: int) -> Optional[bytes]:
+        """
+        Возвращает представление твита или `None`, если его нет в кэше.
+
+        :param tweet_id: id твита.
+        """
+        entry = self._entries.get(tweet_id)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(tweet_id)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(tweet_id)
+        return entry.body
+
+    def begin(self) -> int:
+        """Возвращает метку начала рендеринга представлений для `set`."""
+        return self._events_seq
+
+    def set(self, token: int, tweet_id: int, body: bytes) -> bool:
+        """
+        Сохраняет представление твита, если твит не менялся с начала рендеринга.
+        Возвращает `True`, если представление сохранено.
+
+        :param token: метка начала рендеринга из `begin`.
+        :param tweet_id: id твита.
+        :param body: представление твита.
+        """
+        if self._events_seq - token > self.events_window or self.version(tweet_id) > token:
+            # твит изменился, или версии твитов с начала рендеринга уже забыты
+            return False
+
+        self._remove(tweet_id)
+        self._entries[tweet_id] = TweetFragmentEntry(time.monotonic() + self.ttl, body)
+        self._memory_bytes += sys.getsizeof(body)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+        return True
+
+    def _remove(self, tweet_id: int) -> bool:
+        entry = self._entries.pop(tweet_id, None)
+        if entry is None:
+            return False
+
+        self._memory_bytes -= sys.getsizeof(entry.body)
+        return True
+
+    def bump(self, tweet_id: int) -> None:
+        """
+        Повышает версию твита и удаляет его представление.
+
+        :param tweet_id: id твита.
+        """
+        self._events_seq += 1
+        self._versions[tweet_id] = self._events_seq
+        self._versions.move_to_end(tweet_id)
+        while len(self._versions) > self.events_window:
+            self._versions.popitem(last=False)
+
+        if self._remove(tweet_id):
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        """Очищает кэш. Представления, рендеринг которых уже начался, тоже не будут сохранены."""
+        self._events_seq += 1
+        self._reset_seq = self._events_seq
+        self._entries.clear()
+        self._versions.clear()
+        self._memory_bytes = 0
+
+    def handle_event(self, ev: events.Event) -> None:
+        """
+        Удаляет представления твитов, измененных событием.
+
+        :param ev: событие.
+        """
+        if ev.kind in (events.TWEETS_CHANGED, events.LIKES_CHANGED) and ev.tweet_id is not None:
+            self.bump(ev.tweet_id)
+        elif ev.kind in (events.EVENTS_RESET, events.TWEETS_CHANGED):
+            # событие без твита (например, удаление пользователя вместе с его лайками)
+            # может затронуть любые твиты
+            self.clear()
+
+
+feed_cache = FeedCache(
+    max_entries=FEED_CACHE_MAX_ENTRIES,
+    ttl=FEED_CACHE_TTL,
+    events_window=FEED_CACHE_EVENTS_WINDOW,
+)
+events.subscribe(feed_cache.handle_event)
+
+tweet_fragment_cache = TweetFragmentCache(
+    max_entries=TWEET_FRAGMENT_CACHE_MAX_ENTRIES,
+    ttl=TWEET_FRAGMENT_CACHE_TTL,
+    events_window=TWEET_FRAGMENT_CACHE_EVENTS_WINDOW,
+)
+events.subscribe(tweet_fragment_cache.handle_event)
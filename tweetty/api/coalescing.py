@@ -0,0 +1,94 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+from ..db import events
+from ..settings import REQUEST_COALESCING_ROUTES
+from .models import CoalescingStats
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self, enabled: bool):
+        """
+        Объединение одновременных одинаковых запросов.
+
+        Пока выполняется вычисление по ключу, запросы с тем же ключом не запускают
+        свое вычисление, а ждут результат уже запущенного. Ошибка вычисления
+        тоже передается всем ожидающим.
+
+        После любого события изменения данных новые запросы не присоединяются
+        к уже запущенным вычислениям, чтобы не получить результат, посчитанный
+        до изменения.
+
+        :param enabled: объединять запросы или нет.
+        """
+        self.enabled = enabled
+        self._calls: dict[Hashable, asyncio.Future[T]] = dict()
+        self.requests = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Возвращает результат `func` или результат уже выполняющегося вычисления с тем же ключом.
+
+        :param key: ключ вычисления.
+        :param func: вычисление.
+        """
+        self.requests += 1
+        if not self.enabled:
+            return await func()
+
+        while (future := self._calls.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # запрос, выполнявший вычисление, отменен, поэтому вычисление запускается заново
+                self.coalesced -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as ex:
+            future.set_exception(ex)
+            # ошибку получат ожидающие запросы, если они есть
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def detach(self) -> None:
+        """Не присоединять новые запросы к уже запущенным вычислениям."""
+        self._calls.clear()
+
+    def handle_event(self, ev: events.Event) -> None:
+        """
+        Обработчик событий изменения данных.
+
+        :param ev: событие.
+        """
+        self.detach()
+
+    def stats(self) -> CoalescingStats:
+        """Возвращает статистику объединения запросов."""
+        return CoalescingStats(enabled=self.enabled, requests=self.requests, coalesced=self.coalesced)
+
+
+# объединение запросов для каждого обработчика, поддерживающего его
+request_flights: dict[str, SingleFlight] = {
+    route: SingleFlight(enabled=route in REQUEST_COALESCING_ROUTES) for route in ("get_tweets", "get_me")
+}
+for flight in request_flights.values():
+    events.subscribe(flight.handle_event)
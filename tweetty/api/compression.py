@@ -0,0 +1,213 @@
+import zlib
+from typing import Optional, Protocol
+
+import brotli
+from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .. import settings
+from .negotiation import prefers_msgpack
+
+GZIP = "gzip"
+BROTLI = "br"
+# кодировки в порядке предпочтения сервера при равном качестве (`q`)
+ENCODINGS = (BROTLI, GZIP)
+
+# типы содержимого, которые сжимаются
+COMPRESSIBLE_MEDIA_TYPES = frozenset(
+    [
+        "application/json",
+        "application/msgpack",
+        "application/x-msgpack",
+        "application/javascript",
+        "text/html",
+        "text/plain",
+        "text/css",
+    ]
+)
+
+
+def select_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Возвращает кодировку сжатия с наибольшим качеством (`q`) в `Accept-Encoding`
+    или `None`, если клиент не принимает сжатые ответы.
+
+    :param accept_encoding: значение заголовка `Accept-Encoding`.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities: dict[str, float] = dict()
+    for coding in accept_encoding.split(","):
+        name, *params = coding.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    wildcard = qualities.get("*", 0.0)
+    best_encoding, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+    return best_encoding
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """
+    Проверяет, сжимается ли содержимое этого типа.
+
+    :param content_type: значение заголовка `Content-Type`.
+    """
+    media_type = (content_type or "").partition(";")[0].strip().lower()
+    return media_type in COMPRESSIBLE_MEDIA_TYPES or media_type.endswith("+json")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Возвращает сжатое тело ответа.
+
+    :param body: тело ответа.
+    :param encoding: кодировка сжатия.
+    """
+    if encoding == BROTLI:
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    compressor = zlib.compressobj(settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+
+class StreamCompressor(Protocol):
+    def compress(self, chunk: bytes) -> bytes:
+        ...
+
+    def flush(self) -> bytes:
+        ...
+
+
+class _BrotliStreamCompressor:
+    def __init__(self) -> None:
+        self._compressor = brotli.Compressor(quality=settings.RESPONSE_BROTLI_QUALITY)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def stream_compressor(encoding: str) -> StreamCompressor:
+    """
+    Возвращает компрессор тела ответа, которое отправляется частями.
+
+    :param encoding: кодировка сжатия.
+    """
+    if encoding == BROTLI:
+        return _BrotliStreamCompressor()
+    return zlib.compressobj(settings.RESPONSE_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def compression_enabled() -> bool:
+    return settings.RESPONSE_COMPRESSION_MIN_SIZE > 0
+
+
+async def get_response_encoding(request: Request) -> Optional[str]:
+    """
+    Возвращает кодировку, в которой обработчик может сразу отдать сжатое тело ответа в JSON
+    (например, из кэша), или `None`, если ответ нужно отдать несжатым.
+
+    Ответ, который будет перекодирован в MessagePack, обработчик отдает несжатым.
+    """
+    if not compression_enabled() or prefers_msgpack(request.headers.get("accept")):
+        return None
+    return select_encoding(request.headers.get("accept-encoding"))
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        Сжатие ответов gzip или brotli в кодировке, которую клиент предпочитает в `Accept-Encoding`.
+
+        Сжимаются ответы сжимаемых типов (JSON, MessagePack, текст) не меньше
+        `RESPONSE_COMPRESSION_MIN_SIZE` байт и ответы, которые отправляются частями.
+        Ответы, уже сжатые обработчиком (с заголовком `Content-Encoding`), и потоки
+        событий (`text/event-stream`) отправляются как есть.
+
+        :param app: приложение ASGI.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not compression_enabled():
+            await self.app(scope, receive, send)
+            return
+
+        encoding = select_encoding(Headers(scope=scope).get("accept-encoding"))
+        await _CompressionResponder(self.app, encoding)(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: Optional[str]):
+        self.app = app
+        self.encoding = encoding
+        self.send: Send
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or not is_compressible(headers.get("content-type"))
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # ответ отправляется после первой части тела, когда известно, сжимать ли его
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+        if self.start_message is not None:
+            start_message, self.start_message = self.start_message, None
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if self.encoding is None or (not more_body and len(body) < settings.RESPONSE_COMPRESSION_MIN_SIZE):
+                self.passthrough = True
+                await self.send(start_message)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                self.compressor = stream_compressor(self.encoding)
+                del headers["Content-Length"]
+            else:
+                body = compress(body, self.encoding)
+                headers["Content-Length"] = str(len(body))
+            await self.send(start_message)
+
+            if not more_body:
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+        assert self.compressor is not None
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,150 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from ..db.ranking import score_ranking_enabled
+from .exceptions import InvalidCursorError
+
+# ключ сортировки твита в ленте: (рейтинг или количество лайков, дата-время публикации, id)
+FeedKey = tuple[float, datetime, int]
+
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def _decode(cursor: str) -> list:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+
+class TweetCursor(BaseModel):
+    """
+    Курсор ленты твитов.
+
+    Указывает на последний твит страницы по ключу сортировки ленты
+    (количество лайков или рейтинг, дата-время публикации, id), чтобы следующая
+    страница выбиралась по индексу, а не через `OFFSET`.
+    """
+
+    likes: int
+    posted_at: datetime
+    id: int
+    score: Optional[float] = None
+
+    def encode(self) -> str:
+        """Возвращает непрозрачное строковое представление курсора."""
+        values: list = [self.likes, self.posted_at.isoformat(), self.id]
+        if self.score is not None:
+            values.append(self.score)
+        return _encode(values)
+
+    @classmethod
+    def decode(cls, cursor: str) -> "TweetCursor":
+        """
+        Восстанавливает курсор из строкового представления.
+        Курсор без рейтинга не принимается, если лента ранжируется по рейтингу.
+
+        :param cursor: строковое представление курсора.
+        """
+        try:
+            likes, posted_at, tweet_id, *score = _decode(cursor)
+            if len(score) > 1 or (score_ranking_enabled() and not score):
+                raise ValueError("cursor doesn't match feed ranking")
+            return cls(likes=likes, posted_at=posted_at, id=tweet_id, score=score[0] if score else None)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, ValidationError):
+            raise InvalidCursorError(f"invalid cursor {cursor!r}")
+
+    @classmethod
+    def of(cls, tweet: Any) -> "TweetCursor":
+        """
+        Возвращает курсор, указывающий на твит.
+
+        :param tweet: твит или строка с его количеством лайков, рейтингом, датой-временем публикации и id.
+        """
+        return cls(
+            likes=tweet.like_count,
+            posted_at=tweet.posted_at,
+            id=tweet.id,
+            score=tweet.score if score_ranking_enabled() else None,
+        )
+
+    @classmethod
+    def of_key(cls, key: FeedKey) -> "TweetCursor":
+        """
+        Возвращает курсор, указывающий на твит с ключом сортировки ленты `key`.
+        Если лента ранжируется по рейтингу, количество лайков в ключ не входит и в курсоре равно 0.
+
+        :param key: ключ сортировки ленты твита.
+        """
+        rank, posted_at, tweet_id = key
+        if score_ranking_enabled():
+            return cls(likes=0, posted_at=posted_at, id=tweet_id, score=rank)
+        return cls(likes=int(rank), posted_at=posted_at, id=tweet_id)
+
+    def key(self) -> FeedKey:
+        """Возвращает ключ сортировки ленты твита, на который указывает курсор."""
+        rank = self.score if score_ranking_enabled() and self.score is not None else self.likes
+        return rank, self.posted_at, self.id
+
+
+class DeltaCursor(BaseModel):
+    """
+    Курсор опроса ленты на новые твиты.
+
+    Указывает на последний твит, который уже есть у клиента,
+    и на момент опроса, после которого нужно вернуть изменения количества лайков.
+    """
+
+    id: int
+    at: datetime
+
+    def encode(self) -> str:
+        """Возвращает непрозрачное строковое представление курсора."""
+        return _encode([self.id, self.at.isoformat()])
+
+    @classmethod
+    def decode(cls, cursor: str) -> "DeltaCursor":
+        """
+        Восстанавливает курсор из строкового представления.
+
+        :param cursor: строковое представление курсора.
+        """
+        try:
+            tweet_id, at = _decode(cursor)
+            return cls(id=tweet_id, at=at)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, ValidationError):
+            raise InvalidCursorError(f"invalid cursor {cursor!r}")
+
+
+class LikeCursor(BaseModel):
+    """
+    Курсор списка пользователей, лайкнувших твит.
+
+    Указывает на последний лайк страницы, чтобы следующая страница
+    выбиралась по индексу `ix_like_tweet_id_id`, а не через `OFFSET`.
+    """
+
+    id: int
+
+    def encode(self) -> str:
+        """Возвращает непрозрачное строковое представление курсора."""
+        return _encode([self.id])
+
+    @classmethod
+    def decode(cls, cursor: str) -> "LikeCursor":
+        """
+        Восстанавливает курсор из строкового представления.
+
+        :param cursor: строковое представление курсора.
+        """
+        try:
+            (like_id,) = _decode(cursor)
+            return cls(id=like_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, ValidationError):
+            raise InvalidCursorError(f"invalid cursor {cursor!r}")
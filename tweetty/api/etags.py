@@ -0,0 +1,135 @@
+from collections.abc import Iterable
+from typing import Optional, TypeVar, Union
+
+from fastapi import Header, Response
+from pydantic import BaseModel
+
+from ..db import events
+from ..settings import CONDITIONAL_RESPONSES
+
+R = TypeVar("R", bound=Union[Response, BaseModel])
+
+
+class ContentVersions:
+    def __init__(self, enabled: bool):
+        """
+        Версии данных, из которых собираются ленты и профили, для `ETag`.
+
+        Версия - номер последнего события, изменившего данные: твиты и лайки автора,
+        подписки и подписчики пользователя. Номера событий только растут, поэтому
+        версия ленты - максимум версий ее владельца и авторов, а не хэш отрендеренного ответа.
+        В `ETag` входит id процесса, так как номера событий у каждого процесса свои.
+
+        :param enabled: отвечать ли `304 Not Modified` на запросы с актуальным `If-None-Match`.
+        """
+        self.enabled = enabled
+        self._seq = 0
+        self._reset_seq = 0
+        self._authors: dict[int, int] = dict()
+        self._followings: dict[int, int] = dict()
+        self._followers: dict[int, int] = dict()
+
+    def _bump(self, versions: dict[int, int], user_id: int) -> None:
+        self._seq += 1
+        versions[user_id] = self._seq
+
+    def reset(self) -> None:
+        """Меняет версии всех данных."""
+        self._seq += 1
+        self._reset_seq = self._seq
+        self._authors.clear()
+        self._followings.clear()
+        self._followers.clear()
+
+    def handle_event(self, ev: events.Event) -> None:
+        """
+        Повышает версии данных, измененных событием.
+
+        :param ev: событие.
+        """
+        if ev.kind == events.LIKES_CHANGED or (ev.kind == events.TWEETS_CHANGED and ev.tweet_id is not None):
+            self._bump(self._authors, ev.user_id)
+        elif ev.kind == events.FOLLOWINGS_CHANGED:
+            self._bump(self._followings, ev.user_id)
+        elif ev.kind == events.FOLLOWERS_CHANGED:
+            self._bump(self._followers, ev.user_id)
+        elif ev.kind in (events.EVENTS_RESET, events.TWEETS_CHANGED):
+            # событие без твита (например, удаление пользователя вместе с его лайками и подписками)
+            # может затронуть любые данные
+            self.reset()
+
+    def feed_version(self, user_id: int, author_ids: Iterable[int]) -> int:
+        """
+        Возвращает версию ленты пользователя.
+
+        :param user_id: id владельца ленты.
+        :param author_ids: id авторов, твиты которых попадают в ленту.
+        """
+        return max(
+            self._reset_seq,
+            self._followings.get(user_id, 0),
+            max((self._authors.get(author_id, 0) for author_id in author_ids), default=0),
+        )
+
+    def profile_version(self, user_id: int) -> int:
+        """
+        Возвращает версию профиля пользователя.
+
+        :param user_id: id пользователя.
+        """
+        return max(self._reset_seq, self._followings.get(user_id, 0), self._followers.get(user_id, 0))
+
+    @staticmethod
+    def etag(version: int) -> str:
+        """
+        Возвращает слабый `ETag` версии данных.
+
+        :param version: версия данных.
+        """
+        return f'W/"{events.PROCESS_ID}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверяет, совпадает ли `ETag` с одним из значений заголовка `If-None-Match` (слабое сравнение).
+
+    :param if_none_match: значение заголовка `If-None-Match`.
+    :param etag: `ETag` актуального ответа.
+    """
+    if if_none_match is None:
+        return False
+
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+async def get_if_none_match(
+    if_none_match: Optional[str] = Header(default=None, description="`ETag` ранее полученного ответа"),
+) -> Optional[str]:
+    """Возвращает значение заголовка `If-None-Match`."""
+    return if_none_match
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Возвращает ответ `304 Not Modified`.
+
+    :param etag: `ETag` актуального ответа.
+    """
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def with_etag(result: R, response: Response, etag: str) -> R:
+    """
+    Добавляет `ETag` к ответу обработчика.
+
+    :param result: ответ обработчика или модель ответа.
+    :param response: ответ, заголовки которого FastAPI добавляет к модели ответа.
+    :param etag: `ETag` ответа.
+    """
+    (result if isinstance(result, Response) else response).headers["ETag"] = etag
+    return result
+
+
+content_versions = ContentVersions(enabled=CONDITIONAL_RESPONSES)
+events.subscribe(content_versions.handle_event)
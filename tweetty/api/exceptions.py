@@ -54,3 +54,21 @@ class UnauthorizedError(Exception):
     """Ошибка авторизации."""
 
     pass
+
+
+class InvalidCursorError(Exception):
+    """Ошибка, возникающая при передаче некорректного курсора пагинации."""
+
+    pass
+
+
+class InvalidFieldsError(Exception):
+    """Ошибка, возникающая при запросе неизвестных полей ответа."""
+
+    pass
+
+
+class InvalidBodyError(Exception):
+    """Ошибка, возникающая, когда тело запроса не удается разобрать."""
+
+    pass
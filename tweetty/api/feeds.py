@@ -0,0 +1,203 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import CompoundSelect, Select, case, literal, or_, select, true, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import settings
+from ..db import models
+from ..db.ranking import rank_column
+from ..db.timelines import home_timeline_tweets_stmt
+from .cursors import FeedKey, TweetCursor
+from .models import FeedOrder
+from .recent_tweets import recent_tweets_cache
+
+
+def feed_authors_stmt(auth_user: models.User) -> CompoundSelect:
+    """
+    Возвращает подзапрос id авторов, твиты которых попадают в ленту пользователя:
+    самого пользователя и тех, на кого он подписан.
+
+    :param auth_user: владелец ленты.
+    """
+    # подписки выбираются подзапросом, а не отдельным запросом со списком id
+    return union_all(
+        select(literal(auth_user.id)),
+        select(models.Follower.user_id).where(models.Follower.follower_id == auth_user.id),
+    )
+
+
+def feed_tweets_stmt(auth_user: models.User) -> Select:
+    """
+    Возвращает запрос твитов ленты пользователя без сортировки и пагинации.
+    Источник твитов зависит от движка ленты `FEED_ENGINE`.
+
+    :param auth_user: пользователь, ленту которого нужно получить.
+    """
+    if settings.FEED_ENGINE == "timeline":
+        return home_timeline_tweets_stmt(auth_user.id)
+
+    return select(models.Tweet).where(models.Tweet.user_id.in_(feed_authors_stmt(auth_user)))
+
+
+def feed_order_by(order: FeedOrder = FeedOrder.ranked, tweet: Any = models.Tweet) -> list:
+    """
+    Возвращает ключи сортировки ленты в порядке `order`: по рейтингу или количеству лайков
+    (`FEED_RANKING`) либо по дате-времени публикации, а затем по id.
+    Персональный порядок ключами твита не выражается, поэтому не поддерживается.
+
+    :param order: порядок ленты.
+    :param tweet: модель твита или ее псевдоним.
+    """
+    if order == FeedOrder.chronological:
+        return [tweet.posted_at.desc(), tweet.id.desc()]
+    return [rank_column(tweet).desc(), tweet.posted_at.desc(), tweet.id.desc()]
+
+
+def page_keys_order_by(page_keys: Sequence[FeedKey], tweet: Any = models.Tweet) -> list:
+    """
+    Возвращает ключи сортировки страницы, собранной в памяти, в порядке ее ключей `page_keys`.
+    Значения рейтинга и лайков в БД могут отличаться от ключей страницы, поэтому по ним не сортируется.
+
+    :param page_keys: ключи сортировки твитов страницы в порядке ленты.
+    :param tweet: модель твита или ее псевдоним.
+    """
+    if not page_keys:
+        return list()
+    return [case({tweet_id: position for position, (_, _, tweet_id) in enumerate(page_keys)}, value=tweet.id)]
+
+
+async def feed_page_stmt(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+) -> tuple[Select, Optional[list[FeedKey]]]:
+    """
+    Возвращает запрос страницы ленты пользователя в порядке ленты:
+    по рейтингу или количеству лайков (`FEED_RANKING`), дате-времени публикации и id.
+
+    Движок `recent` собирает страницу из кэша последних твитов авторов,
+    поэтому запрос выбирает твиты только по их id, а вместе с запросом возвращаются
+    ключи сортировки твитов страницы из кэша. Для остальных движков ключей нет (`None`).
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: пользователь, ленту которого нужно получить.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    """
+    if settings.FEED_ENGINE == "recent":
+        page_keys = await recent_tweets_cache.feed_page(db_session, auth_user.id, cursor, offset, limit)
+        stmt = select(models.Tweet).where(models.Tweet.id.in_([tweet_id for _, _, tweet_id in page_keys]))
+        return stmt.order_by(*page_keys_order_by(page_keys)), page_keys
+
+    stmt = feed_tweets_stmt(auth_user)
+    if cursor is not None:
+        # все ключи сортировки убывают, поэтому следующая страница
+        # начинается строго "меньше" последнего твита предыдущей
+        stmt = stmt.where(tuple_(rank_column(), models.Tweet.posted_at, models.Tweet.id) < tuple_(*cursor.key()))
+    elif offset is not None:
+        stmt = stmt.offset((offset - 1) * limit)
+    return stmt.limit(limit).order_by(*feed_order_by()), None
+
+
+def chronological_page_stmt(
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+) -> Select:
+    """
+    Возвращает запрос страницы ленты пользователя в порядке публикации, от новых твитов к старым.
+    Лайки и рейтинги твитов в запросе не участвуют.
+
+    У каждого автора ленты берется не больше твитов, чем нужно до конца страницы,
+    только по индексу `ix_tweet_user_id_posted_at`, и эти короткие списки сливаются.
+    Поэтому стоимость страницы зависит от количества подписок и размера страницы,
+    а не от количества твитов авторов.
+
+    :param auth_user: пользователь, ленту которого нужно получить.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    """
+    authors = feed_authors_stmt(auth_user).subquery("authors")
+
+    skipped = 0
+    author_tweets = select(models.Tweet.id, models.Tweet.posted_at).where(models.Tweet.user_id == authors.c[0])
+    if cursor is not None:
+        author_tweets = author_tweets.where(
+            tuple_(models.Tweet.posted_at, models.Tweet.id) < tuple_(cursor.posted_at, cursor.id)
+        )
+    elif offset is not None:
+        skipped = (offset - 1) * limit
+    author_tweets_lateral = (
+        author_tweets.order_by(*feed_order_by(FeedOrder.chronological)).limit(skipped + limit).lateral("author_tweets")
+    )
+
+    page_ids = (
+        select(author_tweets_lateral.c.id)
+        .select_from(authors)
+        .join(author_tweets_lateral, true())
+        .order_by(author_tweets_lateral.c.posted_at.desc(), author_tweets_lateral.c.id.desc())
+        .offset(skipped)
+        .limit(limit)
+    )
+    return select(models.Tweet).where(models.Tweet.id.in_(page_ids)).order_by(*feed_order_by(FeedOrder.chronological))
+
+
+async def feed_author_ids(db_session: AsyncSession, auth_user: models.User) -> list[int]:
+    """
+    Возвращает id авторов, твиты которых попадают в ленту пользователя.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    """
+    author_ids_qs = await db_session.execute(feed_authors_stmt(auth_user))
+    return list(author_ids_qs.scalars().all())
+
+
+def feed_new_tweets_stmt(auth_user: models.User, since_id: int, changed_after: Optional[datetime]) -> Select:
+    """
+    Возвращает запрос твитов ленты, опубликованных после твита `since_id`, в порядке публикации.
+
+    Твит получает id при вставке, а становится виден после фиксации транзакции,
+    поэтому твит с меньшим id может появиться позже. Такие твиты, опубликованные
+    после `changed_after`, тоже возвращаются, даже если клиент уже их получил.
+
+    :param auth_user: владелец ленты.
+    :param since_id: id последнего твита, который уже есть у клиента.
+    :param changed_after: дата-время, начиная с которого возвращаются и твиты с меньшим id.
+    """
+    condition = models.Tweet.id > since_id
+    if changed_after is not None:
+        condition = or_(condition, models.Tweet.posted_at >= changed_after)
+
+    return (
+        select(models.Tweet)
+        .where(models.Tweet.user_id.in_(feed_authors_stmt(auth_user)), condition)
+        .order_by(models.Tweet.id)
+    )
+
+
+def feed_like_changes_stmt(auth_user: models.User, since_id: int, changed_after: datetime) -> Select:
+    """
+    Возвращает запрос количества лайков твитов ленты (не новее `since_id`),
+    у которых оно менялось после `changed_after`.
+
+    :param auth_user: владелец ленты.
+    :param since_id: id последнего твита, который уже есть у клиента.
+    :param changed_after: дата-время, после которого ищутся изменения.
+    """
+    return (
+        select(models.Tweet.id, models.Tweet.like_count)
+        .where(
+            models.Tweet.user_id.in_(feed_authors_stmt(auth_user)),
+            models.Tweet.id <= since_id,
+            models.Tweet.likes_changed_at >= changed_after,
+        )
+        .order_by(models.Tweet.id)
+    )
@@ -0,0 +1,59 @@
+from collections.abc import Iterable
+from typing import Optional
+
+from fastapi import Query
+
+from .exceptions import InvalidFieldsError, http_exception
+
+# поля твита в ответе ленты (`id` возвращается всегда)
+TWEET_FIELDS = ("id", "content", "author", "attachments", "likes", "like_count", "liked_by_me", "first_likers")
+
+# поля пользователя в ответе профиля (`id` возвращается всегда)
+USER_FIELDS = ("id", "name", "followers", "following")
+
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str]) -> Optional[frozenset[str]]:
+    """
+    Возвращает множество запрошенных полей или `None`, если нужны все поля.
+    Возбуждает `InvalidFieldsError`, если запрошено неизвестное поле.
+
+    :param fields: поля через запятую.
+    :param allowed: допустимые поля.
+    """
+    if fields is None:
+        return None
+
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = requested - frozenset(allowed)
+    if unknown:
+        raise InvalidFieldsError(f"unknown fields {', '.join(sorted(unknown))}")
+    return requested | {"id"}
+
+
+async def get_tweet_fields(
+    fields: Optional[str] = Query(
+        default=None,
+        description="Поля твитов через запятую, например `content,author`. Связи, не попавшие в поля, "
+        "не загружаются из БД. Поля `like_count`, `liked_by_me` и `first_likers` учитываются при `likes=compact`, "
+        "а `likes` - при `likes=full`. Игнорируется в форме `normalized` и при опросе изменений ленты",
+    ),
+) -> Optional[frozenset[str]]:
+    """Возвращает запрошенные поля твитов или возбуждает `422 Unprocessable Entity`, если поле неизвестно."""
+    try:
+        return parse_fields(fields, TWEET_FIELDS)
+    except InvalidFieldsError as ex:
+        raise http_exception(ex, status_code=422)
+
+
+async def get_user_fields(
+    fields: Optional[str] = Query(
+        default=None,
+        description="Поля пользователя через запятую, например `name,followers`. "
+        "Связи, не попавшие в поля, не загружаются из БД",
+    ),
+) -> Optional[frozenset[str]]:
+    """Возвращает запрошенные поля пользователя или возбуждает `422 Unprocessable Entity`, если поле неизвестно."""
+    try:
+        return parse_fields(fields, USER_FIELDS)
+    except InvalidFieldsError as ex:
+        raise http_exception(ex, status_code=422)
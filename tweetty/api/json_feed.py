@@ -0,0 +1,152 @@
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Optional
+
+from sqlalchemy import Select, Text, case, cast, func, literal, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from .. import settings
+from ..db import models
+from .cursors import FeedKey, TweetCursor
+from .feeds import feed_order_by, page_keys_order_by
+from .models import FeedOrder
+
+EMPTY_JSON_ARRAY = text("'[]'::json")
+
+
+def json_feed_enabled() -> bool:
+    """Возвращает `True`, если JSON ленты твитов собирается в БД."""
+    return settings.FEED_SQL_JSON
+
+
+def static_uri_expr(path):
+    """Возвращает SQL-выражение, аналогичное `tweetty.api.static.static_uri`."""
+    return case(
+        (
+            func.starts_with(path, settings.STATIC_DIR),
+            literal(settings.STATIC_URL) + func.substr(path, len(settings.STATIC_DIR) + 1),
+        ),
+        else_=path,
+    )
+
+
+def user_json_expr(user):
+    """Возвращает SQL-выражение JSON пользователя в формате `tweetty.api.models.BaseUser`."""
+    return func.json_build_object("id", user.id, "name", user.nickname)
+
+
+def feed_json_stmt(
+    page_stmt: Select, order: FeedOrder = FeedOrder.ranked, page_keys: Optional[Sequence[FeedKey]] = None
+) -> Select:
+    """
+    Возвращает запрос страницы ленты, в котором каждый твит уже преобразован
+    в JSON в формате `tweetty.api.models.TweetOut`.
+
+    Автор, вложения и лайки собираются `json_build_object`/`json_agg` в том же запросе,
+    поэтому твиты не загружаются в ORM и не сериализуются через Pydantic.
+
+    :param page_stmt: запрос страницы ленты (`tweetty.api.feeds.feed_page_stmt`).
+    :param order: порядок ленты.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+    """
+    page = page_stmt.subquery("page")
+    tweet = aliased(models.Tweet, page)
+    author = aliased(models.User)
+    liker = aliased(models.User)
+
+    attachments = (
+        select(
+            func.json_agg(
+                aggregate_order_by(static_uri_expr(models.TweetMedia.rel_uri), models.TweetMedia.id),
+            )
+        )
+        .where(models.TweetMedia.tweet_id == tweet.id)
+        .scalar_subquery()
+    )
+    likes = (
+        select(func.json_agg(aggregate_order_by(user_json_expr(liker), models.Like.id)))
+        .join(liker, liker.id == models.Like.user_id)
+        .where(models.Like.tweet_id == tweet.id)
+        .scalar_subquery()
+    )
+    tweet_json = func.json_build_object(
+        "id",
+        tweet.id,
+        "content",
+        tweet.content,
+        "author",
+        user_json_expr(author),
+        "attachments",
+        func.coalesce(attachments, EMPTY_JSON_ARRAY),
+        "likes",
+        func.coalesce(likes, EMPTY_JSON_ARRAY),
+    )
+
+    return (
+        select(cast(tweet_json, Text).label("tweet_json"), tweet.like_count, tweet.score, tweet.posted_at, tweet.id)
+        .join(author, author.id == tweet.user_id)
+        .order_by(*(feed_order_by(order, tweet) if page_keys is None else page_keys_order_by(page_keys, tweet)))
+    )
+
+
+async def stream_feed_json(
+    db_session: AsyncSession,
+    page_stmt: Select,
+    limit: int,
+    order: FeedOrder = FeedOrder.ranked,
+    page_keys: Optional[Sequence[FeedKey]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Отдает JSON страницы ленты в формате `tweetty.api.models.TweetListOut` по мере чтения строк из БД.
+
+    :param db_session: сессия с базой данных.
+    :param page_stmt: запрос страницы ленты (`tweetty.api.feeds.feed_page_stmt`).
+    :param limit: количество твитов на странице.
+    :param order: порядок ленты.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+        Курсор следующей страницы строится по последнему из них.
+    """
+    yield b'{"result":true,"tweets":['
+
+    count = 0
+    last_row = None
+    rows = await db_session.stream(feed_json_stmt(page_stmt, order, page_keys))
+    async for row in rows:
+        if count:
+            yield b","
+        yield row.tweet_json.encode()
+
+        count += 1
+        last_row = row
+
+    next_cursor = None
+    if page_keys is not None:
+        if len(page_keys) == limit:
+            next_cursor = TweetCursor.of_key(page_keys[-1]).encode()
+    elif last_row is not None and count == limit:
+        next_cursor = TweetCursor.of(last_row).encode()
+
+    yield b'],"next_cursor":' + json.dumps(next_cursor).encode() + b"}"
+
+
+async def stream_feed_json_response(
+    page_stmt: Select,
+    limit: int,
+    order: FeedOrder = FeedOrder.ranked,
+    page_keys: Optional[Sequence[FeedKey]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Отдает JSON страницы ленты для `StreamingResponse` в отдельной сессии с БД.
+    Ответ читается уже после выхода из обработчика запроса, когда сессия запроса может быть закрыта,
+    поэтому своя сессия открывается при чтении ответа и закрывается после него.
+
+    :param page_stmt: запрос страницы ленты (`tweetty.api.feeds.feed_page_stmt`).
+    :param limit: количество твитов на странице.
+    :param order: порядок ленты.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+    """
+    async with models.Session(bind=models.engine) as db_session:
+        async for chunk in stream_feed_json(db_session, page_stmt, limit, order, page_keys):
+            yield chunk
@@ -0,0 +1,90 @@
+from collections.abc import Sequence
+from typing import Optional
+
+from sqlalchemy import Select, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import models
+from .cursors import LikeCursor
+from .models import BaseUser
+
+
+def first_likers_stmt(tweet_ids: Sequence[int], size: int) -> Select:
+    """
+    Возвращает запрос первых `size` лайкнувших каждый из твитов.
+
+    Лайки каждого твита читаются по индексу `ix_like_tweet_id_id` с `LIMIT`,
+    поэтому стоимость запроса не зависит от количества лайков твита.
+
+    :param tweet_ids: id твитов.
+    :param size: количество лайкнувших на твит.
+    """
+    tweets = select(models.Tweet.id).where(models.Tweet.id.in_(list(tweet_ids))).subquery("tweets")
+    first_likes = (
+        select(models.Like.id, models.Like.user_id)
+        .where(models.Like.tweet_id == tweets.c.id)
+        .order_by(models.Like.id)
+        .limit(size)
+        .lateral("first_likes")
+    )
+    return (
+        select(tweets.c.id.label("tweet_id"), models.User.id, models.User.nickname)
+        .select_from(tweets)
+        .join(first_likes, true())
+        .join(models.User, models.User.id == first_likes.c.user_id)
+        .order_by(tweets.c.id, first_likes.c.id)
+    )
+
+
+async def get_first_likers(db_session: AsyncSession, tweet_ids: Sequence[int], size: int) -> dict[int, list[BaseUser]]:
+    """
+    Возвращает первых `size` лайкнувших каждый из твитов по id твитов.
+
+    :param db_session: сессия с базой данных.
+    :param tweet_ids: id твитов.
+    :param size: количество лайкнувших на твит.
+    """
+    first_likers: dict[int, list[BaseUser]] = dict()
+    if not tweet_ids or size <= 0:
+        return first_likers
+
+    rows = await db_session.execute(first_likers_stmt(tweet_ids, size))
+    for row in rows:
+        first_likers.setdefault(row.tweet_id, list()).append(BaseUser(id=row.id, name=row.nickname))
+    return first_likers
+
+
+async def get_liked_tweet_ids(db_session: AsyncSession, user_id: int, tweet_ids: Sequence[int]) -> set[int]:
+    """
+    Возвращает id твитов, которые лайкнул пользователь.
+
+    :param db_session: сессия с базой данных.
+    :param user_id: id пользователя.
+    :param tweet_ids: id проверяемых твитов.
+    """
+    if not tweet_ids:
+        return set()
+
+    liked_qs = await db_session.execute(
+        select(models.Like.tweet_id).where(models.Like.user_id == user_id, models.Like.tweet_id.in_(list(tweet_ids)))
+    )
+    return set(liked_qs.scalars().all())
+
+
+def likers_page_stmt(tweet_id: int, cursor: Optional[LikeCursor], limit: int) -> Select:
+    """
+    Возвращает запрос страницы пользователей, лайкнувших твит, в порядке лайков.
+
+    :param tweet_id: id твита.
+    :param cursor: курсор страницы.
+    :param limit: количество пользователей на странице.
+    """
+    stmt = (
+        select(models.Like.id.label("like_id"), models.User.id, models.User.nickname)
+        .join(models.User, models.User.id == models.Like.user_id)
+        .where(models.Like.tweet_id == tweet_id)
+    )
+    if cursor is not None:
+        stmt = stmt.where(models.Like.id > cursor.id)
+
+    return stmt.order_by(models.Like.id).limit(limit)
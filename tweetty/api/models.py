@@ -1,12 +1,10 @@
-from typing import Any
+from enum import Enum
+from typing import Optional
 
 from fastapi.params import File
 from pydantic import BaseModel, Field, constr
-from pydantic.utils import GetterDict
 
-from ..db import models as db_models
 from ..settings import STATIC_DIR
-from .static import static_uri
 
 
 class ResultModel(BaseModel):
@@ -144,24 +142,6 @@ class BaseUser(BaseModel):
         allow_population_by_field_name = True
 
 
-class UserGetter(GetterDict):
-    """
-    Класс `UserGetter` служит для получения `tweetty.db.models.User`
-    в модели Pydantic.
-    """
-
-    def get(self, key: Any, default: Any = None) -> Any:
-        value = super().get(key, default=default)
-
-        if isinstance(self._obj, db_models.User):
-            if key == "followers":
-                return [BaseUser.from_orm(follower.follower) for follower in self._obj.followers]
-            elif key == "following":
-                return [BaseUser.from_orm(following.user) for following in self._obj.followings]
-
-        return value
-
-
 class UserWithFollowers(BaseUser):
     """Модель пользователя с подписчиками."""
 
@@ -182,25 +162,6 @@ class UserWithFollowers(BaseUser):
 
     class Config:
         orm_mode = True
-        getter_dict = UserGetter
-
-
-class TweetGetter(GetterDict):
-    """
-    Класс `TweetGetter` служит для получения `tweetty.db.models.Tweet`
-    в модели Pydantic.
-    """
-
-    def get(self, key: Any, default: Any = None) -> Any:
-        value = super().get(key, default=default)
-
-        if isinstance(self._obj, db_models.Tweet):
-            if key == "medias":
-                return [static_uri(media.rel_uri) for media in self._obj.medias]
-            elif key == "likes":
-                return [BaseUser.from_orm(user) for user in self._obj.liked_by_users]
-
-        return value
 
 
 class TweetOut(BaseModel):
@@ -238,7 +199,6 @@ class TweetOut(BaseModel):
     class Config:
         orm_mode = True
         allow_population_by_field_name = True
-        getter_dict = TweetGetter
 
 
 class TweetListOut(ResultModel):
@@ -266,6 +226,272 @@ class TweetListOut(ResultModel):
             ).dict(by_alias=True)
         ],
     )
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Курсор следующей страницы",
+        description="Курсор для получения следующей страницы ленты. Отсутствует на последней странице",
+    )
+
+
+class LikesMode(str, Enum):
+    """Режим представления лайков твитов в ленте."""
+
+    # все лайкнувшие пользователи
+    full = "full"
+    # количество лайков, лайк текущего пользователя и первые лайкнувшие
+    compact = "compact"
+
+
+class CompactTweetOut(BaseModel):
+    """Модель твита с кратким представлением лайков."""
+
+    id: int = Field(
+        ...,
+        title="Id твита",
+        description="Id твита",
+    )
+    content: str = Field(
+        ...,
+        title="Содержимое твита",
+        description="Содержимое твита",
+    )
+    user: BaseUser = Field(
+        ...,
+        title="Автор твита",
+        description="Автор твита",
+        alias="author",
+    )
+    medias: list[str] = Field(
+        list(),
+        title="Список медиа",
+        description="Список медиа, прикрепленных к твиту",
+        alias="attachments",
+    )
+    like_count: int = Field(
+        ...,
+        title="Количество лайков",
+        description="Количество лайков",
+    )
+    liked_by_me: bool = Field(
+        ...,
+        title="Лайк пользователя",
+        description="Лайкнул ли твит текущий пользователь",
+    )
+    first_likers: list[BaseUser] = Field(
+        list(),
+        title="Первые лайкнувшие",
+        description="Первые пользователи, лайкнувшие твит. " "Полный список - `GET /api/tweets/{tweet_id}/likes`",
+    )
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class CompactTweetListOut(ResultModel):
+    """Модель списка твитов с кратким представлением лайков."""
+
+    tweets: list[CompactTweetOut] = Field(
+        list(),
+        title="Список твитов",
+        description="Список твитов пользователя",
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Курсор следующей страницы",
+        description="Курсор для получения следующей страницы ленты. Отсутствует на последней странице",
+    )
+
+
+class LikersOut(ResultModel):
+    """Модель страницы пользователей, лайкнувших твит."""
+
+    users: list[BaseUser] = Field(
+        list(),
+        title="Лайкнувшие",
+        description="Пользователи, лайкнувшие твит, в порядке лайков",
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Курсор следующей страницы",
+        description="Курсор для получения следующей страницы. Отсутствует на последней странице",
+    )
+
+
+class FeedShape(str, Enum):
+    """Форма ответа ленты твитов."""
+
+    # пользователи вложены в твиты
+    nested = "nested"
+    # твиты ссылаются на пользователей по id, а пользователи передаются один раз в `users`
+    normalized = "normalized"
+
+
+class FeedOrder(str, Enum):
+    """Порядок ленты твитов."""
+
+    # по рейтингу или количеству лайков (`FEED_RANKING`), одинаковый для всех читателей
+    ranked = "ranked"
+    # по лайкам, возрасту твита и близости читателя к автору (сколько твитов автора он лайкнул)
+    personalized = "personalized"
+    # по дате-времени публикации, от новых твитов к старым
+    chronological = "chronological"
+
+
+class NormalizedTweetOut(BaseModel):
+    """Модель твита, ссылающегося на пользователей по id."""
+
+    id: int = Field(
+        ...,
+        title="Id твита",
+        description="Id твита",
+    )
+    content: str = Field(
+        ...,
+        title="Содержимое твита",
+        description="Содержимое твита",
+    )
+    author_id: int = Field(
+        ...,
+        title="Id автора твита",
+        description="Id автора твита в `users`",
+    )
+    medias: list[str] = Field(
+        list(),
+        title="Список медиа",
+        description="Список медиа, прикрепленных к твиту",
+        alias="attachments",
+    )
+    likes: list[int] = Field(
+        list(),
+        title="Лайки",
+        description="Id лайкнувших пользователей в `users`",
+    )
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class NormalizedCompactTweetOut(BaseModel):
+    """Модель твита с кратким представлением лайков, ссылающегося на пользователей по id."""
+
+    id: int = Field(
+        ...,
+        title="Id твита",
+        description="Id твита",
+    )
+    content: str = Field(
+        ...,
+        title="Содержимое твита",
+        description="Содержимое твита",
+    )
+    author_id: int = Field(
+        ...,
+        title="Id автора твита",
+        description="Id автора твита в `users`",
+    )
+    medias: list[str] = Field(
+        list(),
+        title="Список медиа",
+        description="Список медиа, прикрепленных к твиту",
+        alias="attachments",
+    )
+    like_count: int = Field(
+        ...,
+        title="Количество лайков",
+        description="Количество лайков",
+    )
+    liked_by_me: bool = Field(
+        ...,
+        title="Лайк пользователя",
+        description="Лайкнул ли твит текущий пользователь",
+    )
+    first_likers: list[int] = Field(
+        list(),
+        title="Первые лайкнувшие",
+        description="Id первых лайкнувших пользователей в `users`",
+    )
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class NormalizedTweetListOut(ResultModel):
+    """Модель списка твитов со справочником пользователей."""
+
+    tweets: list[NormalizedTweetOut] = Field(
+        list(),
+        title="Список твитов",
+        description="Список твитов пользователя",
+    )
+    users: dict[int, BaseUser] = Field(
+        ...,
+        title="Пользователи",
+        description="Авторы и лайкнувшие твиты страницы по id",
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Курсор следующей страницы",
+        description="Курсор для получения следующей страницы ленты. Отсутствует на последней странице",
+    )
+
+
+class NormalizedCompactTweetListOut(ResultModel):
+    """Модель списка твитов с кратким представлением лайков и справочником пользователей."""
+
+    tweets: list[NormalizedCompactTweetOut] = Field(
+        list(),
+        title="Список твитов",
+        description="Список твитов пользователя",
+    )
+    users: dict[int, BaseUser] = Field(
+        ...,
+        title="Пользователи",
+        description="Авторы и первые лайкнувшие твиты страницы по id",
+    )
+    next_cursor: Optional[str] = Field(
+        None,
+        title="Курсор следующей страницы",
+        description="Курсор для получения следующей страницы ленты. Отсутствует на последней странице",
+    )
+
+
+class LikeCountOut(BaseModel):
+    """Модель количества лайков твита."""
+
+    id: int = Field(
+        ...,
+        title="Id твита",
+        description="Id твита",
+    )
+    like_count: int = Field(
+        ...,
+        title="Количество лайков",
+        description="Текущее количество лайков твита",
+    )
+
+    class Config:
+        orm_mode = True
+
+
+class TweetDeltaOut(ResultModel):
+    """Модель изменений ленты с предыдущего опроса."""
+
+    tweets: list[TweetOut] = Field(
+        list(),
+        title="Новые твиты",
+        description="Твиты, опубликованные после предыдущего опроса, в порядке публикации. "
+        "Могут повторять твиты, уже полученные клиентом",
+    )
+    likes: list[LikeCountOut] = Field(
+        list(),
+        title="Изменения лайков",
+        description="Количество лайков твитов, уже полученных клиентом, если оно изменилось после предыдущего опроса",
+    )
+    next_since_cursor: str = Field(
+        ...,
+        title="Курсор следующего опроса",
+        description="Курсор для получения изменений после этого опроса",
+    )
 
 
 class UserResultOut(ResultModel):
@@ -276,3 +502,60 @@ class UserResultOut(ResultModel):
         title="Пользователь",
         description="Пользователь",
     )
+
+
+class CacheStats(BaseModel):
+    """Статистика кэша."""
+
+    entries: int = Field(..., title="Записи", description="Количество записей в кэше")
+    memory_bytes: int = Field(..., title="Память", description="Приблизительный объем памяти записей в байтах")
+    hits: int = Field(..., title="Попадания", description="Количество попаданий в кэш")
+    misses: int = Field(..., title="Промахи", description="Количество промахов кэша")
+    hit_rate: float = Field(..., title="Доля попаданий", description="Доля попаданий среди обращений к кэшу")
+    evictions: int = Field(..., title="Вытеснения", description="Количество записей, вытесненных из-за размера кэша")
+    invalidations: int = Field(..., title="Инвалидации", description="Количество записей, удаленных по событиям")
+
+
+class PrefetchStats(CacheStats):
+    """Статистика загрузки следующих страниц ленты заранее."""
+
+    pending: int = Field(..., title="Загрузки", description="Количество выполняющихся загрузок")
+    dropped: int = Field(
+        ..., title="Пропущенные загрузки", description="Количество загрузок, не запущенных из-за нагрузки"
+    )
+    cancelled: int = Field(..., title="Отмененные загрузки", description="Количество отмененных загрузок")
+
+
+class CoalescingStats(BaseModel):
+    """Статистика объединения одновременных одинаковых запросов."""
+
+    enabled: bool = Field(..., title="Включено", description="Объединяются ли запросы")
+    requests: int = Field(..., title="Запросы", description="Количество запросов")
+    coalesced: int = Field(
+        ..., title="Объединенные запросы", description="Количество запросов, получивших результат другого запроса"
+    )
+
+
+class StatsOut(ResultModel):
+    """Модель статистики процесса API."""
+
+    feed_cache: CacheStats = Field(
+        ...,
+        title="Кэш ленты",
+        description="Статистика кэша страниц ленты твитов",
+    )
+    tweet_fragment_cache: CacheStats = Field(
+        ...,
+        title="Кэш твитов",
+        description="Статистика кэша JSON-представлений твитов",
+    )
+    feed_prefetch: PrefetchStats = Field(
+        ...,
+        title="Загрузка страниц ленты заранее",
+        description="Статистика загрузки следующих страниц ленты заранее",
+    )
+    request_coalescing: dict[str, CoalescingStats] = Field(
+        ...,
+        title="Объединение запросов",
+        description="Статистика объединения одновременных одинаковых запросов по обработчикам",
+    )
@@ -0,0 +1,172 @@
+import asyncio
+from collections.abc import Callable, Coroutine
+from typing import Any, Optional
+
+import msgpack
+import orjson
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from .exceptions import InvalidBodyError, http_exception
+from .responses import ValidatedModelRoute, render_body
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+# типы, под которыми MessagePack передают клиенты
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+# типы из `Accept`, которым соответствует ответ в JSON
+_JSON_MEDIA_RANGES = (JSON_MEDIA_TYPE, "application/*", "*/*")
+
+
+def media_type_of(content_type: Optional[str]) -> str:
+    """
+    Возвращает тип содержимого без параметров.
+
+    :param content_type: значение заголовка `Content-Type`.
+    """
+    return (content_type or "").partition(";")[0].strip().lower()
+
+
+def prefers_msgpack(accept: Optional[str]) -> bool:
+    """
+    Проверяет, предпочитает ли клиент MessagePack ответу в JSON.
+
+    При равном качестве (`q`) и без заголовка `Accept` ответ отдается в JSON.
+
+    :param accept: значение заголовка `Accept`.
+    """
+    if not accept:
+        return False
+
+    json_quality = msgpack_quality = 0.0
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        media_type = media_type.strip().lower()
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_quality = max(msgpack_quality, quality)
+        elif media_type in _JSON_MEDIA_RANGES:
+            json_quality = max(json_quality, quality)
+
+    return msgpack_quality > json_quality
+
+
+def msgpack_to_json(body: bytes) -> bytes:
+    """
+    Возвращает JSON тела запроса в MessagePack.
+    Возбуждает `InvalidBodyError`, если тело не MessagePack или в нем есть значения, которых нет в JSON.
+
+    :param body: тело запроса в MessagePack.
+    """
+    try:
+        return orjson.dumps(msgpack.unpackb(body), option=orjson.OPT_NON_STR_KEYS)
+    except (ValueError, TypeError) as ex:
+        # `msgpack.UnpackException` и `orjson.JSONEncodeError` - наследники `ValueError` и `TypeError`
+        raise InvalidBodyError(f"invalid MessagePack body: {ex}")
+
+
+class MsgPackRequest(Request):
+    """
+    Запрос с телом в MessagePack, которое FastAPI читает как JSON.
+
+    Тело перекодируется в JSON, поэтому валидация и ошибки валидации
+    у тела в MessagePack те же, что у тела в JSON.
+    """
+
+    def __init__(self, request: Request):
+        headers = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+        headers.append((b"content-type", JSON_MEDIA_TYPE.encode()))
+        super().__init__({**request.scope, "headers": headers}, request.receive)
+
+    async def body(self) -> bytes:
+        if not hasattr(self, "_json_body"):
+            try:
+                self._json_body = msgpack_to_json(await super().body())
+            except InvalidBodyError as ex:
+                raise http_exception(ex, status_code=400)
+        return self._json_body
+
+
+async def msgpack_response(response: Response) -> Response:
+    """
+    Возвращает ответ в JSON, перекодированный в MessagePack.
+
+    Ответ перекодируется из готового JSON, поэтому данные в MessagePack совпадают
+    с данными в JSON: ключи объектов - строки, как в JSON.
+
+    :param response: ответ в JSON.
+    """
+    body = await render_body(response)
+    if not body:
+        return response
+
+    packed = Response(
+        msgpack.packb(orjson.loads(body)),
+        status_code=response.status_code,
+        media_type=MSGPACK_MEDIA_TYPE,
+        background=response.background,
+    )
+    packed.raw_headers.extend(
+        (name, value) for name, value in response.raw_headers if name not in (b"content-length", b"content-type")
+    )
+    return packed
+
+
+async def handle_exception(request: Request, ex: Exception) -> Response:
+    """
+    Возвращает ответ обработчика исключений приложения на ошибку HTTP или ошибку валидации запроса.
+
+    :param request: запрос.
+    :param ex: исключение.
+    """
+    handlers = request.app.exception_handlers
+    handler = next(handlers[cls] for cls in type(ex).__mro__ if cls in handlers)
+    if asyncio.iscoroutinefunction(handler):
+        return await handler(request, ex)
+    return await run_in_threadpool(handler, request, ex)
+
+
+class NegotiatedRoute(ValidatedModelRoute):
+    """
+    Маршрут, который отдает ответы в MessagePack клиентам, предпочитающим
+    `application/msgpack` в заголовке `Accept`, и принимает тело запроса
+    в MessagePack с заголовком `Content-Type: application/msgpack`.
+
+    Ответы в JSON, в том числе ошибки HTTP и ошибки валидации, перекодируются
+    в MessagePack. Остальные ответы (потоки событий, редиректы, `304 Not Modified`)
+    отдаются как есть. Ко всем ответам добавляется `Vary: Accept`.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def negotiated_route_handler(request: Request) -> Response:
+            if media_type_of(request.headers.get("content-type")) in MSGPACK_MEDIA_TYPES:
+                request = MsgPackRequest(request)
+
+            try:
+                response = await route_handler(request)
+            except (StarletteHTTPException, RequestValidationError) as ex:
+                if not prefers_msgpack(request.headers.get("accept")):
+                    raise
+                response = await handle_exception(request, ex)
+
+            if (
+                prefers_msgpack(request.headers.get("accept"))
+                and media_type_of(response.headers.get("content-type")) == JSON_MEDIA_TYPE
+            ):
+                response = await msgpack_response(response)
+            response.headers.add_vary_header("Accept")
+            return response
+
+        return negotiated_route_handler
@@ -0,0 +1,158 @@
+from datetime import timezone
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Float, Select, and_, case, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import settings
+from ..db import models
+from .cursors import TweetCursor
+from .feeds import feed_authors_stmt
+
+
+def personalized_candidates_stmt(auth_user: models.User) -> Select:
+    """
+    Возвращает запрос кандидатов в персональную ленту пользователя: последних
+    `FEED_PERSONALIZED_CANDIDATES` твитов ленты с количеством лайкнутых пользователем твитов их авторов.
+    Твиты выбираются по индексу `ix_tweet_user_id_posted_at`.
+
+    :param auth_user: владелец ленты.
+    """
+    return (
+        select(
+            models.Tweet.id,
+            models.Tweet.like_count,
+            cast(func.extract("epoch", models.Tweet.posted_at), Float).label("posted_at"),
+            func.coalesce(models.AuthorAffinity.like_count, 0).label("affinity"),
+        )
+        .outerjoin(
+            models.AuthorAffinity,
+            and_(
+                models.AuthorAffinity.user_id == auth_user.id,
+                models.AuthorAffinity.author_id == models.Tweet.user_id,
+            ),
+        )
+        .where(models.Tweet.user_id.in_(feed_authors_stmt(auth_user)))
+        .order_by(models.Tweet.posted_at.desc(), models.Tweet.id.desc())
+        .limit(settings.FEED_PERSONALIZED_CANDIDATES)
+    )
+
+
+def personalized_columns_stmt(auth_user: models.User) -> Select:
+    """
+    Возвращает запрос кандидатов в персональную ленту пользователя, в котором каждая колонка
+    кандидатов собрана в массив, чтобы сразу передать ее в NumPy, не разбирая строки по одной.
+    Если кандидатов нет, массивы равны `NULL`.
+
+    :param auth_user: владелец ленты.
+    """
+    candidates = personalized_candidates_stmt(auth_user).subquery("candidates")
+    return select(
+        *(
+            func.array_agg(aggregate_order_by(column, candidates.c.posted_at.desc(), candidates.c.id.desc())).label(
+                column.name
+            )
+            for column in candidates.c
+        )
+    )
+
+
+def personalized_scores(like_counts: np.ndarray, posted_at: np.ndarray, affinities: np.ndarray) -> np.ndarray:
+    """
+    Возвращает персональные рейтинги твитов
+    `log2(1 + лайки) + FEED_AFFINITY_WEIGHT * log2(1 + близость) + posted_at / FEED_SCORE_HALF_LIFE`.
+
+    Как и у `tweetty.db.ranking.decay_score`, возраст твита учитывается через дату-время
+    публикации, поэтому порядок твитов не зависит от момента запроса.
+
+    :param like_counts: количество лайков твитов.
+    :param posted_at: дата-время публикации твитов в секундах эпохи.
+    :param affinities: количество лайкнутых читателем твитов авторов твитов.
+    """
+    half_life = settings.FEED_SCORE_HALF_LIFE * 3600
+    scores = np.log2(1 + np.maximum(like_counts, 0))
+    scores += settings.FEED_AFFINITY_WEIGHT * np.log2(1 + np.maximum(affinities, 0))
+    scores += posted_at / half_life
+    return scores
+
+
+async def personalized_feed_page(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+) -> list[int]:
+    """
+    Возвращает id твитов страницы персональной ленты пользователя в порядке ленты:
+    по персональному рейтингу, дате-времени публикации и id.
+
+    Кандидаты ранжируются одним векторным проходом NumPy. Следующая страница начинается
+    после твита курсора с его текущим рейтингом, а если твита уже нет среди кандидатов -
+    после рейтинга, посчитанного по курсору без близости к автору.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    """
+    candidates = (await db_session.execute(personalized_columns_stmt(auth_user))).one()
+    if candidates.id is None:
+        return list()
+
+    tweet_ids = np.array(candidates.id, dtype=np.int64)
+    like_counts = np.array(candidates.like_count, dtype=np.int64)
+    posted_at = np.array(candidates.posted_at, dtype=np.float64)
+    affinities = np.array(candidates.affinity, dtype=np.int64)
+    scores = personalized_scores(like_counts, posted_at, affinities)
+    # кандидаты уже упорядочены по дате-времени публикации и id, поэтому
+    # устойчивая сортировка по рейтингу сохраняет этот порядок у равных рейтингов
+    order = np.argsort(-scores, kind="stable")
+
+    if cursor is not None:
+        (found,) = np.nonzero(tweet_ids == cursor.id)
+        if found.size:
+            cursor_score, cursor_posted_at = scores[found[0]], posted_at[found[0]]
+        else:
+            cursor_posted_at = cursor.posted_at.replace(tzinfo=timezone.utc).timestamp()
+            cursor_score = personalized_scores(np.array(cursor.likes), np.array(cursor_posted_at), np.array(0))
+
+        after_cursor = (scores < cursor_score) | (
+            (scores == cursor_score)
+            & ((posted_at < cursor_posted_at) | ((posted_at == cursor_posted_at) & (tweet_ids < cursor.id)))
+        )
+        order = order[after_cursor[order]]
+    elif offset is not None:
+        skipped = (offset - 1) * limit
+        order = order[skipped:]
+
+    return tweet_ids[order[:limit]].tolist()
+
+
+async def personalized_page_stmt(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+) -> Select:
+    """
+    Возвращает запрос страницы персональной ленты пользователя в порядке ленты.
+    Страница ранжируется заранее, поэтому запрос выбирает твиты только по их id.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: пользователь, ленту которого нужно получить.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    """
+    tweet_ids = await personalized_feed_page(db_session, auth_user, cursor, offset, limit)
+    stmt = select(models.Tweet).where(models.Tweet.id.in_(tweet_ids))
+    if not tweet_ids:
+        return stmt
+    return stmt.order_by(
+        case({tweet_id: position for position, tweet_id in enumerate(tweet_ids)}, value=models.Tweet.id)
+    )
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from typing import NamedTuple, Optional
+
+from sqlalchemy import QueuePool
+
+from ..db import events, models
+from ..settings import FEED_CACHE_EVENTS_WINDOW, FEED_PREFETCH_MAX_PENDING, FEED_PREFETCH_MAX_USERS, FEED_PREFETCH_TTL
+from .caches import FeedCache, FeedPage
+from .models import PrefetchStats
+
+logger = logging.getLogger(__name__)
+
+
+def db_pool_busy() -> bool:
+    """Проверяет, заняты ли все постоянные соединения пула БД."""
+    pool = models.engine.pool
+    return isinstance(pool, QueuePool) and pool.checkedout() >= pool.size()
+
+
+class PendingPrefetch(NamedTuple):
+    key: Hashable
+    task: "asyncio.Task[tuple[Iterable[int], FeedPage]]"
+
+
+class FeedPrefetcher(FeedCache):
+    def __init__(self, max_entries: int, ttl: float, events_window: int, max_pending: int):
+        """
+        Загрузка следующей страницы ленты заранее.
+
+        После ответа страницей ленты следующая страница рендерится в фоне и хранится
+        в слоте пользователя, пока ее не запросят, но не дольше `ttl` секунд.
+        У пользователя один слот: страница отдается один раз, а новая загрузка заменяет старую.
+        Страницы устаревают по тем же событиям, что и в кэше ленты.
+
+        Загрузка не запускается, если уже выполняется `max_pending` загрузок или заняты
+        все соединения пула БД. Загрузка отменяется, если пользователь запросил другую
+        страницу, а все загрузки - если запросу не хватает соединений пула БД.
+
+        :param max_entries: максимальное количество пользователей со страницей. При 0 загрузка выключена.
+        :param ttl: время жизни страницы в секундах.
+        :param events_window: количество последних событий, по которым проверяются загруженные страницы.
+        :param max_pending: максимальное количество одновременных загрузок.
+        """
+        super().__init__(max_entries, ttl, events_window)
+        self.max_pending = max_pending
+        self._pending: dict[int, PendingPrefetch] = dict()
+        self.dropped = 0
+        self.cancelled = 0
+
+    def stats(self) -> PrefetchStats:
+        """Возвращает статистику загрузки страниц."""
+        return PrefetchStats(
+            **super().stats().dict(), pending=len(self._pending), dropped=self.dropped, cancelled=self.cancelled
+        )
+
+    async def take(self, user_id: int, key: Hashable) -> Optional[FeedPage]:
+        """
+        Возвращает загруженную заранее страницу и освобождает слот пользователя
+        или `None`, если такой страницы нет. Если страница еще загружается, дожидается ее.
+
+        :param user_id: id владельца ленты.
+        :param key: ключ страницы.
+        """
+        if db_pool_busy():
+            # соединения пула нужнее запросам, чем загрузкам заранее
+            self.cancel_all()
+
+        pending = self._pending.get(user_id)
+        if pending is not None:
+            if pending.key == key:
+                await asyncio.wait([pending.task])
+            else:
+                self.cancel(user_id)
+
+        page = self.get(key)
+        if page is not None:
+            self._remove(key)
+        return page
+
+    async def prefetch(
+        self, user_id: int, key: Hashable, render: Callable[[], Awaitable[tuple[Iterable[int], FeedPage]]]
+    ) -> None:
+        """
+        Рендерит страницу и сохраняет ее в слот пользователя, если загрузку можно запустить.
+        Условия проверяются до рендеринга, поэтому пропущенная загрузка не обращается к БД.
+
+        :param user_id: id владельца ленты.
+        :param key: ключ страницы.
+        :param render: рендеринг страницы, возвращающий id авторов, твиты которых могут попасть в ленту, и страницу.
+        """
+        pending = self._pending.get(user_id)
+        if (pending is not None and pending.key == key) or key in self._entries:
+            # страница уже загружается или загружена одновременным одинаковым запросом
+            return
+        if len(self._pending) >= self.max_pending or db_pool_busy():
+            self.dropped += 1
+            return
+
+        self.cancel(user_id)
+        token = self.begin()
+        task = asyncio.ensure_future(render())
+        self._pending[user_id] = PendingPrefetch(key, task)
+        try:
+            author_ids, page = await task
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # отменена фоновая задача запроса, а не загрузка
+                task.cancel()
+                raise
+            return
+        except Exception:
+            logger.exception("feed page prefetch failed")
+            return
+        finally:
+            pending = self._pending.get(user_id)
+            if pending is not None and pending.task is task:
+                del self._pending[user_id]
+
+        for user_key in list(self._user_keys.get(user_id, set())):
+            self._remove(user_key)
+        self.set(token, key, user_id, author_ids, page)
+
+    def cancel(self, user_id: int) -> None:
+        """
+        Отменяет загрузку страницы пользователя.
+
+        :param user_id: id владельца ленты.
+        """
+        pending = self._pending.pop(user_id, None)
+        if pending is not None and pending.task.cancel():
+            self.cancelled += 1
+
+    def cancel_all(self) -> None:
+        """Отменяет все загрузки страниц."""
+        for user_id in list(self._pending):
+            self.cancel(user_id)
+
+
+feed_prefetcher = FeedPrefetcher(
+    max_entries=FEED_PREFETCH_MAX_USERS,
+    ttl=FEED_PREFETCH_TTL,
+    events_window=FEED_CACHE_EVENTS_WINDOW,
+    max_pending=FEED_PREFETCH_MAX_PENDING,
+)
+events.subscribe(feed_prefetcher.handle_event)
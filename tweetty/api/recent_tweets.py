@@ -0,0 +1,232 @@
+import heapq
+import itertools
+import time
+from collections import OrderedDict, deque
+from collections.abc import Iterable
+from typing import Optional
+
+from sqlalchemy import Select, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import settings
+from ..db import models
+from ..db.ranking import rank_column, score_ranking_enabled
+from .cursors import FeedKey, TweetCursor
+
+
+def recent_tweets_stmt(author_ids: Iterable[int], length: int) -> Select:
+    """
+    Возвращает запрос последних твитов каждого из авторов.
+
+    Твиты каждого автора читаются по индексу `ix_tweet_user_id_posted_at`.
+
+    :param author_ids: id авторов.
+    :param length: максимальное количество твитов одного автора.
+    """
+    authors = select(models.User.id).where(models.User.id.in_(list(author_ids))).subquery("authors")
+    recent_tweets = (
+        select(models.Tweet.id, rank_column().label("rank"), models.Tweet.posted_at)
+        .where(models.Tweet.user_id == authors.c.id)
+        .order_by(models.Tweet.posted_at.desc(), models.Tweet.id.desc())
+        .limit(length)
+        .lateral("recent_tweets")
+    )
+    return select(
+        authors.c.id.label("author_id"),
+        recent_tweets.c.id,
+        recent_tweets.c.rank,
+        recent_tweets.c.posted_at,
+    ).join(recent_tweets, literal(True))
+
+
+class RecentTweetsCache:
+    def __init__(self, max_authors: int, author_length: int, ttl: float, changes_window: int = 1000):
+        """
+        Кэш последних твитов авторов в памяти процесса.
+
+        Для каждого автора хранятся ключи сортировки (`FeedKey`) его последних
+        `author_length` твитов, упорядоченные по убыванию. Страница ленты собирается
+        слиянием списков автора и его подписок, а из БД читаются только попавшие
+        на страницу твиты.
+
+        Кэш ограничен `max_authors` авторами и вытесняет давно не читанных.
+        Изменения, сделанные в других процессах, становятся видны не позже,
+        чем через `ttl` секунд.
+
+        Твиты автора, изменившегося во время их загрузки из БД, в кэш не сохраняются.
+        Для этого кэш помнит последние `changes_window` изменений.
+
+        :param max_authors: максимальное количество авторов в кэше.
+        :param author_length: максимальное количество твитов одного автора.
+        :param ttl: время жизни записи автора в секундах.
+        :param changes_window: количество последних изменений, по которым проверяются загруженные твиты.
+        """
+        self._max_authors = max_authors
+        self._author_length = author_length
+        self._ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, list[FeedKey]]] = OrderedDict()
+        self._changes: deque[tuple[int, int]] = deque(maxlen=changes_window)
+        self._changes_seq = 0
+        self._reset_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, author_id: int) -> Optional[list[FeedKey]]:
+        """
+        Возвращает ключи последних твитов автора или `None`, если автора нет в кэше.
+
+        :param author_id: id автора.
+        """
+        entry = self._entries.get(author_id)
+        if entry is None:
+            return None
+
+        expires_at, keys = entry
+        if expires_at <= time.monotonic():
+            del self._entries[author_id]
+            return None
+
+        self._entries.move_to_end(author_id)
+        return keys
+
+    def begin(self) -> int:
+        """Возвращает метку начала загрузки твитов для `set`."""
+        return self._changes_seq
+
+    def set(self, author_id: int, keys: Iterable[FeedKey], token: Optional[int] = None) -> bool:
+        """
+        Сохраняет ключи последних твитов автора, если с начала их загрузки автор не менялся.
+        Возвращает `True`, если ключи сохранены.
+
+        :param author_id: id автора.
+        :param keys: ключи твитов в любом порядке.
+        :param token: метка начала загрузки твитов из `begin` или `None`, если твиты не загружались.
+        """
+        if token is not None and self._changed_since(token, author_id):
+            return False
+
+        self._entries[author_id] = (time.monotonic() + self._ttl, sorted(keys, reverse=True))
+        self._entries.move_to_end(author_id)
+
+        while len(self._entries) > self._max_authors:
+            self._entries.popitem(last=False)
+        return True
+
+    def _changed_since(self, token: int, author_id: int) -> bool:
+        if token < self._reset_seq or self._changes_seq - token > len(self._changes):
+            # кэш очищен или изменения с начала загрузки уже не помещаются в окно
+            return True
+
+        for seq, changed_id in reversed(self._changes):
+            if seq <= token:
+                break
+            if changed_id == author_id:
+                return True
+        return False
+
+    def _changed(self, author_id: int) -> None:
+        self._changes_seq += 1
+        self._changes.append((self._changes_seq, author_id))
+
+    def invalidate(self, author_id: int) -> None:
+        """
+        Удаляет автора из кэша. Вызывается при публикации и удалении твитов автора.
+
+        :param author_id: id автора.
+        """
+        self._changed(author_id)
+        self._entries.pop(author_id, None)
+
+    def change_like_count(self, author_id: int, tweet_id: int, delta: int) -> None:
+        """
+        Изменяет количество лайков твита в кэше, если твит там есть.
+        Рейтинг твита (`FEED_RANKING=score`) пересчитывается в фоне,
+        поэтому при ранжировании по рейтингу ключ твита не меняется.
+
+        :param author_id: id автора твита.
+        :param tweet_id: id твита.
+        :param delta: изменение количества лайков.
+        """
+        self._changed(author_id)
+        entry = self._entries.get(author_id)
+        if entry is None or score_ranking_enabled():
+            return
+
+        expires_at, keys = entry
+        keys = [
+            (likes + delta, posted_at, key_id) if key_id == tweet_id else (likes, posted_at, key_id)
+            for likes, posted_at, key_id in keys
+        ]
+        self._entries[author_id] = (expires_at, sorted(keys, reverse=True))
+
+    def clear(self) -> None:
+        """Очищает кэш. Твиты, загрузка которых уже началась, тоже не будут сохранены."""
+        self._changes_seq += 1
+        self._reset_seq = self._changes_seq
+        self._entries.clear()
+
+    async def _load(self, db_session: AsyncSession, author_ids: list[int]) -> dict[int, list[FeedKey]]:
+        token = self.begin()
+        loaded: dict[int, list[FeedKey]] = {author_id: list() for author_id in author_ids}
+        if author_ids:
+            tweets_qs = await db_session.execute(recent_tweets_stmt(author_ids, self._author_length))
+            for row in tweets_qs.all():
+                loaded[row.author_id].append((row.rank, row.posted_at, row.id))
+
+        for author_id, keys in loaded.items():
+            # твиты читаются по дате публикации, а страница сливает списки в порядке ключей
+            keys.sort(reverse=True)
+            self.set(author_id, keys, token)
+        return loaded
+
+    async def feed_page(
+        self,
+        db_session: AsyncSession,
+        user_id: int,
+        cursor: Optional[TweetCursor],
+        offset: Optional[int],
+        limit: int,
+    ) -> list[FeedKey]:
+        """
+        Возвращает ключи сортировки твитов страницы ленты пользователя в порядке ленты.
+        Ключи берутся из кэша и могут отличаться от текущих значений в БД,
+        поэтому порядок страницы и курсор следующей строятся по ним.
+
+        :param db_session: сессия с базой данных.
+        :param user_id: id владельца ленты.
+        :param cursor: курсор страницы.
+        :param offset: номер страницы. Игнорируется, если передан курсор.
+        :param limit: количество твитов на странице.
+        """
+        followings_qs = await db_session.execute(
+            select(models.Follower.user_id).where(models.Follower.follower_id == user_id)
+        )
+        author_ids = [user_id, *followings_qs.scalars().all()]
+
+        author_keys: dict[int, list[FeedKey]] = dict()
+        missed_ids = list()
+        for author_id in author_ids:
+            keys = self.get(author_id)
+            if keys is None:
+                missed_ids.append(author_id)
+            else:
+                author_keys[author_id] = keys
+        author_keys.update(await self._load(db_session, missed_ids))
+
+        merged: Iterable[FeedKey] = heapq.merge(*author_keys.values(), reverse=True)
+        if cursor is not None:
+            cursor_key = cursor.key()
+            merged = itertools.dropwhile(lambda key: key >= cursor_key, merged)
+            start = 0
+        else:
+            start = (offset - 1) * limit if offset is not None else 0
+
+        return list(itertools.islice(merged, start, start + limit))
+
+
+recent_tweets_cache = RecentTweetsCache(
+    max_authors=settings.RECENT_TWEETS_CACHE_MAX_AUTHORS,
+    author_length=settings.RECENT_TWEETS_CACHE_AUTHOR_LENGTH,
+    ttl=settings.RECENT_TWEETS_CACHE_TTL,
+)
@@ -0,0 +1,156 @@
+import functools
+import inspect
+import json
+from collections.abc import Callable, Coroutine, Iterable
+from typing import Any, Optional, Union
+
+import orjson
+from fastapi.dependencies.utils import get_typed_signature
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+from pydantic.utils import lenient_issubclass
+
+from .serializers import DTO, DTO_TYPES
+
+# параметр ответа, который `ValidatedModelRoute` добавляет обработчику без такого параметра
+_SUB_RESPONSE_PARAM = "_validated_model_sub_response"
+
+
+def _encode_default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.dict(by_alias=True)
+    return pydantic_encoder(obj)
+
+
+def dump_json(content: Any) -> bytes:
+    """
+    Возвращает JSON содержимого ответа, сериализованный orjson.
+
+    Модели сериализуются по алиасам полей, как в `jsonable_encoder`.
+
+    :param content: содержимое ответа.
+    """
+    return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ, сериализуемый orjson. Принимает в том числе модели pydantic."""
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+
+def render_model(model: Union[BaseModel, DTO]) -> bytes:
+    """
+    Возвращает JSON модели в том виде, в каком его отправил бы FastAPI.
+
+    :param model: модель ответа или ее DTO.
+    """
+    return dump_json(model)
+
+
+async def render_body(response: Union[Response, BaseModel, DTO]) -> bytes:
+    """
+    Возвращает тело ответа обработчика в том виде, в каком его отправил бы FastAPI.
+
+    :param response: ответ обработчика, модель ответа или ее DTO.
+    """
+    if isinstance(response, StreamingResponse):
+        return b"".join(
+            [chunk if isinstance(chunk, bytes) else chunk.encode() async for chunk in response.body_iterator]
+        )
+    if isinstance(response, Response):
+        return response.body
+    return render_model(response)
+
+
+def render_tweet_list(tweets: Iterable[bytes], next_cursor: Optional[str]) -> bytes:
+    """
+    Возвращает JSON `TweetListOut`, собранный из готовых JSON твитов.
+
+    :param tweets: JSON твитов в порядке ленты.
+    :param next_cursor: курсор следующей страницы.
+    """
+    return b"".join(
+        [
+            b'{"result":true,"tweets":[',
+            b",".join(tweets),
+            b'],"next_cursor":',
+            json.dumps(next_cursor).encode(),
+            b"}",
+        ]
+    )
+
+
+class ValidatedModelRoute(APIRoute):
+    """
+    Маршрут, обработчики которого возвращают уже провалидированные модели ответа.
+
+    FastAPI заново валидирует модель, которую вернул обработчик, по `response_model`
+    и затем прогоняет ее через `jsonable_encoder`. Модели ответов обработчики собирают
+    сами, поэтому они уже валидны, и маршрут сразу сериализует их в `FastJSONResponse`.
+    Так же сериализуются DTO из `serializers`, которые описывает `response_model`.
+    Статус и заголовки, выставленные обработчиком в параметр `Response`, сохраняются.
+    `response_model` по-прежнему описывает ответ в схеме OpenAPI.
+
+    Ответы, которые не являются моделями, и маршруты с фильтрацией полей модели
+    (`response_model_include`, `response_model_exclude_unset` и т.п.) обрабатываются FastAPI как обычно.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        filters_model = any(
+            kwargs.get(name)
+            for name in (
+                "response_model_include",
+                "response_model_exclude",
+                "response_model_exclude_unset",
+                "response_model_exclude_defaults",
+                "response_model_exclude_none",
+            )
+        ) or not kwargs.get("response_model_by_alias", True)
+        if (
+            inspect.iscoroutinefunction(endpoint)
+            and not filters_model
+            and not getattr(endpoint, "__validated_model_endpoint__", False)
+        ):
+            endpoint = self._wrap_endpoint(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _wrap_endpoint(
+        endpoint: Callable[..., Coroutine[Any, Any, Any]],
+        status_code: Optional[int],
+    ) -> Callable[..., Coroutine[Any, Any, Any]]:
+        signature = get_typed_signature(endpoint)
+        sub_response_param = next(
+            (name for name, param in signature.parameters.items() if lenient_issubclass(param.annotation, Response)),
+            None,
+        )
+        if sub_response_param is None:
+            signature = signature.replace(
+                parameters=[
+                    *signature.parameters.values(),
+                    inspect.Parameter(_SUB_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+                ]
+            )
+
+        @functools.wraps(endpoint)
+        async def validated_model_endpoint(**kwargs: Any) -> Any:
+            if sub_response_param is None:
+                sub_response = kwargs.pop(_SUB_RESPONSE_PARAM)
+            else:
+                sub_response = kwargs[sub_response_param]
+
+            content = await endpoint(**kwargs)
+            if not isinstance(content, (BaseModel, *DTO_TYPES)):
+                return content
+
+            response = FastJSONResponse(content, status_code=sub_response.status_code or status_code or 200)
+            response.headers.raw.extend(sub_response.headers.raw)
+            return response
+
+        setattr(validated_model_endpoint, "__signature__", signature)
+        setattr(validated_model_endpoint, "__validated_model_endpoint__", True)
+        return validated_model_endpoint
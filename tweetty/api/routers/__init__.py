@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from .medias import medias_router
+from .stats import stats_router
 from .tweets import tweets_router
 from .users import users_router
 
@@ -8,3 +9,4 @@ api_router = APIRouter(prefix="/api")
 api_router.include_router(tweets_router)
 api_router.include_router(medias_router)
 api_router.include_router(users_router)
+api_router.include_router(stats_router)
@@ -13,8 +13,10 @@ from ...db import models
 from ..auth import get_authorized_user
 from ..exceptions import HTTP_500_INTERNAL_SERVER_ERROR_DESC, UploadFileSizeError, http_exception
 from ..models import HTTPErrorModel, NewMediaIn, NewMediaOut
+from ..negotiation import NegotiatedRoute
 
 medias_router = APIRouter(
+    route_class=NegotiatedRoute,
     prefix="/medias",
     responses={
         500: {"model": HTTPErrorModel, "description": HTTP_500_INTERNAL_SERVER_ERROR_DESC},
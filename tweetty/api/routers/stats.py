@@ -0,0 +1,43 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+
+from ...db import models
+from ..auth import get_authorized_user
+from ..caches import feed_cache, tweet_fragment_cache
+from ..coalescing import request_flights
+from ..exceptions import HTTP_500_INTERNAL_SERVER_ERROR_DESC
+from ..models import HTTPErrorModel, StatsOut
+from ..negotiation import NegotiatedRoute
+from ..prefetch import feed_prefetcher
+
+stats_router = APIRouter(
+    route_class=NegotiatedRoute,
+    prefix="/stats",
+    responses={
+        500: {"model": HTTPErrorModel, "description": HTTP_500_INTERNAL_SERVER_ERROR_DESC},
+    },
+)
+
+stats_tags = ["stats"]
+
+
+@stats_router.get(
+    "",
+    summary="Получить статистику процесса API",
+    status_code=200,
+    response_model=StatsOut,
+    response_description="Success",
+    tags=stats_tags,
+)
+async def get_stats(
+    auth_user: Annotated[models.User, Depends(get_authorized_user)],  # `auth_user` нужен, чтобы 401 срабатывал
+) -> StatsOut:
+    """Получить статистику кэшей процесса API, обработавшего запрос."""
+    return StatsOut(
+        result=True,
+        feed_cache=feed_cache.stats(),
+        tweet_fragment_cache=tweet_fragment_cache.stats(),
+        feed_prefetch=feed_prefetcher.stats(),
+        request_coalescing={route: flight.stats() for route, flight in request_flights.items()},
+    )
@@ -1,25 +1,88 @@
+import asyncio
+import json
 import os
+from collections.abc import AsyncIterator
+from datetime import datetime, timedelta
 from pathlib import Path as OsPath
-from typing import Annotated, Optional, Sequence
+from typing import Annotated, Any, Optional, Sequence, Union, cast
 
-from fastapi import APIRouter, Depends, Path, Query, Response
-from sqlalchemy import Select, and_, func, select, update
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Row, Select, and_, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import aliased, selectinload
+from sqlalchemy.orm import selectinload
 
-from ...db import models
+from ... import settings
+from ...db import events, models, repository
+from ...db.counters import change_author_affinity, change_like_count, forget_tweet_affinity, like_count_column
+from ...db.ranking import new_tweet_score
+from ...db.repository import TweetRecord, UserRecord, raw_repository_enabled
+from ...db.timelines import fan_out_tweet
+from ...settings import LIKES_PAGE_MAX_LIMIT, TWEETS_PAGE_MAX_LIMIT
 from ...shortcuts import get_object_or_none
 from ..auth import get_authorized_user
+from ..caches import FeedPage, feed_cache, tweet_fragment_cache
+from ..coalescing import request_flights
+from ..compression import compress, get_response_encoding
+from ..cursors import DeltaCursor, FeedKey, LikeCursor, TweetCursor
+from ..etags import content_versions, etag_matches, get_if_none_match, not_modified, with_etag
 from ..exceptions import (
     HTTP_403_FORBIDDEN_DESC,
     HTTP_500_INTERNAL_SERVER_ERROR_DESC,
     ForbiddenError,
+    InvalidCursorError,
     NotFoundError,
     http_exception,
 )
-from ..models import HTTPErrorModel, NewTweetIn, NewTweetOut, ResultModel, TweetListOut
+from ..feeds import (
+    chronological_page_stmt,
+    feed_author_ids,
+    feed_like_changes_stmt,
+    feed_new_tweets_stmt,
+    feed_page_stmt,
+)
+from ..fields import get_tweet_fields
+from ..json_feed import json_feed_enabled, stream_feed_json_response
+from ..likes import get_first_likers, get_liked_tweet_ids, likers_page_stmt
+from ..models import (
+    BaseUser,
+    CompactTweetListOut,
+    CompactTweetOut,
+    FeedOrder,
+    FeedShape,
+    HTTPErrorModel,
+    LikeCountOut,
+    LikersOut,
+    LikesMode,
+    NewTweetIn,
+    NewTweetOut,
+    NormalizedCompactTweetListOut,
+    NormalizedCompactTweetOut,
+    NormalizedTweetListOut,
+    NormalizedTweetOut,
+    ResultModel,
+    TweetDeltaOut,
+    TweetListOut,
+)
+from ..negotiation import NegotiatedRoute
+from ..personalized import personalized_page_stmt
+from ..prefetch import feed_prefetcher
+from ..recent_tweets import recent_tweets_cache
+from ..responses import FastJSONResponse, render_body, render_model, render_tweet_list
+from ..serializers import TweetListDTO, serialize_tweet, serialize_user
+from ..static import static_uri
+from ..streams import (
+    LIKES_MESSAGE,
+    RESET_MESSAGE,
+    TWEET_DELETED_MESSAGE,
+    TWEET_MESSAGE,
+    StreamMessage,
+    tweet_stream_hub,
+)
 
 tweets_router = APIRouter(
+    route_class=NegotiatedRoute,
     prefix="/tweets",
     responses={
         500: {"model": HTTPErrorModel, "description": HTTP_500_INTERNAL_SERVER_ERROR_DESC},
@@ -30,6 +93,9 @@ likes_tags = tweets_tags + ["likes"]
 
 TweetId = Annotated[int, Path(description="Id твита")]
 
+# страница ленты в любой из форм ответа
+FeedPageOut = Union[TweetListDTO, CompactTweetListOut, NormalizedTweetListOut, NormalizedCompactTweetListOut]
+
 
 async def get_tweet_or_none(
     db_session: Annotated[AsyncSession, Depends(models.db_session)], tweet_id: TweetId
@@ -47,6 +113,47 @@ async def get_tweet_or_404(
     return tweet
 
 
+async def get_tweet_cursor(
+    cursor: Optional[str] = Query(default=None, description="Курсор страницы из `next_cursor` предыдущей страницы"),
+) -> Optional[TweetCursor]:
+    """Возвращает курсор страницы ленты или возбуждает `422 Unprocessable Entity`, если курсор некорректен."""
+    if cursor is None:
+        return None
+
+    try:
+        return TweetCursor.decode(cursor)
+    except InvalidCursorError as ex:
+        raise http_exception(ex, status_code=422)
+
+
+async def get_delta_cursor(
+    since_cursor: Optional[str] = Query(
+        default=None, description="Курсор опроса ленты на изменения из `next_since_cursor` предыдущего опроса"
+    ),
+) -> Optional[DeltaCursor]:
+    """Возвращает курсор опроса ленты или возбуждает `422 Unprocessable Entity`, если курсор некорректен."""
+    if since_cursor is None:
+        return None
+
+    try:
+        return DeltaCursor.decode(since_cursor)
+    except InvalidCursorError as ex:
+        raise http_exception(ex, status_code=422)
+
+
+async def get_like_cursor(
+    cursor: Optional[str] = Query(default=None, description="Курсор страницы из `next_cursor` предыдущей страницы"),
+) -> Optional[LikeCursor]:
+    """Возвращает курсор страницы лайкнувших или возбуждает `422 Unprocessable Entity`, если курсор некорректен."""
+    if cursor is None:
+        return None
+
+    try:
+        return LikeCursor.decode(cursor)
+    except InvalidCursorError as ex:
+        raise http_exception(ex, status_code=422)
+
+
 async def get_like_or_none(
     db_session: Annotated[AsyncSession, Depends(models.db_session)],
     tweet: Annotated[models.Tweet, Depends(get_tweet_or_404)],
@@ -76,6 +183,7 @@ async def publish_new_tweet(
         new_tweet = models.Tweet(
             **new_tweet_body.dict(),
             user_id=auth_user.id,
+            score=new_tweet_score(),
         )
         db_session.add(new_tweet)
         await db_session.flush([new_tweet])
@@ -87,7 +195,13 @@ async def publish_new_tweet(
             .values(tweet_id=new_tweet.id)
         )
 
+        await fan_out_tweet(db_session, new_tweet.id, auth_user.id)
+        await db_session.execute(
+            events.publish(db_session, events.Event(events.TWEETS_CHANGED, auth_user.id, new_tweet.id))
+        )
+
         await db_session.commit()
+    recent_tweets_cache.invalidate(auth_user.id)
 
     return NewTweetOut(result=True, tweet_id=new_tweet.id)
 
@@ -122,9 +236,14 @@ async def delete_tweet(
         await db_session.refresh(tweet, attribute_names=["medias"])
         media_file_paths = [OsPath(media.rel_uri).resolve() for media in tweet.medias]
 
-        # удаляем твит
+        # удаляем твит, а лайки твита перестают приближать лайкнувших к автору
+        await forget_tweet_affinity(db_session, tweet.id, tweet.user_id)
         await db_session.delete(tweet)
+        await db_session.execute(
+            events.publish(db_session, events.Event(events.TWEETS_CHANGED, tweet.user_id, tweet.id))
+        )
         await db_session.commit()
+        recent_tweets_cache.invalidate(tweet.user_id)
 
         # удаляем медиа
         for file_path in media_file_paths:
@@ -151,7 +270,7 @@ async def delete_tweet(
 async def like_tweet(
     db_session: Annotated[AsyncSession, Depends(models.db_session)],
     auth_user: Annotated[models.User, Depends(get_authorized_user)],
-    tweet_id: TweetId,
+    tweet: Annotated[models.Tweet, Depends(get_tweet_or_404)],
     like: Annotated[Optional[models.Like], Depends(get_like_or_none)],
     response: Response,
 ) -> ResultModel:
@@ -161,9 +280,15 @@ async def like_tweet(
         response.status_code = 200
     else:
         # если не лайкал, то ставим лайк
-        new_like = models.Like(tweet_id=tweet_id, user_id=auth_user.id)
+        new_like = models.Like(tweet_id=tweet.id, user_id=auth_user.id)
         db_session.add(new_like)
+        await change_like_count(db_session, tweet.id, 1)
+        await change_author_affinity(db_session, auth_user.id, tweet.user_id, 1)
+        await db_session.execute(
+            events.publish(db_session, events.Event(events.LIKES_CHANGED, tweet.user_id, tweet.id))
+        )
         await db_session.commit()
+        recent_tweets_cache.change_like_count(tweet.user_id, tweet.id, 1)
 
     return ResultModel(result=True)
 
@@ -182,70 +307,820 @@ async def like_tweet(
 async def unlike_tweet(
     db_session: Annotated[AsyncSession, Depends(models.db_session)],
     auth_user: Annotated[models.User, Depends(get_authorized_user)],  # `auth_user` нужен, чтобы 401 срабатывал раньше
+    tweet: Annotated[models.Tweet, Depends(get_tweet_or_404)],
     like: Annotated[Optional[models.Like], Depends(get_like_or_none)],
 ) -> ResultModel:
     """Убрать лайк."""
     if like is not None:
         await db_session.delete(like)
+        await change_like_count(db_session, tweet.id, -1)
+        await change_author_affinity(db_session, auth_user.id, tweet.user_id, -1)
+        await db_session.execute(
+            events.publish(db_session, events.Event(events.LIKES_CHANGED, tweet.user_id, tweet.id))
+        )
         await db_session.commit()
+        recent_tweets_cache.change_like_count(tweet.user_id, tweet.id, -1)
 
     # если лайк отсутствует, то все равно возвращает `True`,
     # чтобы соблюсти идемпотентность метода DELETE
     return ResultModel(result=True)
 
 
+@tweets_router.get(
+    "/{tweet_id}/likes",
+    summary="Получить пользователей, лайкнувших твит",
+    status_code=200,
+    response_model=LikersOut,
+    response_description="Success",
+    responses={
+        404: {"model": HTTPErrorModel, "description": "Tweet Not Found"},
+    },
+    tags=likes_tags,
+)
+async def get_tweet_likes(
+    db_session: Annotated[AsyncSession, Depends(models.db_session)],
+    auth_user: Annotated[models.User, Depends(get_authorized_user)],  # `auth_user` нужен, чтобы 401 срабатывал раньше
+    tweet: Annotated[models.Tweet, Depends(get_tweet_or_404)],
+    cursor: Annotated[Optional[LikeCursor], Depends(get_like_cursor)],
+    limit: int = Query(
+        default=LIKES_PAGE_MAX_LIMIT,
+        description="Количество пользователей на странице",
+        ge=1,
+        le=LIKES_PAGE_MAX_LIMIT,
+    ),
+) -> LikersOut:
+    """Получить пользователей, лайкнувших твит, в порядке лайков."""
+    likers_qs = await db_session.execute(likers_page_stmt(tweet.id, cursor, limit))
+    likers = likers_qs.all()
+
+    next_cursor = LikeCursor(id=likers[-1].like_id).encode() if len(likers) == limit else None
+    return LikersOut(
+        result=True,
+        users=[BaseUser(id=liker.id, name=liker.nickname) for liker in likers],
+        next_cursor=next_cursor,
+    )
+
+
+def with_tweet_relations(stmt: Select) -> Select:
+    """
+    Добавляет в запрос твитов загрузку медиа, авторов и лайков.
+
+    :param stmt: запрос твитов.
+    """
+    return stmt.options(
+        selectinload(models.Tweet.medias),
+        selectinload(models.Tweet.user),
+        selectinload(models.Tweet.likes).options(selectinload(models.Like.user)),
+    )
+
+
+def next_page_cursor(tweets: Sequence[Any], limit: int, page_keys: Optional[Sequence[FeedKey]] = None) -> Optional[str]:
+    """
+    Возвращает курсор следующей страницы или `None`, если страница последняя.
+
+    :param tweets: твиты страницы в порядке ленты.
+    :param limit: количество твитов на странице.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+        Курсор такой страницы строится по ее последнему ключу, а не по твиту из БД.
+    """
+    if page_keys is not None:
+        return TweetCursor.of_key(page_keys[-1]).encode() if len(page_keys) == limit else None
+    if len(tweets) < limit:
+        return None
+
+    return TweetCursor.of(tweets[-1]).encode()
+
+
+async def get_tweet_fragments(db_session: AsyncSession, tweet_ids: Sequence[int]) -> dict[int, bytes]:
+    """
+    Возвращает JSON твитов из кэша `tweet_fragment_cache`. Твиты, которых нет в кэше,
+    загружаются из БД, сериализуются и сохраняются в кэш. Удаленных твитов в результате нет.
+
+    :param db_session: сессия с базой данных.
+    :param tweet_ids: id твитов.
+    """
+    token = tweet_fragment_cache.begin()
+    fragments: dict[int, bytes] = dict()
+    missing_ids: list[int] = list()
+    for tweet_id in tweet_ids:
+        fragment = tweet_fragment_cache.get(tweet_id) if tweet_fragment_cache.enabled else None
+        if fragment is None:
+            missing_ids.append(tweet_id)
+        else:
+            fragments[tweet_id] = fragment
+
+    if missing_ids:
+        tweets: Sequence[Union[models.Tweet, TweetRecord]]
+        if raw_repository_enabled():
+            tweets = await repository.get_tweets(db_session, missing_ids)
+        else:
+            # представление попадет в кэш надолго, поэтому твиты из сессии перечитываются
+            tweets_qs = await db_session.execute(
+                with_tweet_relations(select(models.Tweet).where(models.Tweet.id.in_(missing_ids))).execution_options(
+                    populate_existing=True
+                )
+            )
+            tweets = tweets_qs.scalars().all()
+
+        for tweet in tweets:
+            fragment = render_model(serialize_tweet(tweet))
+            if tweet_fragment_cache.enabled:
+                tweet_fragment_cache.set(token, tweet.id, fragment)
+            fragments[tweet.id] = fragment
+
+    return fragments
+
+
+async def render_fragments_page(
+    db_session: AsyncSession, stmt: Select, limit: int, page_keys: Optional[Sequence[FeedKey]] = None
+) -> Response:
+    """
+    Возвращает страницу ленты, собранную из JSON твитов из кэша `tweet_fragment_cache`.
+    Из БД загружаются и сериализуются только твиты, которых нет в кэше.
+
+    :param db_session: сессия с базой данных.
+    :param stmt: запрос страницы ленты.
+    :param limit: количество твитов на странице.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+    """
+    page_qs = await db_session.execute(
+        stmt.with_only_columns(models.Tweet.id, models.Tweet.like_count, models.Tweet.score, models.Tweet.posted_at)
+    )
+    page = page_qs.all()
+    fragments = await get_tweet_fragments(db_session, [row.id for row in page])
+
+    # твиты, удаленные между запросами, пропускаются
+    body = render_tweet_list(
+        [fragments[row.id] for row in page if row.id in fragments],
+        next_page_cursor(page, limit, page_keys),
+    )
+    return Response(content=body, media_type="application/json")
+
+
+async def load_tweets(db_session: AsyncSession, stmt: Select) -> Sequence[Union[models.Tweet, TweetRecord]]:
+    """
+    Возвращает твиты запроса с медиа, авторами и лайками.
+
+    :param db_session: сессия с базой данных.
+    :param stmt: запрос твитов.
+    """
+    if raw_repository_enabled():
+        tweet_ids_qs = await db_session.execute(stmt.with_only_columns(models.Tweet.id))
+        return await repository.get_tweets(db_session, tweet_ids_qs.scalars().all())
+
+    tweets_qs = await db_session.execute(with_tweet_relations(stmt))
+    return tweets_qs.scalars().all()
+
+
+async def load_compact_tweets(
+    db_session: AsyncSession, auth_user: models.User, stmt: Select
+) -> tuple[Sequence[models.Tweet], dict[int, list[BaseUser]], set[int]]:
+    """
+    Возвращает твиты запроса с медиа и авторами, но без лайков,
+    первых лайкнувших каждый твит и id твитов, лайкнутых пользователем.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param stmt: запрос твитов.
+    """
+    tweets_qs = await db_session.execute(
+        stmt.options(selectinload(models.Tweet.medias), selectinload(models.Tweet.user))
+    )
+    tweets = tweets_qs.scalars().all()
+
+    tweet_ids = [tweet.id for tweet in tweets]
+    first_likers = await get_first_likers(db_session, tweet_ids, settings.LIKES_PREVIEW_SIZE)
+    liked_tweet_ids = await get_liked_tweet_ids(db_session, auth_user.id, tweet_ids)
+    return tweets, first_likers, liked_tweet_ids
+
+
+async def render_compact_page(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    stmt: Select,
+    limit: int,
+    page_keys: Optional[Sequence[FeedKey]] = None,
+) -> CompactTweetListOut:
+    """
+    Возвращает страницу ленты с кратким представлением лайков твитов.
+    Лайки твитов целиком не загружаются, поэтому стоимость страницы не растет с популярностью твитов.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param stmt: запрос страницы ленты.
+    :param limit: количество твитов на странице.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+    """
+    tweets, first_likers, liked_tweet_ids = await load_compact_tweets(db_session, auth_user, stmt)
+    return CompactTweetListOut(
+        result=True,
+        tweets=[
+            CompactTweetOut(
+                id=tweet.id,
+                content=tweet.content,
+                user=BaseUser.from_orm(tweet.user),
+                medias=tweet_attachments(tweet),
+                like_count=tweet.like_count,
+                liked_by_me=tweet.id in liked_tweet_ids,
+                first_likers=first_likers.get(tweet.id, list()),
+            )
+            for tweet in tweets
+        ],
+        next_cursor=next_page_cursor(tweets, limit, page_keys),
+    )
+
+
+def tweet_attachments(tweet: Union[models.Tweet, TweetRecord]) -> list[str]:
+    """
+    Возвращает URI медиа, прикрепленных к твиту.
+
+    :param tweet: твит.
+    """
+    if isinstance(tweet, TweetRecord):
+        return [static_uri(rel_uri) for rel_uri in tweet.medias]
+    return [static_uri(media.rel_uri) for media in tweet.medias]
+
+
+async def render_normalized_page(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    stmt: Select,
+    limit: int,
+    likes: LikesMode,
+    page_keys: Optional[Sequence[FeedKey]] = None,
+) -> Union[NormalizedTweetListOut, NormalizedCompactTweetListOut]:
+    """
+    Возвращает страницу ленты, в которой твиты ссылаются на пользователей по id,
+    а каждый пользователь страницы сериализуется один раз в справочник `users`.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param stmt: запрос страницы ленты.
+    :param limit: количество твитов на странице.
+    :param likes: режим представления лайков твитов.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+    """
+    users: dict[int, BaseUser] = dict()
+
+    def user_ref(user: Union[models.User, UserRecord, BaseUser]) -> int:
+        if user.id not in users:
+            users[user.id] = BaseUser(id=user.id, name=user.nickname)
+        return user.id
+
+    if likes == LikesMode.compact:
+        compact_tweets, first_likers, liked_tweet_ids = await load_compact_tweets(db_session, auth_user, stmt)
+        return NormalizedCompactTweetListOut(
+            result=True,
+            tweets=[
+                NormalizedCompactTweetOut(
+                    id=tweet.id,
+                    content=tweet.content,
+                    author_id=user_ref(tweet.user),
+                    medias=tweet_attachments(tweet),
+                    like_count=tweet.like_count,
+                    liked_by_me=tweet.id in liked_tweet_ids,
+                    first_likers=[user_ref(liker) for liker in first_likers.get(tweet.id, list())],
+                )
+                for tweet in compact_tweets
+            ],
+            users=users,
+            next_cursor=next_page_cursor(compact_tweets, limit, page_keys),
+        )
+
+    tweets = await load_tweets(db_session, stmt)
+    return NormalizedTweetListOut(
+        result=True,
+        tweets=[
+            NormalizedTweetOut(
+                id=tweet.id,
+                content=tweet.content,
+                author_id=user_ref(tweet.user),
+                medias=tweet_attachments(tweet),
+                likes=[
+                    user_ref(liker)
+                    for liker in (tweet.likes if isinstance(tweet, TweetRecord) else tweet.liked_by_users)
+                ],
+            )
+            for tweet in tweets
+        ],
+        users=users,
+        next_cursor=next_page_cursor(tweets, limit, page_keys),
+    )
+
+
+async def render_sparse_page(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    stmt: Select,
+    limit: int,
+    likes: LikesMode,
+    fields: frozenset[str],
+    page_keys: Optional[Sequence[FeedKey]] = None,
+) -> Response:
+    """
+    Возвращает страницу ленты, в твитах которой только запрошенные поля.
+    Медиа, авторы и лайки твитов загружаются из БД, только если они попали в поля.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param stmt: запрос страницы ленты.
+    :param limit: количество твитов на странице.
+    :param likes: режим представления лайков твитов.
+    :param fields: поля твитов.
+    :param page_keys: ключи сортировки твитов страницы, собранной в памяти, или `None`.
+    """
+    compact = likes == LikesMode.compact
+    options = list()
+    if "attachments" in fields:
+        options.append(selectinload(models.Tweet.medias))
+    if "author" in fields:
+        options.append(selectinload(models.Tweet.user))
+    if "likes" in fields and not compact:
+        options.append(selectinload(models.Tweet.likes).options(selectinload(models.Like.user)))
+
+    tweets_qs = await db_session.execute(stmt.options(*options))
+    tweets = tweets_qs.scalars().all()
+
+    tweet_ids = [tweet.id for tweet in tweets]
+    first_likers: dict[int, list[BaseUser]] = dict()
+    if compact and "first_likers" in fields:
+        first_likers = await get_first_likers(db_session, tweet_ids, settings.LIKES_PREVIEW_SIZE)
+    liked_tweet_ids: set[int] = set()
+    if compact and "liked_by_me" in fields:
+        liked_tweet_ids = await get_liked_tweet_ids(db_session, auth_user.id, tweet_ids)
+
+    rendered_tweets = list()
+    for tweet in tweets:
+        rendered: dict[str, Any] = {"id": tweet.id}
+        if "content" in fields:
+            rendered["content"] = tweet.content
+        if "author" in fields:
+            rendered["author"] = serialize_user(tweet.user)
+        if "attachments" in fields:
+            rendered["attachments"] = tweet_attachments(tweet)
+        if compact:
+            if "like_count" in fields:
+                rendered["like_count"] = tweet.like_count
+            if "liked_by_me" in fields:
+                rendered["liked_by_me"] = tweet.id in liked_tweet_ids
+            if "first_likers" in fields:
+                rendered["first_likers"] = first_likers.get(tweet.id, list())
+        elif "likes" in fields:
+            rendered["likes"] = [serialize_user(like.user) for like in tweet.likes]
+        rendered_tweets.append(rendered)
+
+    return FastJSONResponse(
+        {"result": True, "tweets": rendered_tweets, "next_cursor": next_page_cursor(tweets, limit, page_keys)}
+    )
+
+
+async def render_feed_page(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+    likes: LikesMode,
+    shape: FeedShape,
+    fields: Optional[frozenset[str]],
+    order: FeedOrder = FeedOrder.ranked,
+) -> Union[Response, FeedPageOut]:
+    """
+    Возвращает страницу ленты пользователя.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    :param likes: режим представления лайков твитов.
+    :param shape: форма ответа.
+    :param fields: поля твитов или `None`, если нужны все поля.
+    :param order: порядок ленты.
+    """
+    stmt: Select
+    # ключи страницы, собранной в памяти: курсор строится по ним, а не по твитам из БД
+    page_keys: Optional[list[FeedKey]] = None
+    if order == FeedOrder.personalized:
+        stmt = await personalized_page_stmt(db_session, auth_user, cursor, offset, limit)
+    elif order == FeedOrder.chronological:
+        stmt = chronological_page_stmt(auth_user, cursor, offset, limit)
+    else:
+        stmt, page_keys = await feed_page_stmt(db_session, auth_user, cursor, offset, limit)
+
+    if shape == FeedShape.normalized:
+        return await render_normalized_page(db_session, auth_user, stmt, limit, likes, page_keys)
+    if fields is not None:
+        return await render_sparse_page(db_session, auth_user, stmt, limit, likes, fields, page_keys)
+    if likes == LikesMode.compact:
+        return await render_compact_page(db_session, auth_user, stmt, limit, page_keys)
+
+    if json_feed_enabled() and order != FeedOrder.personalized:
+        # JSON собирается в БД и отдается клиенту без загрузки твитов в ORM.
+        # Запрос JSON сортирует твиты по ключам ленты, поэтому персональная лента собирается иначе
+        return StreamingResponse(
+            stream_feed_json_response(stmt, limit, order, page_keys), media_type="application/json"
+        )
+
+    if tweet_fragment_cache.enabled:
+        return await render_fragments_page(db_session, stmt, limit, page_keys)
+
+    tweets = await load_tweets(db_session, stmt)
+    return TweetListDTO(True, serialize_tweet.many(tweets), next_page_cursor(tweets, limit, page_keys))
+
+
+async def render_feed_delta(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    since_id: int,
+    since_cursor: Optional[DeltaCursor],
+    limit: int,
+) -> TweetDeltaOut:
+    """
+    Возвращает изменения ленты пользователя с предыдущего опроса:
+    новые твиты и количество лайков уже полученных твитов, если оно изменилось.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param since_id: id последнего твита, который уже есть у клиента. Игнорируется, если передан курсор.
+    :param since_cursor: курсор предыдущего опроса.
+    :param limit: максимальное количество новых твитов.
+    """
+    # время начала транзакции в БД (как у `now()` в умолчаниях колонок), а не часы процесса API
+    polled_at: datetime = await db_session.scalar(select(func.localtimestamp()))
+
+    changed_after = None
+    if since_cursor is not None:
+        since_id = since_cursor.id
+        changed_after = since_cursor.at - timedelta(seconds=settings.FEED_DELTA_OVERLAP)
+
+    tweets = await load_tweets(db_session, feed_new_tweets_stmt(auth_user, since_id, changed_after).limit(limit))
+
+    likes: Sequence[Row] = list()
+    if changed_after is not None:
+        likes_qs = await db_session.execute(feed_like_changes_stmt(auth_user, since_id, changed_after))
+        likes = likes_qs.all()
+
+    if len(tweets) == limit and since_cursor is not None:
+        # вернулись не все новые твиты, поэтому следующий опрос продолжит с последнего
+        # из них, а изменения лайков снова будут искаться с момента предыдущего опроса
+        polled_at = since_cursor.at
+
+    return TweetDeltaOut(
+        result=True,
+        tweets=serialize_tweet.many(tweets),
+        likes=likes,
+        next_since_cursor=DeltaCursor(id=max([since_id, *(tweet.id for tweet in tweets)]), at=polled_at).encode(),
+    )
+
+
+def feed_page_key(
+    user_id: int,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+    likes: LikesMode,
+    shape: FeedShape,
+    fields: Optional[frozenset[str]],
+    order: FeedOrder,
+) -> tuple:
+    """Возвращает ключ страницы ленты пользователя в кэше страниц."""
+    if cursor is not None:
+        return (user_id, cursor.encode(), None, limit, likes, shape, fields, order)
+    return (user_id, None, offset, limit, likes, shape, fields, order)
+
+
+async def render_feed_page_body(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+    likes: LikesMode,
+    shape: FeedShape,
+    fields: Optional[frozenset[str]],
+    order: FeedOrder,
+) -> FeedPage:
+    """
+    Возвращает страницу ленты пользователя в том виде, в каком ее отправил бы FastAPI,
+    вместе с курсором следующей страницы.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    :param likes: режим представления лайков твитов.
+    :param shape: форма ответа.
+    :param fields: поля твитов или `None`, если нужны все поля.
+    :param order: порядок ленты.
+    """
+    page = await render_feed_page(db_session, auth_user, cursor, offset, limit, likes, shape, fields, order)
+    body = await render_body(page)
+    if isinstance(page, Response):
+        # JSON страницы уже собран (в БД или из JSON твитов), поэтому курсор читается из него один раз
+        return FeedPage(body, orjson.loads(body)["next_cursor"])
+    return FeedPage(body, page.next_cursor)
+
+
+async def prefetch_feed_page(
+    auth_user: models.User,
+    cursor: TweetCursor,
+    limit: int,
+    likes: LikesMode,
+    shape: FeedShape,
+    fields: Optional[frozenset[str]],
+    order: FeedOrder,
+) -> None:
+    """
+    Загружает заранее следующую страницу ленты пользователя. Выполняется в фоне после ответа
+    в отдельной сессии с БД, которая открывается, только если загрузку можно запустить.
+
+    :param auth_user: владелец ленты.
+    :param cursor: курсор следующей страницы.
+    :param limit: количество твитов на странице.
+    :param likes: режим представления лайков твитов.
+    :param shape: форма ответа.
+    :param fields: поля твитов или `None`, если нужны все поля.
+    :param order: порядок ленты.
+    """
+
+    async def render_page() -> tuple[list[int], FeedPage]:
+        async with models.Session(bind=models.engine) as db_session:
+            author_ids = await feed_author_ids(db_session, auth_user)
+            page = await render_feed_page_body(db_session, auth_user, cursor, None, limit, likes, shape, fields, order)
+            return author_ids, page
+
+    await feed_prefetcher.prefetch(
+        auth_user.id, feed_page_key(auth_user.id, cursor, None, limit, likes, shape, fields, order), render_page
+    )
+
+
+async def get_feed_page(
+    db_session: AsyncSession,
+    auth_user: models.User,
+    cursor: Optional[TweetCursor],
+    offset: Optional[int],
+    limit: int,
+    likes: LikesMode,
+    shape: FeedShape,
+    fields: Optional[frozenset[str]],
+    encoding: Optional[str] = None,
+    order: FeedOrder = FeedOrder.ranked,
+    background_tasks: Optional[BackgroundTasks] = None,
+) -> Union[Response, FeedPageOut]:
+    """
+    Возвращает страницу ленты пользователя из кэша страниц или рендерит ее,
+    объединяя одновременные одинаковые запросы.
+
+    Если клиент принимает сжатие, страница отдается сжатой, а сжатый вариант хранится
+    в кэше вместе со страницей, поэтому повторные запросы не сжимают ее заново.
+
+    Если включена загрузка заранее, страница сначала ищется среди загруженных заранее,
+    а после ответа в фоне загружается следующая страница.
+
+    :param db_session: сессия с базой данных.
+    :param auth_user: владелец ленты.
+    :param cursor: курсор страницы.
+    :param offset: номер страницы. Игнорируется, если передан курсор.
+    :param limit: количество твитов на странице.
+    :param likes: режим представления лайков твитов.
+    :param shape: форма ответа.
+    :param fields: поля твитов или `None`, если нужны все поля.
+    :param encoding: кодировка сжатия, которую принимает клиент, или `None`, если страница отдается несжатой.
+    :param order: порядок ленты.
+    :param background_tasks: фоновые задачи ответа, в которых загружается следующая страница.
+    """
+    flight = request_flights["get_tweets"]
+    if not feed_cache.enabled and not flight.enabled and not feed_prefetcher.enabled:
+        return await render_feed_page(db_session, auth_user, cursor, offset, limit, likes, shape, fields, order)
+
+    page_key = feed_page_key(auth_user.id, cursor, offset, limit, likes, shape, fields, order)
+
+    async def render_page() -> FeedPage:
+        token = feed_cache.begin()
+        page = await render_feed_page_body(db_session, auth_user, cursor, offset, limit, likes, shape, fields, order)
+        if feed_cache.enabled:
+            feed_cache.set(token, page_key, auth_user.id, await feed_author_ids(db_session, auth_user), page)
+        return page
+
+    page = await feed_prefetcher.take(auth_user.id, page_key) if feed_prefetcher.enabled else None
+    if page is None and feed_cache.enabled:
+        page = feed_cache.get(page_key)
+    if page is None:
+        page = await flight.do(page_key, render_page)
+
+    if feed_prefetcher.enabled and background_tasks is not None and page.next_cursor is not None:
+        background_tasks.add_task(
+            prefetch_feed_page, auth_user, TweetCursor.decode(page.next_cursor), limit, likes, shape, fields, order
+        )
+
+    body = page.body
+    if encoding is not None and len(body) >= settings.RESPONSE_COMPRESSION_MIN_SIZE:
+        return Response(
+            content=feed_cache.encode(page_key, body, encoding, compress),
+            media_type="application/json",
+            headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"},
+        )
+    return Response(content=body, media_type="application/json")
+
+
 @tweets_router.get(
     "",
     summary="Получить ленту твитов пользователя",
     status_code=200,
-    response_model=TweetListOut,
+    # модели с обязательными полями первые: у страницы ленты нет обязательных `next_since_cursor`,
+    # `users` и `liked_by_me`, а модель страницы приняла бы остальные ответы, отбросив их поля
+    response_model=Union[
+        TweetDeltaOut, NormalizedCompactTweetListOut, NormalizedTweetListOut, CompactTweetListOut, TweetListOut
+    ],
     response_description="Success",
+    responses={
+        304: {"description": "Not Modified"},
+    },
     tags=tweets_tags,
 )
 async def get_tweets(
     db_session: Annotated[AsyncSession, Depends(models.db_session)],
     auth_user: Annotated[models.User, Depends(get_authorized_user)],
-    offset: Optional[int] = Query(default=None, description="Номер страницы", ge=1),
-    limit: Optional[int] = Query(default=None, description="Количество твитов на странице", ge=1),
-) -> TweetListOut:
-    """Получить ленту твитов пользователя."""
-    await db_session.refresh(auth_user, attribute_names=["followings"])
-
-    user_ids = [auth_user.id]
-    user_ids.extend([followed_user.user_id for followed_user in auth_user.followings])
-
-    tweet_author = aliased(models.User)
-    tweet_like = aliased(models.Like)
-    liker = aliased(models.User)
-
-    stmt: Select = (
-        select(models.Tweet)
-        .join(tweet_author, tweet_author.id == models.Tweet.user_id)
-        .join(tweet_like, tweet_like.tweet_id == models.Tweet.id, isouter=True)
-        .join(liker, liker.id == tweet_like.user_id, isouter=True)
-        .where(models.Tweet.user_id.in_(user_ids))
-        .group_by(models.Tweet.id)
-    )
-    if offset is not None and limit is not None:
-        stmt = stmt.offset((offset - 1) * limit)  # type: ignore[operator]
-    if limit is not None:
-        stmt = stmt.limit(limit)
-    stmt = stmt.order_by(
-        func.count(tweet_like.id).desc(),
-        models.Tweet.posted_at.desc(),
-    )
+    cursor: Annotated[Optional[TweetCursor], Depends(get_tweet_cursor)],
+    since_cursor: Annotated[Optional[DeltaCursor], Depends(get_delta_cursor)],
+    if_none_match: Annotated[Optional[str], Depends(get_if_none_match)],
+    fields: Annotated[Optional[frozenset[str]], Depends(get_tweet_fields)],
+    encoding: Annotated[Optional[str], Depends(get_response_encoding)],
+    response: Response,
+    background_tasks: BackgroundTasks,
+    offset: Optional[int] = Query(
+        default=None, description="Номер страницы. Игнорируется, если передан курсор `cursor`", ge=1
+    ),
+    limit: int = Query(
+        default=TWEETS_PAGE_MAX_LIMIT, description="Количество твитов на странице", ge=1, le=TWEETS_PAGE_MAX_LIMIT
+    ),
+    since_id: Optional[int] = Query(
+        default=None,
+        description="Id последнего полученного твита. Если передан (или передан `since_cursor`), "
+        "возвращаются только изменения ленты после него",
+        ge=0,
+    ),
+    likes: LikesMode = Query(
+        default=LikesMode.full,
+        description="Представление лайков твитов: `full` - все лайкнувшие, `compact` - количество лайков, "
+        "лайк пользователя и первые лайкнувшие. Игнорируется при опросе изменений ленты",
+    ),
+    shape: FeedShape = Query(
+        default=FeedShape.nested,
+        description="Форма ответа: `nested` - пользователи вложены в твиты, `normalized` - твиты ссылаются "
+        "на пользователей по id из справочника `users`. Игнорируется при опросе изменений ленты",
+    ),
+    order: FeedOrder = Query(
+        default=FeedOrder.ranked,
+        description="Порядок ленты: `ranked` - по рейтингу твитов, `personalized` - по лайкам, возрасту твитов "
+        "и тому, сколько твитов их авторов лайкнул пользователь, `chronological` - от новых твитов к старым. "
+        "Игнорируется при опросе изменений ленты",
+    ),
+) -> Union[Response, FeedPageOut, TweetDeltaOut]:
+    """Получить ленту твитов пользователя или ее изменения с предыдущего опроса."""
 
-    tweets_qs = await db_session.execute(
-        stmt.options(
-            selectinload(models.Tweet.medias),
-            selectinload(models.Tweet.user),
-            selectinload(models.Tweet.likes).options(selectinload(models.Like.user)),
+    async def get_result() -> Union[Response, FeedPageOut, TweetDeltaOut]:
+        if since_id is not None or since_cursor is not None:
+            return await render_feed_delta(db_session, auth_user, since_id or 0, since_cursor, limit)
+        return await get_feed_page(
+            db_session, auth_user, cursor, offset, limit, likes, shape, fields, encoding, order, background_tasks
         )
+
+    if not content_versions.enabled:
+        return await get_result()
+
+    # версия читается до рендеринга, поэтому изменения во время рендеринга попадут в следующую версию
+    etag = content_versions.etag(
+        content_versions.feed_version(auth_user.id, await feed_author_ids(db_session, auth_user))
     )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    tweets: Sequence[models.Tweet] = tweets_qs.scalars().all()
+    return with_etag(await get_result(), response, etag)
 
-    return TweetListOut(
-        result=True,
-        tweets=tweets,
+
+async def render_stream_message(db_session: AsyncSession, ev: events.Event) -> Optional[StreamMessage]:
+    """
+    Возвращает сообщение потока твитов о событии твита или лайка
+    или `None`, если твита уже нет.
+
+    :param db_session: сессия с базой данных.
+    :param ev: событие с id твита.
+    """
+    tweet_id = cast(int, ev.tweet_id)
+    message: Optional[StreamMessage] = None
+    if ev.kind == events.TWEETS_CHANGED:
+        fragments = await get_tweet_fragments(db_session, [tweet_id])
+        if tweet_id in fragments:
+            message = StreamMessage(TWEET_MESSAGE, fragments[tweet_id])
+        else:
+            message = StreamMessage(TWEET_DELETED_MESSAGE, json.dumps({"id": tweet_id}).encode())
+    else:
+        like_count_qs = await db_session.execute(
+            select(models.Tweet.id, like_count_column().label("like_count")).where(models.Tweet.id == tweet_id)
+        )
+        like_count = like_count_qs.first()
+        if like_count is not None:
+            message = StreamMessage(LIKES_MESSAGE, render_model(LikeCountOut.from_orm(like_count)))
+    return message
+
+
+async def render_hub_message(ev: events.Event) -> Optional[StreamMessage]:
+    """
+    Рендерит сообщение потока твитов для хаба `tweet_stream_hub` в отдельной сессии с БД.
+    Сообщение рендерится один раз для всех подписчиков, поэтому сессия одного из них не используется.
+
+    :param ev: событие с id твита.
+    """
+    async with models.Session(bind=models.engine) as db_session:
+        return await render_stream_message(db_session, ev)
+
+
+async def stream_feed_events(auth_user: models.User, last_seq: Optional[int]) -> AsyncIterator[bytes]:
+    """
+    Генерирует сообщения потока твитов пользователя о событиях после события `last_seq`.
+
+    Поток читается после выхода из обработчика запроса и открыт долго,
+    поэтому у него своя сессия с БД, которая не удерживает соединение между сообщениями.
+
+    Поток завершается через `TWEET_STREAM_MAX_DURATION` секунд, после чего клиент
+    переподключается с `Last-Event-ID` и продолжает поток с того же места.
+
+    :param auth_user: владелец ленты.
+    :param last_seq: номер последнего полученного клиентом события или `None`,
+        если неизвестно, какие события клиент пропустил.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.TWEET_STREAM_MAX_DURATION
+
+    user_id = auth_user.id
+    async with models.Session(bind=models.engine) as db_session:
+        author_ids = set(await feed_author_ids(db_session, auth_user))
+        await db_session.commit()
+
+        seq = tweet_stream_hub.last_seq
+        entries = tweet_stream_hub.entries_after(last_seq) if last_seq is not None else None
+        while True:
+            if entries is None:
+                # события, пропущенные клиентом, уже забыты, поэтому клиент перечитывает ленту
+                seq = tweet_stream_hub.last_seq
+                yield StreamMessage(RESET_MESSAGE, b"{}").encode(tweet_stream_hub.event_id(seq))
+                entries = list()
+
+            for entry in entries:
+                seq = entry.seq
+                ev = entry.event
+                if ev.kind == events.EVENTS_RESET or (ev.kind == events.FOLLOWINGS_CHANGED and ev.user_id == user_id):
+                    author_ids = set(await feed_author_ids(db_session, auth_user))
+                    await db_session.commit()
+                    if ev.kind == events.EVENTS_RESET:
+                        yield StreamMessage(RESET_MESSAGE, b"{}").encode(tweet_stream_hub.event_id(seq))
+                elif ev.kind != events.FOLLOWINGS_CHANGED and ev.user_id in author_ids:
+                    message = await tweet_stream_hub.message(entry, render_hub_message)
+                    if message is not None:
+                        yield message.encode(tweet_stream_hub.event_id(seq))
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            await tweet_stream_hub.wait(seq, min(timeout, settings.TWEET_STREAM_HEARTBEAT_INTERVAL))
+            if tweet_stream_hub.last_seq == seq:
+                yield b": ping\n\n"
+            entries = tweet_stream_hub.entries_after(seq)
+
+
+@tweets_router.get(
+    "/stream",
+    summary="Получить поток новых твитов и лайков ленты",
+    status_code=200,
+    response_class=StreamingResponse,
+    response_description="Поток Server-Sent Events: `tweet`, `tweet_deleted`, `likes`, `reset`",
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        404: {"model": HTTPErrorModel, "description": "Tweet Stream Disabled"},
+    },
+    tags=tweets_tags,
+)
+async def stream_tweets(
+    auth_user: Annotated[models.User, Depends(get_authorized_user)],
+    last_event_id: Optional[str] = Header(default=None, description="Id последнего полученного сообщения потока"),
+) -> StreamingResponse:
+    """
+    Поток новых твитов и изменений лайков ленты пользователя (Server-Sent Events).
+
+    Сообщения: `tweet` - опубликован твит (данные как у твита ленты), `tweet_deleted` - твит удален,
+    `likes` - изменилось количество лайков твита, `reset` - сообщения могли быть пропущены,
+    и ленту нужно перечитать.
+    """
+    if not tweet_stream_hub.enabled:
+        raise http_exception(NotFoundError("tweet stream is disabled"), status_code=404)
+
+    seq = tweet_stream_hub.last_seq if last_event_id is None else tweet_stream_hub.parse_event_id(last_event_id)
+    return StreamingResponse(
+        stream_feed_events(auth_user, seq),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -1,4 +1,4 @@
-from typing import Annotated, Optional, Union
+from typing import Annotated, Any, Optional, Union, cast
 
 from fastapi import APIRouter, Depends, Path, Response
 from fastapi.responses import RedirectResponse
@@ -6,9 +6,13 @@ from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from ...db import models
+from ...db import events, models, repository
+from ...db.repository import UserWithFollowersRecord, raw_repository_enabled
+from ...db.timelines import follow_author, unfollow_author
 from ...shortcuts import get_object_or_none
 from ..auth import get_authorized_user
+from ..coalescing import request_flights
+from ..etags import content_versions, etag_matches, get_if_none_match, not_modified, with_etag
 from ..exceptions import (
     HTTP_406_NOT_ACCEPTABLE_DESC,
     HTTP_500_INTERNAL_SERVER_ERROR_DESC,
@@ -16,9 +20,14 @@ from ..exceptions import (
     NotFoundError,
     http_exception,
 )
+from ..fields import get_user_fields
 from ..models import HTTPErrorModel, ResultModel, UserResultOut
+from ..negotiation import NegotiatedRoute
+from ..responses import FastJSONResponse
+from ..serializers import UserResultDTO, serialize_user, serialize_user_with_followers
 
 users_router = APIRouter(
+    route_class=NegotiatedRoute,
     prefix="/users",
     responses={
         500: {"model": HTTPErrorModel, "description": HTTP_500_INTERNAL_SERVER_ERROR_DESC},
@@ -32,30 +41,35 @@ UserId = Annotated[int, Path(description="Id пользователя")]
 
 
 class UserGetter:
-    def __init__(self, full_user: bool = False, raise_404: bool = False):
+    def __init__(self, full_user: bool = False, raise_404: bool = False, fields: Optional[frozenset[str]] = None):
         """
         Получатель пользователя.
 
         :param full_user: получить все данные о пользователе.
         :param raise_404: возбуждать `404 Not Found` или нет.
+        :param fields: поля пользователя. Если переданы, вместе с пользователем
+            загружаются только подписчики и подписки, попавшие в поля.
         """
         self._full_user = full_user
         self._raise_404 = raise_404
+        self._fields = fields
 
     async def __call__(
         self, db_session: Annotated[AsyncSession, Depends(models.db_session)], user_id: UserId
-    ) -> Optional[models.User]:
+    ) -> Optional[Union[models.User, UserWithFollowersRecord]]:
+        user: Optional[Union[models.User, UserWithFollowersRecord]]
         if not self._full_user:
             user = await get_object_or_none(db_session, models.User, models.User.id == user_id)
+        elif raw_repository_enabled() and self._fields is None:
+            user = await repository.get_user_with_followers(db_session, user_id)
         else:
-            user_qs = await db_session.execute(
-                select(models.User)
-                .where(models.User.id == user_id)
-                .options(
-                    selectinload(models.User.followers).options(selectinload(models.Follower.follower)),
-                    selectinload(models.User.followings).options(selectinload(models.Follower.user)),
-                )
-            )
+            options = list()
+            if self._fields is None or "followers" in self._fields:
+                options.append(selectinload(models.User.followers).options(selectinload(models.Follower.follower)))
+            if self._fields is None or "following" in self._fields:
+                options.append(selectinload(models.User.followings).options(selectinload(models.Follower.user)))
+
+            user_qs = await db_session.execute(select(models.User).where(models.User.id == user_id).options(*options))
             user = user_qs.scalar_one_or_none()
 
         if self._raise_404 and user is None:
@@ -63,6 +77,24 @@ class UserGetter:
         return user
 
 
+def render_user_fields(user: models.User, fields: frozenset[str]) -> Response:
+    """
+    Возвращает профиль пользователя, в котором только запрошенные поля.
+
+    :param user: пользователь, загруженный `UserGetter` с теми же полями.
+    :param fields: поля пользователя.
+    """
+    rendered: dict[str, Any] = {"id": user.id}
+    if "name" in fields:
+        rendered["name"] = user.nickname
+    if "followers" in fields:
+        rendered["followers"] = [serialize_user(follower.follower) for follower in user.followers]
+    if "following" in fields:
+        rendered["following"] = [serialize_user(following.user) for following in user.followings]
+
+    return FastJSONResponse({"result": True, "user": rendered})
+
+
 async def get_following_or_none(
     db_session: Annotated[AsyncSession, Depends(models.db_session)],
     auth_user: Annotated[models.User, Depends(get_authorized_user)],
@@ -82,19 +114,34 @@ async def get_following_or_none(
     status_code=200,
     response_model=UserResultOut,
     response_description="Success",
+    responses={
+        304: {"description": "Not Modified"},
+    },
     tags=users_tags,
 )
 async def get_me(
     db_session: Annotated[AsyncSession, Depends(models.db_session)],
     auth_user: Annotated[models.User, Depends(get_authorized_user)],
-) -> UserResultOut:
+    if_none_match: Annotated[Optional[str], Depends(get_if_none_match)],
+    fields: Annotated[Optional[frozenset[str]], Depends(get_user_fields)],
+    response: Response,
+) -> Union[Response, UserResultDTO]:
     """Получить собственный профиль пользователя."""
-    user_getter = UserGetter(full_user=True, raise_404=True)
+    etag = content_versions.etag(content_versions.profile_version(auth_user.id))
+    if content_versions.enabled and etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    return UserResultOut(
-        result=True,
-        user=await user_getter(db_session, auth_user.id),
-    )
+    user_getter = UserGetter(full_user=True, raise_404=True, fields=fields)
+
+    async def get_profile() -> Union[Response, UserResultDTO]:
+        user = await user_getter(db_session, auth_user.id)
+        if fields is not None:
+            # с полями пользователь загружается через ORM, а отсутствие пользователя - это 404
+            return render_user_fields(cast(models.User, user), fields)
+        return UserResultDTO(True, serialize_user_with_followers(user))
+
+    result = await request_flights["get_me"].do((auth_user.id, fields), get_profile)
+    return with_etag(result, response, etag) if content_versions.enabled else result
 
 
 @users_router.get(
@@ -104,24 +151,38 @@ async def get_me(
     response_model=UserResultOut,
     response_description="Success",
     responses={
+        304: {"description": "Not Modified"},
         308: {"description": "Permanent Redirect"},
         404: {"model": HTTPErrorModel, "description": "User Not Found"},
     },
     tags=users_tags,
 )
 async def get_user(
+    db_session: Annotated[AsyncSession, Depends(models.db_session)],
     auth_user: Annotated[models.User, Depends(get_authorized_user)],  # `auth_user` нужен, чтобы 401 срабатывал раньше
-    user: Annotated[models.User, Depends(UserGetter(full_user=True, raise_404=True))],
+    user: Annotated[models.User, Depends(UserGetter(raise_404=True))],
     user_id: UserId,
-) -> Union[RedirectResponse, UserResultOut]:
+    if_none_match: Annotated[Optional[str], Depends(get_if_none_match)],
+    fields: Annotated[Optional[frozenset[str]], Depends(get_user_fields)],
+    response: Response,
+) -> Union[Response, UserResultDTO]:
     """Получить профиль пользователя."""
     if user_id == auth_user.id:
         return RedirectResponse("/api" + users_router.url_path_for(get_me.__name__), status_code=308)
 
-    return UserResultOut(
-        result=True,
-        user=user,
-    )
+    # подписчики и подписки загружаются, только если профиль изменился
+    etag = content_versions.etag(content_versions.profile_version(user.id))
+    if content_versions.enabled and etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    user_getter = UserGetter(full_user=True, raise_404=True, fields=fields)
+    full_user = await user_getter(db_session, user.id)
+    result: Union[Response, UserResultDTO]
+    if fields is not None:
+        result = render_user_fields(cast(models.User, full_user), fields)
+    else:
+        result = UserResultDTO(True, serialize_user_with_followers(full_user))
+    return with_etag(result, response, etag) if content_versions.enabled else result
 
 
 @users_router.post(
@@ -155,6 +216,14 @@ async def follow_user(
         # подписываем одного пользователя на другого
         following = models.Follower(user_id=user_id, follower_id=auth_user.id)
         db_session.add(following)
+        await follow_author(db_session, auth_user.id, user_id)
+        await db_session.execute(
+            events.publish(
+                db_session,
+                events.Event(events.FOLLOWINGS_CHANGED, auth_user.id),
+                events.Event(events.FOLLOWERS_CHANGED, user_id),
+            )
+        )
         await db_session.commit()
 
     return ResultModel(result=True)
@@ -178,6 +247,14 @@ async def unfollow_user(
     """Отписаться от пользователя."""
     if following is not None:
         await db_session.delete(following)
+        await unfollow_author(db_session, following.follower_id, following.user_id)
+        await db_session.execute(
+            events.publish(
+                db_session,
+                events.Event(events.FOLLOWINGS_CHANGED, following.follower_id),
+                events.Event(events.FOLLOWERS_CHANGED, following.user_id),
+            )
+        )
         await db_session.commit()
 
     return ResultModel(result=True)
@@ -0,0 +1,173 @@
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Generic, Optional, TypeVar, Union
+
+from ..db import models as db_models
+from ..db.repository import TweetRecord, UserRecord, UserWithFollowersRecord
+from .static import static_uri
+
+# Объекты передачи данных (DTO) ответов API. Поля названы так же, как ключи JSON
+# (алиасы полей моделей pydantic), поэтому DTO сериализуются orjson напрямую
+# и принимаются моделями pydantic с `orm_mode`.
+
+
+@dataclass
+class UserDTO:
+    """Пользователь (`BaseUser`)."""
+
+    __slots__ = ("id", "name")
+
+    id: int
+    name: str
+
+
+@dataclass
+class UserWithFollowersDTO:
+    """Пользователь с подписчиками (`UserWithFollowers`)."""
+
+    __slots__ = ("id", "name", "followers", "following")
+
+    id: int
+    name: str
+    followers: list[UserDTO]
+    following: list[UserDTO]
+
+
+@dataclass
+class TweetDTO:
+    """Твит (`TweetOut`)."""
+
+    __slots__ = ("id", "content", "author", "attachments", "likes")
+
+    id: int
+    content: str
+    author: UserDTO
+    attachments: list[str]
+    likes: list[UserDTO]
+
+
+@dataclass
+class TweetListDTO:
+    """Страница ленты (`TweetListOut`)."""
+
+    __slots__ = ("result", "tweets", "next_cursor")
+
+    result: bool
+    tweets: list[TweetDTO]
+    next_cursor: Optional[str]
+
+
+@dataclass
+class UserResultDTO:
+    """Результат запроса пользователя (`UserResultOut`)."""
+
+    __slots__ = ("result", "user")
+
+    result: bool
+    user: UserWithFollowersDTO
+
+
+DTO = Union[UserDTO, UserWithFollowersDTO, TweetDTO, TweetListDTO, UserResultDTO]
+DTO_TYPES = (UserDTO, UserWithFollowersDTO, TweetDTO, TweetListDTO, UserResultDTO)
+
+D = TypeVar("D")
+
+
+def serialize_user(user: Union[db_models.User, UserRecord]) -> UserDTO:
+    """
+    Возвращает DTO пользователя.
+
+    :param user: пользователь из ORM или репозитория.
+    """
+    return UserDTO(user.id, user.nickname)
+
+
+def _serialize_orm_tweet(tweet: db_models.Tweet) -> TweetDTO:
+    # `liked_by_users` - association proxy, который на каждое обращение создает коллекцию-обертку,
+    # поэтому лайкнувшие читаются напрямую из лайков
+    return TweetDTO(
+        tweet.id,
+        tweet.content,
+        serialize_user(tweet.user),
+        [static_uri(media.rel_uri) for media in tweet.medias],
+        [serialize_user(like.user) for like in tweet.likes],
+    )
+
+
+def _serialize_tweet_record(tweet: TweetRecord) -> TweetDTO:
+    return TweetDTO(
+        tweet.id,
+        tweet.content,
+        serialize_user(tweet.user),
+        [static_uri(rel_uri) for rel_uri in tweet.medias],
+        [serialize_user(user) for user in tweet.likes],
+    )
+
+
+def _serialize_orm_user_with_followers(user: db_models.User) -> UserWithFollowersDTO:
+    return UserWithFollowersDTO(
+        user.id,
+        user.nickname,
+        [serialize_user(follower.follower) for follower in user.followers],
+        [serialize_user(following.user) for following in user.followings],
+    )
+
+
+def _serialize_user_with_followers_record(user: UserWithFollowersRecord) -> UserWithFollowersDTO:
+    return UserWithFollowersDTO(
+        user.id,
+        user.nickname,
+        [serialize_user(follower) for follower in user.followers],
+        [serialize_user(following) for following in user.following],
+    )
+
+
+class Serializer(Generic[D]):
+    def __init__(self, readers: dict[type, Callable[[Any], D]]):
+        """
+        Сериализатор источников (моделей ORM или записей репозитория) в DTO.
+
+        Функция чтения выбирается один раз по точному типу источника, а сама функция
+        читает атрибуты источника напрямую, без проверок типа и сравнения ключей
+        на каждое поле.
+
+        :param readers: функции чтения DTO по типам источников.
+        """
+        self._readers = readers
+
+    def reader(self, source_type: type) -> Callable[[Any], D]:
+        """
+        Возвращает функцию чтения DTO источника.
+        Возбуждает `TypeError`, если тип источника не поддерживается.
+
+        :param source_type: тип источника.
+        """
+        try:
+            return self._readers[source_type]
+        except KeyError:
+            raise TypeError(f"can't serialize {source_type.__name__}")
+
+    def __call__(self, source: Any) -> D:
+        return self.reader(type(source))(source)
+
+    def many(self, sources: Sequence[Any]) -> list[D]:
+        """
+        Возвращает DTO источников.
+
+        :param sources: источники одного типа.
+        """
+        if not sources:
+            return list()
+        read = self.reader(type(sources[0]))
+        return [read(source) for source in sources]
+
+
+serialize_tweet: Serializer[TweetDTO] = Serializer(
+    {db_models.Tweet: _serialize_orm_tweet, TweetRecord: _serialize_tweet_record}
+)
+serialize_user_with_followers: Serializer[UserWithFollowersDTO] = Serializer(
+    {
+        db_models.User: _serialize_orm_user_with_followers,
+        UserWithFollowersRecord: _serialize_user_with_followers_record,
+    }
+)
@@ -0,0 +1,173 @@
+import asyncio
+import itertools
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import NamedTuple, Optional
+
+from ..db import events
+from ..settings import TWEET_STREAM_HISTORY
+from .coalescing import SingleFlight
+
+# типы сообщений потока твитов
+TWEET_MESSAGE = "tweet"
+TWEET_DELETED_MESSAGE = "tweet_deleted"
+LIKES_MESSAGE = "likes"
+# сообщения могли быть пропущены, и клиенту нужно перечитать ленту
+RESET_MESSAGE = "reset"
+
+
+class StreamEntry(NamedTuple):
+    seq: int
+    event: events.Event
+
+
+class StreamMessage(NamedTuple):
+    event: str
+    data: bytes
+
+    def encode(self, event_id: Optional[str] = None) -> bytes:
+        """
+        Возвращает сообщение в формате Server-Sent Events.
+
+        :param event_id: id сообщения, с которого клиент продолжит поток после переподключения.
+        """
+        lines = [f"event: {self.event}".encode(), b"data: " + self.data]
+        if event_id is not None:
+            lines.insert(0, f"id: {event_id}".encode())
+        return b"\n".join(lines) + b"\n\n"
+
+
+MessageRenderer = Callable[[events.Event], Awaitable[Optional[StreamMessage]]]
+
+
+class TweetStreamHub:
+    def __init__(self, history: int):
+        """
+        Рассылка событий твитов и лайков подписчикам потока твитов процесса API.
+
+        Хаб хранит последние `history` событий с их номерами. Подписчик читает события
+        после последнего полученного номера, поэтому клиент, переподключившийся
+        с заголовком `Last-Event-ID`, получает пропущенные сообщения. Номера событий
+        у каждого процесса свои, поэтому в id сообщения входит id процесса.
+
+        Сообщение события рендерится из БД один раз, при первом запросе подписчика,
+        которому оно нужно, и отдается остальным подписчикам готовым.
+
+        :param history: количество последних событий, которые хранит хаб. При 0 поток выключен.
+        """
+        self.history = history
+        self._entries: deque[StreamEntry] = deque(maxlen=history)
+        self._messages: dict[int, Optional[StreamMessage]] = dict()
+        self._renders: SingleFlight[Optional[StreamMessage]] = SingleFlight(enabled=True)
+        self._seq = 0
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.history > 0
+
+    @property
+    def last_seq(self) -> int:
+        """Номер последнего события."""
+        return self._seq
+
+    @staticmethod
+    def event_id(seq: int) -> str:
+        """
+        Возвращает id сообщения события.
+
+        :param seq: номер события.
+        """
+        return f"{events.PROCESS_ID}-{seq}"
+
+    @staticmethod
+    def parse_event_id(event_id: str) -> Optional[int]:
+        """
+        Возвращает номер события из id сообщения или `None`, если сообщение
+        отправлено другим процессом или id некорректен.
+
+        :param event_id: id сообщения.
+        """
+        process_id, _, seq = event_id.partition("-")
+        if process_id != events.PROCESS_ID or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def entries_after(self, seq: int) -> Optional[list[StreamEntry]]:
+        """
+        Возвращает события после события `seq` или `None`, если часть из них уже забыта.
+
+        :param seq: номер последнего полученного события.
+        """
+        if seq > self._seq or self._seq - seq > len(self._entries):
+            return None
+        return list(itertools.islice(self._entries, len(self._entries) - (self._seq - seq), None))
+
+    async def wait(self, seq: int, timeout: float) -> None:
+        """
+        Ждет событие после события `seq` не дольше `timeout` секунд.
+
+        :param seq: номер последнего полученного события.
+        :param timeout: максимальное время ожидания в секундах.
+        """
+        if self._seq > seq:
+            return
+
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def message(self, entry: StreamEntry, render: MessageRenderer) -> Optional[StreamMessage]:
+        """
+        Возвращает сообщение события, рендеря его, если оно еще не отрендерено.
+
+        :param entry: событие.
+        :param render: рендеринг сообщения события. Сообщение отдается всем подписчикам,
+            поэтому рендеринг не должен использовать сессию с БД одного из них.
+        """
+        if entry.seq in self._messages:
+            return self._messages[entry.seq]
+
+        message = await self._renders.do(entry.seq, lambda: render(entry.event))
+        if self._seq - entry.seq < len(self._entries):
+            # событие еще не вытеснено из истории
+            self._messages[entry.seq] = message
+        return message
+
+    def _append(self, ev: events.Event) -> None:
+        if len(self._entries) == self.history:
+            self._messages.pop(self._entries[0].seq, None)
+
+        self._seq += 1
+        self._entries.append(StreamEntry(self._seq, ev))
+
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    def handle_event(self, ev: events.Event) -> None:
+        """
+        Сохраняет событие и будит подписчиков.
+
+        :param ev: событие.
+        """
+        if not self.enabled:
+            return
+
+        if ev.kind in (events.TWEETS_CHANGED, events.LIKES_CHANGED) and ev.tweet_id is not None:
+            self._append(ev)
+        elif ev.kind in (events.FOLLOWINGS_CHANGED, events.EVENTS_RESET):
+            self._append(ev)
+        elif ev.kind == events.TWEETS_CHANGED:
+            # событие без твита (например, удаление пользователя вместе с его твитами)
+            # может затронуть любые твиты
+            self._append(events.Event(events.EVENTS_RESET, ev.user_id))
+        # события лайков без твита (сворачивание шардов счетчиков) не рассылаются:
+        # количество лайков с учетом шардов отправляется при самом лайке
+
+
+tweet_stream_hub = TweetStreamHub(history=TWEET_STREAM_HISTORY)
+events.subscribe(tweet_stream_hub.handle_event)
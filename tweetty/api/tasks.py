@@ -0,0 +1,106 @@
+import asyncio
+import contextlib
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from fastapi import FastAPI
+
+from ..db import events, models
+from ..db.counters import compact_like_counters
+from ..db.ranking import recompute_scores, score_ranking_enabled
+from ..settings import (
+    CONDITIONAL_RESPONSES,
+    EVENTS_RECONNECT_INTERVAL,
+    FEED_CACHE_MAX_ENTRIES,
+    FEED_PREFETCH_MAX_USERS,
+    FEED_SCORE_RECOMPUTE_INTERVAL,
+    LIKE_COUNTER_COMPACT_INTERVAL,
+    LIKE_COUNTER_SHARDS,
+    REQUEST_COALESCING_ROUTES,
+    TWEET_FRAGMENT_CACHE_MAX_ENTRIES,
+    TWEET_STREAM_HISTORY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(func: Callable[[], Awaitable[object]], interval: float) -> None:
+    """
+    Выполняет `func` каждые `interval` секунд до отмены задачи.
+    Ошибки выполнения логируются и не прерывают работу задачи.
+
+    :param func: периодически выполняемая корутинная функция.
+    :param interval: период выполнения в секундах.
+    """
+    while True:
+        try:
+            await func()
+        except Exception:
+            logger.exception("periodic task %s failed", func.__name__)
+
+        await asyncio.sleep(interval)
+
+
+async def compact_like_counters_task() -> None:
+    """Сворачивает шарды счетчиков лайков в `tweet.like_count`."""
+    async with models.Session(bind=models.engine) as db_session:
+        await compact_like_counters(db_session)
+
+
+async def recompute_scores_task() -> None:
+    """Пересчитывает рейтинги твитов, лайки которых недавно менялись."""
+    async with models.Session(bind=models.engine) as db_session:
+        await recompute_scores(db_session)
+
+
+async def listen_events_task() -> None:
+    """
+    Слушает события других процессов до потери соединения с БД.
+
+    События, отправленные до подписки или во время переподключения, могли быть
+    пропущены, поэтому после подписки обработчики получают событие `EVENTS_RESET`.
+    """
+    async with models.engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        await driver_connection.add_listener(events.EVENTS_CHANNEL, events.handle_notification)
+        try:
+            events.dispatch(events.Event(events.EVENTS_RESET, 0))
+            while not driver_connection.is_closed():
+                await asyncio.sleep(EVENTS_RECONNECT_INTERVAL)
+        finally:
+            if not driver_connection.is_closed():
+                await driver_connection.remove_listener(events.EVENTS_CHANNEL, events.handle_notification)
+
+
+def get_periodic_tasks() -> list[tuple[Callable[[], Awaitable[object]], float]]:
+    """Возвращает фоновые задачи приложения и периоды их выполнения."""
+    tasks: list[tuple[Callable[[], Awaitable[object]], float]] = list()
+    if LIKE_COUNTER_SHARDS > 0:
+        tasks.append((compact_like_counters_task, LIKE_COUNTER_COMPACT_INTERVAL))
+    if score_ranking_enabled():
+        tasks.append((recompute_scores_task, FEED_SCORE_RECOMPUTE_INTERVAL))
+    if (
+        FEED_CACHE_MAX_ENTRIES > 0
+        or FEED_PREFETCH_MAX_USERS > 0
+        or TWEET_FRAGMENT_CACHE_MAX_ENTRIES > 0
+        or CONDITIONAL_RESPONSES
+        or REQUEST_COALESCING_ROUTES
+        or TWEET_STREAM_HISTORY > 0
+    ):
+        # задача работает, пока есть соединение, и перезапускается после его потери
+        tasks.append((listen_events_task, EVENTS_RECONNECT_INTERVAL))
+    return tasks
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Запускает фоновые задачи на время работы приложения."""
+    running_tasks = [asyncio.create_task(run_periodically(func, interval)) for func, interval in get_periodic_tasks()]
+
+    yield
+
+    for task in running_tasks:
+        task.cancel()
+    await asyncio.gather(*running_tasks, return_exceptions=True)
@@ -0,0 +1,139 @@
+import random
+
+from sqlalchemy import ColumnElement, Update, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..settings import LIKE_COUNTER_SHARDS
+from . import events, models
+
+
+async def change_like_count(db_session: AsyncSession, tweet_id: int, delta: int) -> None:
+    """
+    Изменяет счетчик лайков твита.
+
+    Если шарды счетчиков включены (`LIKE_COUNTER_SHARDS` > 0), то изменение
+    записывается в случайный шард, а не в строку твита, и попадет
+    в `tweet.like_count` при следующем сворачивании шардов.
+
+    :param db_session: сессия с базой данных.
+    :param tweet_id: id твита.
+    :param delta: изменение количества лайков.
+    """
+    if LIKE_COUNTER_SHARDS > 0:
+        stmt = insert(models.LikeCounterShard).values(
+            tweet_id=tweet_id,
+            shard=random.randrange(LIKE_COUNTER_SHARDS),
+            count=delta,
+        )
+        await db_session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[models.LikeCounterShard.tweet_id, models.LikeCounterShard.shard],
+                set_={"count": models.LikeCounterShard.count + stmt.excluded.count},
+            )
+        )
+    else:
+        await db_session.execute(
+            update(models.Tweet)
+            .where(models.Tweet.id == tweet_id)
+            .values(like_count=models.Tweet.like_count + delta, likes_changed_at=func.now())
+        )
+
+
+async def change_author_affinity(db_session: AsyncSession, user_id: int, author_id: int, delta: int) -> None:
+    """
+    Изменяет счетчик твитов автора, лайкнутых читателем.
+
+    :param db_session: сессия с базой данных.
+    :param user_id: id читателя.
+    :param author_id: id автора.
+    :param delta: изменение количества лайков.
+    """
+    stmt = insert(models.AuthorAffinity).values(user_id=user_id, author_id=author_id, like_count=max(delta, 0))
+    await db_session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[models.AuthorAffinity.user_id, models.AuthorAffinity.author_id],
+            set_={"like_count": func.greatest(models.AuthorAffinity.like_count + delta, 0)},
+        )
+    )
+
+
+async def forget_tweet_affinity(db_session: AsyncSession, tweet_id: int, author_id: int) -> None:
+    """
+    Уменьшает счетчики близости к автору для всех, кто лайкнул твит.
+    Вызывается до удаления твита, пока его лайки еще есть.
+
+    :param db_session: сессия с базой данных.
+    :param tweet_id: id удаляемого твита.
+    :param author_id: id автора твита.
+    """
+    await db_session.execute(
+        update(models.AuthorAffinity)
+        .where(
+            models.AuthorAffinity.author_id == author_id,
+            models.AuthorAffinity.user_id.in_(select(models.Like.user_id).where(models.Like.tweet_id == tweet_id)),
+        )
+        .values(like_count=func.greatest(models.AuthorAffinity.like_count - 1, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def like_count_column() -> ColumnElement[int]:
+    """
+    Возвращает выражение количества лайков твита с учетом еще не свернутых шардов счетчика.
+    Шарды складываются подзапросом, поэтому выражение предназначено для выборки отдельных твитов.
+    """
+    if LIKE_COUNTER_SHARDS == 0:
+        return models.Tweet.like_count
+
+    shards_count = (
+        select(func.coalesce(func.sum(models.LikeCounterShard.count), 0))
+        .where(models.LikeCounterShard.tweet_id == models.Tweet.id)
+        .scalar_subquery()
+    )
+    return models.Tweet.like_count + shards_count
+
+
+def compact_like_counters_stmt() -> Update:
+    """
+    Возвращает запрос, сворачивающий все шарды счетчиков лайков в `tweet.like_count`.
+
+    Шарды удаляются и учитываются в твитах одним запросом, поэтому лайки,
+    поставленные во время сворачивания, не теряются и не учитываются дважды.
+    Запрос возвращает авторов обновленных твитов.
+    """
+    moved = (
+        delete(models.LikeCounterShard)
+        .returning(models.LikeCounterShard.tweet_id, models.LikeCounterShard.count)
+        .cte("moved")
+    )
+    totals = (
+        select(moved.c.tweet_id, func.sum(moved.c.count).label("count")).group_by(moved.c.tweet_id).subquery("totals")
+    )
+
+    return (
+        update(models.Tweet)
+        .where(models.Tweet.id == totals.c.tweet_id)
+        .values(like_count=models.Tweet.like_count + totals.c.count, likes_changed_at=func.now())
+        .returning(models.Tweet.user_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def compact_like_counters(db_session: AsyncSession) -> int:
+    """
+    Сворачивает шарды счетчиков лайков в `tweet.like_count`.
+    Возвращает количество обновленных твитов.
+
+    :param db_session: сессия с базой данных.
+    """
+    author_ids = (await db_session.execute(compact_like_counters_stmt())).scalars().all()
+    if author_ids:
+        # порядок твитов в лентах читателей авторов изменился
+        await db_session.execute(
+            events.publish(
+                db_session, *[events.Event(events.LIKES_CHANGED, author_id) for author_id in set(author_ids)]
+            )
+        )
+    await db_session.commit()
+    return len(author_ids)
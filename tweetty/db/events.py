@@ -0,0 +1,138 @@
+import json
+import logging
+import uuid
+from collections.abc import Callable
+from typing import NamedTuple, Optional, Union
+
+from sqlalchemy import ARRAY, Select, Text, event, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# канал PostgreSQL, через который процессы обмениваются событиями
+EVENTS_CHANNEL = "tweetty_events"
+
+# идентификатор процесса, чтобы не обрабатывать собственные события повторно
+PROCESS_ID = uuid.uuid4().hex
+
+# изменились подписки пользователя `user_id`
+FOLLOWINGS_CHANGED = "followings"
+# изменились подписчики пользователя `user_id`
+FOLLOWERS_CHANGED = "followers"
+# автор `user_id` опубликовал или удалил твит `tweet_id`
+TWEETS_CHANGED = "tweets"
+# изменились лайки твита `tweet_id` автора `user_id`
+# (или только счетчики лайков твитов автора, если `tweet_id` не указан)
+LIKES_CHANGED = "likes"
+# события могли быть пропущены (например, при переподключении к БД)
+EVENTS_RESET = "reset"
+
+_PENDING_EVENTS_KEY = "tweetty_pending_events"
+
+
+class Event(NamedTuple):
+    """Событие изменения данных."""
+
+    kind: str
+    user_id: int
+    tweet_id: Optional[int] = None
+
+    def to_payload(self) -> str:
+        """Возвращает представление события для `NOTIFY`."""
+        return json.dumps([self.kind, self.user_id, self.tweet_id, PROCESS_ID], separators=(",", ":"))
+
+    @classmethod
+    def from_payload(cls, payload: str) -> tuple["Event", str]:
+        """
+        Восстанавливает событие и id отправившего его процесса из представления для `NOTIFY`.
+
+        :param payload: представление события.
+        """
+        kind, user_id, tweet_id, process_id = json.loads(payload)
+        return cls(kind, user_id, tweet_id), process_id
+
+
+EventHandler = Callable[[Event], None]
+
+_handlers: list[EventHandler] = list()
+
+
+def subscribe(handler: EventHandler) -> EventHandler:
+    """
+    Подписывает обработчик на события.
+
+    :param handler: обработчик события.
+    """
+    _handlers.append(handler)
+    return handler
+
+
+def dispatch(*events: Event) -> None:
+    """Передает события обработчикам текущего процесса."""
+    for ev in events:
+        for handler in _handlers:
+            try:
+                handler(ev)
+            except Exception:
+                logger.exception("event handler %s failed on %s", handler.__name__, ev)
+
+
+def notify_stmt(*evs: Event) -> Select:
+    """
+    Возвращает запрос, отправляющий события другим процессам.
+    События доставляются только после фиксации транзакции.
+
+    :param evs: события.
+    """
+    if len(evs) == 1:
+        return select(func.pg_notify(EVENTS_CHANNEL, evs[0].to_payload()))
+
+    payloads = func.unnest(literal([ev.to_payload() for ev in evs], ARRAY(Text))).column_valued("payload")
+    return select(func.pg_notify(EVENTS_CHANNEL, payloads))
+
+
+def _pending_events(session: Session) -> list[Event]:
+    return session.info.setdefault(_PENDING_EVENTS_KEY, list())
+
+
+def publish(db_session: Union[AsyncSession, Session], *evs: Event) -> Select:
+    """
+    Регистрирует события в сессии и возвращает запрос, отправляющий их другим процессам.
+
+    Обработчики текущего процесса получают события после фиксации транзакции сессии,
+    другие процессы - после выполнения возвращенного запроса и фиксации транзакции.
+
+    :param db_session: сессия с базой данных.
+    :param evs: события.
+    """
+    session = db_session.sync_session if isinstance(db_session, AsyncSession) else db_session
+    _pending_events(session).extend(evs)
+    return notify_stmt(*evs)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending_events(session: Session) -> None:
+    events = session.info.pop(_PENDING_EVENTS_KEY, None)
+    if events:
+        dispatch(*events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending_events(session: Session) -> None:
+    session.info.pop(_PENDING_EVENTS_KEY, None)
+
+
+def handle_notification(connection: object, pid: int, channel: str, payload: str) -> None:
+    """
+    Обработчик уведомлений `LISTEN` для asyncpg.
+    Передает обработчикам текущего процесса события других процессов.
+    """
+    try:
+        ev, process_id = Event.from_payload(payload)
+    except (ValueError, TypeError):
+        logger.warning("invalid event payload %r", payload)
+        return
+
+    if process_id != PROCESS_ID:
+        dispatch(ev)
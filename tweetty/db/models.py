@@ -3,7 +3,19 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint, func
+from sqlalchemy import (
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.ext.associationproxy import AssociationProxy, association_proxy
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Mapped, declarative_base, relationship, sessionmaker
@@ -60,6 +72,22 @@ class User(Base):
         doc="Ключ API, выданный пользователю",
         comment="Ключ API, выданный пользователю",
     )
+    followers_count: Mapped[int] = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="Количество подписчиков",
+        comment="Количество подписчиков",
+    )
+    fanout_on_read: Mapped[bool] = Column(
+        Boolean,
+        nullable=False,
+        default=False,
+        server_default="false",
+        doc="Твиты пользователя не раскладываются по лентам подписчиков, а подмешиваются при чтении ленты",
+        comment="Твиты пользователя не раскладываются по лентам подписчиков, а подмешиваются при чтении ленты",
+    )
 
     __table_args__ = (
         CheckConstraint("length(nickname) >= 5 and length(nickname) <= 20", name="nickname_length"),
@@ -108,6 +136,30 @@ class Tweet(Base):
         doc="Пользователь, сделавший твит",
         comment="Пользователь, сделавший твит",
     )
+    like_count: Mapped[int] = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="Количество лайков",
+        comment="Количество лайков",
+    )
+    likes_changed_at: Mapped[datetime | None] = Column(
+        DateTime,
+        nullable=True,
+        doc="Дата-время последнего изменения количества лайков",
+        comment="Дата-время последнего изменения количества лайков",
+    )
+    score: Mapped[float] = Column(
+        Float,
+        nullable=False,
+        default=0.0,
+        server_default="0",
+        doc="Рейтинг твита в ленте: лайки с затуханием по возрасту твита. "
+        "Пересчитывается в фоне после изменения лайков",
+        comment="Рейтинг твита в ленте: лайки с затуханием по возрасту твита. "
+        "Пересчитывается в фоне после изменения лайков",
+    )
 
     user: Mapped[User] = relationship("User", back_populates="tweets")
     medias: Mapped[list[TweetMedia]] = relationship("TweetMedia", back_populates="tweet", cascade="all, delete-orphan")
@@ -115,7 +167,14 @@ class Tweet(Base):
 
     liked_by_users: AssociationProxy[list[User]] = association_proxy("likes", "user")
 
-    __table_args__ = (CheckConstraint("length(content) >= 1", name="content_length"),)
+    __table_args__ = (
+        CheckConstraint("length(content) >= 1", name="content_length"),
+        Index("ix_tweet_user_id_like_count_posted_at", user_id, like_count.desc(), posted_at.desc(), id.desc()),
+        Index("ix_tweet_user_id_posted_at", user_id, posted_at.desc(), id.desc()),
+        Index("ix_tweet_user_id_likes_changed_at", user_id, likes_changed_at),
+        Index("ix_tweet_user_id_score", user_id, score.desc(), posted_at.desc(), id.desc()),
+        Index("ix_tweet_likes_changed_at", likes_changed_at),
+    )
 
 
 class TweetMedia(Base):
@@ -175,7 +234,112 @@ class Like(Base):
     tweet: Mapped[Tweet] = relationship("Tweet", back_populates="likes")
     user: Mapped[User] = relationship("User", back_populates="likes")
 
-    __table_args__ = (UniqueConstraint("tweet_id", "user_id", name="unique_like"),)
+    __table_args__ = (
+        UniqueConstraint("tweet_id", "user_id", name="unique_like"),
+        Index("ix_like_tweet_id_id", tweet_id, id),
+    )
+
+
+class LikeCounterShard(Base):
+    """
+    Таблица шардов счетчиков лайков.
+
+    Лайки популярного твита распределяются по нескольким строкам,
+    чтобы параллельные лайки не ждали блокировку одной строки `tweet`.
+    Шарды периодически сворачиваются в `tweet.like_count`.
+    """
+
+    __tablename__ = "like_counter_shard"
+
+    tweet_id: Mapped[int] = Column(
+        Integer,
+        ForeignKey("tweet.id", ondelete="CASCADE"),
+        primary_key=True,
+        doc="Твит",
+        comment="Твит",
+    )
+    shard: Mapped[int] = Column(
+        Integer,
+        primary_key=True,
+        doc="Номер шарда",
+        comment="Номер шарда",
+    )
+    count: Mapped[int] = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="Изменение количества лайков, еще не учтенное в твите",
+        comment="Изменение количества лайков, еще не учтенное в твите",
+    )
+
+
+class HomeTimeline(Base):
+    """
+    Таблица домашних лент пользователей.
+
+    Твиты раскладываются по лентам подписчиков при публикации,
+    поэтому лента читается диапазоном по индексу без обхода подписок.
+    """
+
+    __tablename__ = "home_timeline"
+
+    user_id: Mapped[int] = Column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+        doc="Владелец ленты",
+        comment="Владелец ленты",
+    )
+    tweet_id: Mapped[int] = Column(
+        Integer,
+        ForeignKey("tweet.id", ondelete="CASCADE"),
+        primary_key=True,
+        doc="Твит",
+        comment="Твит",
+    )
+    score: Mapped[float] = Column(
+        Float,
+        nullable=False,
+        doc="Вес твита в ленте. Чем больше, тем дольше твит остается в ленте",
+        comment="Вес твита в ленте. Чем больше, тем дольше твит остается в ленте",
+    )
+
+    __table_args__ = (Index("ix_home_timeline_user_id_score", user_id, score.desc(), tweet_id.desc()),)
+
+
+class AuthorAffinity(Base):
+    """
+    Таблица близости читателей к авторам: сколько твитов автора лайкнул читатель.
+
+    Счетчики изменяются вместе с лайками, поэтому персональная лента
+    не пересчитывает лайки читателя при каждом запросе.
+    """
+
+    __tablename__ = "author_affinity"
+
+    user_id: Mapped[int] = Column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+        doc="Читатель",
+        comment="Читатель",
+    )
+    author_id: Mapped[int] = Column(
+        Integer,
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+        doc="Автор",
+        comment="Автор",
+    )
+    like_count: Mapped[int] = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        doc="Количество твитов автора, лайкнутых читателем",
+        comment="Количество твитов автора, лайкнутых читателем",
+    )
 
 
 class Follower(Base):
@@ -205,4 +369,5 @@ class Follower(Base):
     __table_args__ = (
         CheckConstraint("user_id <> follower_id", name="user_and_follower_not_equal"),
         UniqueConstraint("user_id", "follower_id", name="unique_following"),
+        Index("ix_follower_follower_id_user_id", follower_id, user_id),
     )
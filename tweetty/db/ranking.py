@@ -0,0 +1,118 @@
+import math
+from datetime import datetime, timedelta
+from typing import Any, Union
+
+from sqlalchemy import ColumnElement, Float, Select, Update, cast, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import settings
+from . import events, models
+
+
+def score_ranking_enabled() -> bool:
+    """Возвращает `True`, если лента ранжируется по рейтингу `tweet.score`."""
+    return settings.FEED_RANKING == "score"
+
+
+def rank_column(tweet: Any = models.Tweet) -> Any:
+    """
+    Возвращает колонку первого ключа сортировки ленты: рейтинг или количество лайков твита.
+
+    :param tweet: модель твита или ее псевдоним.
+    """
+    return tweet.score if score_ranking_enabled() else tweet.like_count
+
+
+def decay_score(like_count: Union[int, ColumnElement[int]], posted_at: Any) -> ColumnElement[float]:
+    """
+    Возвращает выражение рейтинга твита `log2(1 + лайки) + posted_at / FEED_SCORE_HALF_LIFE`.
+
+    Порядок по такому рейтингу совпадает с порядком по весу `(1 + лайки) * 2 ^ (-возраст / FEED_SCORE_HALF_LIFE)`
+    в любой момент времени, поэтому рейтинг меняется только вместе с лайками,
+    а не пересчитывается по мере старения всех твитов.
+
+    :param like_count: количество лайков.
+    :param posted_at: дата-время публикации.
+    """
+    half_life = settings.FEED_SCORE_HALF_LIFE * 3600
+    return (
+        func.ln(cast(1 + func.greatest(like_count, 0), Float)) / math.log(2)
+        + cast(func.extract("epoch", posted_at), Float) / half_life
+    )
+
+
+def new_tweet_score() -> ColumnElement[float]:
+    """
+    Возвращает выражение рейтинга публикуемого твита.
+    Дата-время публикации совпадает с умолчанием `tweet.posted_at` в той же транзакции.
+    """
+    return decay_score(0, func.localtimestamp())
+
+
+def rescore_stmt(*whereclause) -> Update:
+    """
+    Возвращает запрос, пересчитывающий рейтинги твитов, которые изменились.
+    Запрос возвращает авторов обновленных твитов.
+
+    :param whereclause: условия отбора твитов.
+    """
+    score = decay_score(models.Tweet.like_count, models.Tweet.posted_at)
+    return (
+        update(models.Tweet)
+        .where(*whereclause, models.Tweet.score != score)
+        .values(score=score)
+        .returning(models.Tweet.user_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def active_tweets_batch_stmt(changed_after: datetime, after_id: int) -> Select:
+    """
+    Возвращает запрос очередной пачки id твитов, лайки которых менялись после `changed_after`.
+
+    :param changed_after: дата-время, после которого ищутся изменения лайков.
+    :param after_id: id твита, после которого начинается пачка.
+    """
+    return (
+        select(models.Tweet.id)
+        .where(models.Tweet.likes_changed_at >= changed_after, models.Tweet.id > after_id)
+        .order_by(models.Tweet.id)
+        .limit(settings.FEED_SCORE_RECOMPUTE_BATCH_SIZE)
+    )
+
+
+async def recompute_scores(db_session: AsyncSession) -> int:
+    """
+    Пересчитывает рейтинги твитов, лайки которых менялись за последние
+    `FEED_SCORE_RECOMPUTE_WINDOW` секунд. Твиты обрабатываются пачками
+    по `FEED_SCORE_RECOMPUTE_BATCH_SIZE`, каждая пачка - в своей транзакции.
+    Возвращает количество обновленных твитов.
+
+    :param db_session: сессия с базой данных.
+    """
+    # время БД, как у `likes_changed_at`, а не часы процесса
+    changed_after: datetime = await db_session.scalar(
+        select(func.localtimestamp() - timedelta(seconds=settings.FEED_SCORE_RECOMPUTE_WINDOW))
+    )
+
+    updated = 0
+    after_id = 0
+    while True:
+        batch_qs = await db_session.execute(active_tweets_batch_stmt(changed_after, after_id))
+        tweet_ids = batch_qs.scalars().all()
+        if not tweet_ids:
+            break
+
+        author_ids = (await db_session.execute(rescore_stmt(models.Tweet.id.in_(tweet_ids)))).scalars().all()
+        if author_ids:
+            # порядок твитов в лентах читателей авторов изменился
+            await db_session.execute(
+                events.publish(
+                    db_session, *[events.Event(events.LIKES_CHANGED, author_id) for author_id in set(author_ids)]
+                )
+            )
+        await db_session.commit()
+
+        updated += len(author_ids)
+        after_id = tweet_ids[-1]
+    return updated
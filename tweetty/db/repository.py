@@ -0,0 +1,151 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from asyncpg import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import settings
+
+# Записи репозитория - легковесная замена ORM-объектов для чтения:
+# без identity map, отслеживания изменений и ленивых связей
+
+
+class UserRecord(NamedTuple):
+    """Пользователь."""
+
+    id: int
+    nickname: str
+
+
+class TweetRecord(NamedTuple):
+    """Твит с автором, медиа, лайками и рейтингом."""
+
+    id: int
+    content: str
+    like_count: int
+    posted_at: datetime
+    user: UserRecord
+    medias: list[str]
+    likes: list[UserRecord]
+    score: float = 0.0
+
+
+class UserWithFollowersRecord(NamedTuple):
+    """Пользователь с подписчиками и подписками."""
+
+    id: int
+    nickname: str
+    followers: list[UserRecord]
+    following: list[UserRecord]
+
+
+TWEETS_SQL = """
+SELECT
+    t.id,
+    t.content,
+    t.like_count,
+    t.posted_at,
+    t.score,
+    u.id AS user_id,
+    u.nickname AS user_nickname,
+    (SELECT array_agg(m.rel_uri ORDER BY m.id) FROM tweet_media AS m WHERE m.tweet_id = t.id) AS medias,
+    (
+        SELECT array_agg((lu.id, lu.nickname) ORDER BY l.id)
+        FROM "like" AS l JOIN "user" AS lu ON lu.id = l.user_id
+        WHERE l.tweet_id = t.id
+    ) AS likes
+FROM unnest($1::integer[]) WITH ORDINALITY AS page (id, position)
+JOIN tweet AS t ON t.id = page.id
+JOIN "user" AS u ON u.id = t.user_id
+ORDER BY page.position
+"""
+
+USER_WITH_FOLLOWERS_SQL = """
+SELECT
+    u.id,
+    u.nickname,
+    (
+        SELECT array_agg((fu.id, fu.nickname) ORDER BY f.id)
+        FROM follower AS f JOIN "user" AS fu ON fu.id = f.follower_id
+        WHERE f.user_id = u.id
+    ) AS followers,
+    (
+        SELECT array_agg((fu.id, fu.nickname) ORDER BY f.id)
+        FROM follower AS f JOIN "user" AS fu ON fu.id = f.user_id
+        WHERE f.follower_id = u.id
+    ) AS following
+FROM "user" AS u
+WHERE u.id = $1
+"""
+
+
+def raw_repository_enabled() -> bool:
+    """Возвращает `True`, если нагруженные запросы чтения выполняются через репозиторий."""
+    return settings.RAW_READ_REPOSITORY
+
+
+async def driver_connection(db_session: AsyncSession) -> Connection:
+    """
+    Возвращает соединение asyncpg, на котором работает сессия.
+    Запросы на нем выполняются в той же транзакции, что и запросы сессии.
+
+    asyncpg подготавливает выполняемые запросы и кэширует их в соединении,
+    поэтому запросы репозитория разбираются сервером один раз на соединение.
+
+    :param db_session: сессия с базой данных.
+    """
+    connection = await db_session.connection()
+    raw_connection = await connection.get_raw_connection()
+    return raw_connection.driver_connection
+
+
+def _user_records(rows: Optional[Sequence[tuple[int, str]]]) -> list[UserRecord]:
+    return [UserRecord(user_id, nickname) for user_id, nickname in rows or ()]
+
+
+async def get_tweets(db_session: AsyncSession, tweet_ids: Sequence[int]) -> list[TweetRecord]:
+    """
+    Возвращает твиты в порядке переданных id.
+
+    :param db_session: сессия с базой данных.
+    :param tweet_ids: id твитов.
+    """
+    if not tweet_ids:
+        return list()
+
+    connection = await driver_connection(db_session)
+    rows = await connection.fetch(TWEETS_SQL, list(tweet_ids))
+    return [
+        TweetRecord(
+            id=row["id"],
+            content=row["content"],
+            like_count=row["like_count"],
+            posted_at=row["posted_at"],
+            user=UserRecord(row["user_id"], row["user_nickname"]),
+            medias=row["medias"] or list(),
+            likes=_user_records(row["likes"]),
+            score=row["score"],
+        )
+        for row in rows
+    ]
+
+
+async def get_user_with_followers(db_session: AsyncSession, user_id: int) -> Optional[UserWithFollowersRecord]:
+    """
+    Возвращает пользователя с подписчиками и подписками или `None`.
+
+    :param db_session: сессия с базой данных.
+    :param user_id: id пользователя.
+    """
+    connection = await driver_connection(db_session)
+    row = await connection.fetchrow(USER_WITH_FOLLOWERS_SQL, user_id)
+    if row is None:
+        return None
+
+    return UserWithFollowersRecord(
+        id=row["id"],
+        nickname=row["nickname"],
+        followers=_user_records(row["followers"]),
+        following=_user_records(row["following"]),
+    )
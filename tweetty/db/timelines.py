@@ -0,0 +1,335 @@
+import random
+from collections.abc import Iterable
+
+from sqlalchemy import Delete, Insert, Select, Update, delete, func, literal, or_, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import settings
+from . import models
+
+
+def home_timeline_enabled() -> bool:
+    """Возвращает `True`, если твиты раскладываются по домашним лентам."""
+    return settings.FEED_ENGINE == "timeline"
+
+
+def tweet_score():
+    """Возвращает выражение веса твита в домашней ленте."""
+    return func.extract("epoch", models.Tweet.posted_at)
+
+
+def fan_out_stmt(tweet_id: int, *whereclause) -> Insert:
+    """
+    Возвращает запрос, добавляющий твит в ленты подписчиков его автора.
+
+    :param tweet_id: id твита.
+    :param whereclause: дополнительные условия отбора подписок `models.Follower`.
+    """
+    followers = (
+        select(models.Follower.follower_id, models.Tweet.id, tweet_score())
+        .join(models.Tweet, models.Tweet.user_id == models.Follower.user_id)
+        .where(models.Tweet.id == tweet_id, *whereclause)
+    )
+    return (
+        insert(models.HomeTimeline)
+        .from_select(["user_id", "tweet_id", "score"], followers)
+        .on_conflict_do_nothing(index_elements=[models.HomeTimeline.user_id, models.HomeTimeline.tweet_id])
+    )
+
+
+def own_tweet_stmt(tweet_id: int) -> Insert:
+    """
+    Возвращает запрос, добавляющий твит в ленту его автора.
+
+    :param tweet_id: id твита.
+    """
+    return (
+        insert(models.HomeTimeline)
+        .from_select(
+            ["user_id", "tweet_id", "score"],
+            select(models.Tweet.user_id, models.Tweet.id, tweet_score()).where(models.Tweet.id == tweet_id),
+        )
+        .on_conflict_do_nothing(index_elements=[models.HomeTimeline.user_id, models.HomeTimeline.tweet_id])
+    )
+
+
+def backfill_stmt(user_id: int, author_id: int) -> Insert:
+    """
+    Возвращает запрос, добавляющий последние твиты автора в ленту пользователя.
+    Используется при подписке на автора.
+
+    :param user_id: id владельца ленты.
+    :param author_id: id автора твитов.
+    """
+    tweets = (
+        select(literal(user_id), models.Tweet.id, tweet_score())
+        .where(models.Tweet.user_id == author_id)
+        .order_by(models.Tweet.posted_at.desc(), models.Tweet.id.desc())
+        .limit(settings.HOME_TIMELINE_MAX_LENGTH)
+    )
+    return (
+        insert(models.HomeTimeline)
+        .from_select(["user_id", "tweet_id", "score"], tweets)
+        .on_conflict_do_nothing(index_elements=[models.HomeTimeline.user_id, models.HomeTimeline.tweet_id])
+    )
+
+
+def retract_stmt(user_id: int, author_id: int) -> Delete:
+    """
+    Возвращает запрос, удаляющий твиты автора из ленты пользователя.
+    Используется при отписке от автора.
+
+    :param user_id: id владельца ленты.
+    :param author_id: id автора твитов.
+    """
+    return delete(models.HomeTimeline).where(
+        models.HomeTimeline.user_id == user_id,
+        models.HomeTimeline.tweet_id.in_(select(models.Tweet.id).where(models.Tweet.user_id == author_id)),
+    )
+
+
+def trim_stmt(user_ids: Iterable[int]) -> Delete:
+    """
+    Возвращает запрос, обрезающий ленты пользователей до `HOME_TIMELINE_MAX_LENGTH` твитов
+    с наибольшим весом.
+
+    :param user_ids: id владельцев лент.
+    """
+    ranked = (
+        select(
+            models.HomeTimeline.user_id,
+            models.HomeTimeline.tweet_id,
+            func.row_number()
+            .over(
+                partition_by=models.HomeTimeline.user_id,
+                order_by=(models.HomeTimeline.score.desc(), models.HomeTimeline.tweet_id.desc()),
+            )
+            .label("position"),
+        )
+        .where(models.HomeTimeline.user_id.in_(list(user_ids)))
+        .subquery("ranked")
+    )
+    return delete(models.HomeTimeline).where(
+        models.HomeTimeline.user_id == ranked.c.user_id,
+        models.HomeTimeline.tweet_id == ranked.c.tweet_id,
+        ranked.c.position > settings.HOME_TIMELINE_MAX_LENGTH,
+    )
+
+
+def rebuild_stmt() -> Insert:
+    """Возвращает запрос, заново заполняющий домашние ленты всех пользователей из подписок."""
+    readers = union_all(
+        select(models.Follower.follower_id.label("user_id"), models.Follower.user_id.label("author_id")),
+        select(models.User.id.label("user_id"), models.User.id.label("author_id")),
+    ).subquery("readers")
+    ranked = (
+        select(
+            readers.c.user_id,
+            models.Tweet.id.label("tweet_id"),
+            tweet_score().label("score"),
+            func.row_number()
+            .over(
+                partition_by=readers.c.user_id,
+                order_by=(models.Tweet.posted_at.desc(), models.Tweet.id.desc()),
+            )
+            .label("position"),
+        )
+        .join(models.Tweet, models.Tweet.user_id == readers.c.author_id)
+        .subquery("ranked")
+    )
+    return (
+        insert(models.HomeTimeline)
+        .from_select(
+            ["user_id", "tweet_id", "score"],
+            select(ranked.c.user_id, ranked.c.tweet_id, ranked.c.score).where(
+                ranked.c.position <= settings.HOME_TIMELINE_MAX_LENGTH
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[models.HomeTimeline.user_id, models.HomeTimeline.tweet_id])
+    )
+
+
+def followers_count_stmt(author_id: int, delta: int) -> Update:
+    """
+    Возвращает запрос, изменяющий счетчик подписчиков автора.
+
+    Если подписчиков становится больше `HOME_TIMELINE_FANOUT_MAX_FOLLOWERS`, то твиты автора
+    перестают раскладываться по лентам подписчиков (`models.User.fanout_on_read`).
+    При отписках флаг не сбрасывается, иначе твиты, опубликованные без раскладки,
+    пропали бы из лент. Флаги пересчитываются при перестроении лент.
+
+    :param author_id: id автора.
+    :param delta: изменение количества подписчиков.
+    """
+    followers_count = models.User.followers_count + delta
+    return (
+        update(models.User)
+        .where(models.User.id == author_id)
+        .values(
+            followers_count=followers_count,
+            fanout_on_read=or_(
+                models.User.fanout_on_read, followers_count > settings.HOME_TIMELINE_FANOUT_MAX_FOLLOWERS
+            ),
+        )
+    )
+
+
+def reset_fanout_on_read_stmt() -> Update:
+    """
+    Возвращает запрос, пересчитывающий `models.User.fanout_on_read` по текущему количеству подписчиков.
+    Выполняется при перестроении лент, когда все твиты уже разложены по лентам подписчиков.
+    """
+    return update(models.User).values(
+        fanout_on_read=models.User.followers_count > settings.HOME_TIMELINE_FANOUT_MAX_FOLLOWERS
+    )
+
+
+def fanout_on_read_tweets_stmt(user_id: int) -> Select:
+    """
+    Возвращает запрос id последних твитов авторов, на которых подписан пользователь
+    и твиты которых не раскладываются по лентам подписчиков.
+
+    Твиты каждого автора читаются по индексу `ix_tweet_user_id_posted_at`
+    и ограничиваются `HOME_TIMELINE_MAX_LENGTH` последними, как и домашняя лента.
+
+    :param user_id: id владельца ленты.
+    """
+    authors = (
+        select(models.Follower.user_id)
+        .join(models.User, models.User.id == models.Follower.user_id)
+        .where(models.Follower.follower_id == user_id, models.User.fanout_on_read.is_(True))
+        .subquery("authors")
+    )
+    recent_tweets = (
+        select(models.Tweet.id)
+        .where(models.Tweet.user_id == authors.c.user_id)
+        .order_by(models.Tweet.posted_at.desc(), models.Tweet.id.desc())
+        .limit(settings.HOME_TIMELINE_MAX_LENGTH)
+        .lateral("recent_tweets")
+    )
+    return select(recent_tweets.c.id).select_from(authors).join(recent_tweets, literal(True))
+
+
+def home_timeline_tweets_stmt(user_id: int) -> Select:
+    """
+    Возвращает запрос твитов домашней ленты пользователя вместе с твитами авторов,
+    которые не раскладываются по лентам подписчиков.
+
+    Домашняя лента читается диапазоном по индексу `ix_home_timeline_user_id_score` и не длиннее
+    `HOME_TIMELINE_MAX_LENGTH`, даже если ее еще не обрезали. Ранжирование по лайкам или рейтингу
+    в индекс не вынесено, иначе каждый лайк переписывал бы ленты всех подписчиков автора,
+    поэтому страница сортируется среди этих твитов.
+
+    :param user_id: id владельца ленты.
+    """
+    timeline = (
+        select(models.HomeTimeline.tweet_id)
+        .where(models.HomeTimeline.user_id == user_id)
+        .order_by(models.HomeTimeline.score.desc(), models.HomeTimeline.tweet_id.desc())
+        .limit(settings.HOME_TIMELINE_MAX_LENGTH)
+        .subquery("timeline")
+    )
+    return select(models.Tweet).where(
+        models.Tweet.id.in_(union_all(select(timeline.c.tweet_id), fanout_on_read_tweets_stmt(user_id)))
+    )
+
+
+def sample_for_trim(user_ids: Iterable[int]) -> list[int]:
+    """
+    Отбирает ленты, которые нужно обрезать после добавления в них твита.
+    Каждая лента отбирается в среднем один раз из `HOME_TIMELINE_TRIM_EVERY`.
+    """
+    return [user_id for user_id in user_ids if random.randrange(settings.HOME_TIMELINE_TRIM_EVERY) == 0]
+
+
+def followers_batch_stmt(author_id: int, after_id: int) -> Select:
+    """
+    Возвращает запрос очередной пачки подписок на автора.
+
+    :param author_id: id автора.
+    :param after_id: id подписки, после которой начинается пачка.
+    """
+    return (
+        select(models.Follower.id, models.Follower.follower_id)
+        .where(models.Follower.user_id == author_id, models.Follower.id > after_id)
+        .order_by(models.Follower.id)
+        .limit(settings.HOME_TIMELINE_FANOUT_BATCH_SIZE)
+    )
+
+
+async def _trim_timelines(db_session: AsyncSession, user_ids: list[int]) -> None:
+    if user_ids:
+        await db_session.execute(trim_stmt(user_ids))
+
+
+async def fan_out_tweet(db_session: AsyncSession, tweet_id: int, author_id: int) -> None:
+    """
+    Раскладывает твит по домашним лентам автора и его подписчиков.
+    Подписчики обрабатываются пачками по `HOME_TIMELINE_FANOUT_BATCH_SIZE`.
+
+    Твиты авторов с флагом `models.User.fanout_on_read` попадают только в ленту автора,
+    а подписчикам подмешиваются при чтении ленты.
+
+    :param db_session: сессия с базой данных.
+    :param tweet_id: id твита.
+    :param author_id: id автора твита.
+    """
+    if not home_timeline_enabled():
+        return
+
+    await db_session.execute(own_tweet_stmt(tweet_id))
+    await _trim_timelines(db_session, sample_for_trim([author_id]))
+
+    fanout_on_read_qs = await db_session.execute(select(models.User.fanout_on_read).where(models.User.id == author_id))
+    if fanout_on_read_qs.scalar_one():
+        return
+
+    after_id = 0
+    while True:
+        batch_qs = await db_session.execute(followers_batch_stmt(author_id, after_id))
+        batch = batch_qs.all()
+        if not batch:
+            break
+
+        first_id, last_id = batch[0].id, batch[-1].id
+        await db_session.execute(fan_out_stmt(tweet_id, models.Follower.id >= first_id, models.Follower.id <= last_id))
+        await _trim_timelines(db_session, sample_for_trim(row.follower_id for row in batch))
+
+        after_id = last_id
+
+
+async def follow_author(db_session: AsyncSession, user_id: int, author_id: int) -> None:
+    """
+    Учитывает новую подписку: увеличивает счетчик подписчиков автора
+    и добавляет последние твиты автора в ленту нового подписчика.
+
+    :param db_session: сессия с базой данных.
+    :param user_id: id подписчика.
+    :param author_id: id автора.
+    """
+    fanout_on_read_qs = await db_session.execute(
+        followers_count_stmt(author_id, 1).returning(models.User.fanout_on_read)
+    )
+    if not home_timeline_enabled() or fanout_on_read_qs.scalar_one():
+        # твиты такого автора подмешиваются в ленту при ее чтении
+        return
+
+    await db_session.execute(backfill_stmt(user_id, author_id))
+    await _trim_timelines(db_session, [user_id])
+
+
+async def unfollow_author(db_session: AsyncSession, user_id: int, author_id: int) -> None:
+    """
+    Учитывает отписку: уменьшает счетчик подписчиков автора
+    и удаляет твиты автора из ленты бывшего подписчика.
+
+    :param db_session: сессия с базой данных.
+    :param user_id: id бывшего подписчика.
+    :param author_id: id автора.
+    """
+    await db_session.execute(followers_count_stmt(author_id, -1))
+    if not home_timeline_enabled():
+        return
+
+    await db_session.execute(retract_stmt(user_id, author_id))
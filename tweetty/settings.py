@@ -1,4 +1,5 @@
 from environs import Env
+from marshmallow.validate import ContainsOnly, OneOf, Range
 
 env = Env()
 
@@ -18,3 +19,157 @@ API_KEY_PREFIX = "tweetty_"
 
 # Количество байт для генерации токена
 TOKEN_NBYTES = 42  # Why? Read Douglas Adams
+
+# Максимальное количество твитов на странице ленты
+TWEETS_PAGE_MAX_LIMIT = env.int("TWEETS_PAGE_MAX_LIMIT", 100)
+
+# Максимальное количество пользователей на странице лайкнувших твит
+LIKES_PAGE_MAX_LIMIT = env.int("LIKES_PAGE_MAX_LIMIT", 100)
+
+# Количество первых лайкнувших пользователей в кратком представлении лайков твита
+LIKES_PREVIEW_SIZE = env.int("LIKES_PREVIEW_SIZE", 3)
+
+# Количество шардов счетчика лайков твита.
+# При 0 лайки считаются сразу в `tweet.like_count`
+LIKE_COUNTER_SHARDS = env.int("LIKE_COUNTER_SHARDS", 0)
+
+# Период (в секундах) сворачивания шардов счетчиков лайков в `tweet.like_count`
+LIKE_COUNTER_COMPACT_INTERVAL = env.float("LIKE_COUNTER_COMPACT_INTERVAL", 5.0)
+
+# Движок ленты твитов:
+#   query - лента собирается запросом по подпискам пользователя;
+#   timeline - лента читается из материализованной домашней ленты `home_timeline`;
+#   recent - лента собирается в памяти из кэша последних твитов авторов
+FEED_ENGINE = env.str("FEED_ENGINE", "query", validate=OneOf(["query", "timeline", "recent"]))
+
+# Ранжирование ленты твитов:
+#   likes - по количеству лайков, затем по дате-времени публикации;
+#   score - по рейтингу `tweet.score`, в котором вес лайков затухает с возрастом твита
+FEED_RANKING = env.str("FEED_RANKING", "likes", validate=OneOf(["likes", "score"]))
+
+# Период полураспада (в часах) рейтинга твита: твиту, опубликованному на столько раньше,
+# нужно вдвое больше лайков (+1), чтобы стоять в ленте рядом с более новым.
+# После изменения рейтинги пересчитываются командой `tweets rescore`
+FEED_SCORE_HALF_LIFE = env.float("FEED_SCORE_HALF_LIFE", 24.0, validate=Range(min=0, min_inclusive=False))
+
+# Период (в секундах) пересчета рейтингов твитов, лайки которых недавно менялись
+FEED_SCORE_RECOMPUTE_INTERVAL = env.float("FEED_SCORE_RECOMPUTE_INTERVAL", 10.0)
+
+# Окно (в секундах), за которое пересчитываются рейтинги твитов с измененными лайками.
+# Должно быть больше периода пересчета, чтобы изменения не пропускались
+FEED_SCORE_RECOMPUTE_WINDOW = env.float("FEED_SCORE_RECOMPUTE_WINDOW", 300.0)
+
+# Количество твитов, рейтинги которых пересчитываются одним запросом
+FEED_SCORE_RECOMPUTE_BATCH_SIZE = env.int("FEED_SCORE_RECOMPUTE_BATCH_SIZE", 1000)
+
+# Количество последних твитов ленты, из которых собирается персональная лента (`order=personalized`).
+# Глубже персональная лента не листается
+FEED_PERSONALIZED_CANDIDATES = env.int("FEED_PERSONALIZED_CANDIDATES", 2000, validate=Range(min=1))
+
+# Вес близости к автору в персональной ленте: во сколько раз двоичный логарифм (1 + количество
+# лайкнутых твитов автора) весомее такого же логарифма лайков твита
+FEED_AFFINITY_WEIGHT = env.float("FEED_AFFINITY_WEIGHT", 1.0, validate=Range(min=0))
+
+# Собирать JSON ленты твитов одним запросом в БД (`json_build_object`/`json_agg`)
+# и отдавать его клиенту потоком, минуя ORM и Pydantic
+FEED_SQL_JSON = env.bool("FEED_SQL_JSON", False)
+
+# Выполнять самые нагруженные запросы чтения (лента твитов, профиль пользователя)
+# через репозиторий `tweetty.db.repository` на asyncpg, минуя ORM
+RAW_READ_REPOSITORY = env.bool("RAW_READ_REPOSITORY", False)
+
+# Запас (в секундах), с которым опрос ленты на изменения (`since_cursor`) повторно
+# просматривает твиты и лайки, чтобы не пропустить транзакции, зафиксированные с задержкой
+FEED_DELTA_OVERLAP = env.float("FEED_DELTA_OVERLAP", 5.0)
+
+# Максимальная длина домашней ленты пользователя
+HOME_TIMELINE_MAX_LENGTH = env.int("HOME_TIMELINE_MAX_LENGTH", 800)
+
+# Количество подписчиков, по лентам которых твит раскладывается за один запрос
+HOME_TIMELINE_FANOUT_BATCH_SIZE = env.int("HOME_TIMELINE_FANOUT_BATCH_SIZE", 1000)
+
+# Домашняя лента обрезается в среднем при каждом N-ом добавлении в нее твита,
+# чтобы не пересчитывать длину ленты каждого подписчика при каждой публикации
+HOME_TIMELINE_TRIM_EVERY = env.int("HOME_TIMELINE_TRIM_EVERY", 20)
+
+# Количество подписчиков, начиная с превышения которого твиты автора не раскладываются
+# по лентам подписчиков, а подмешиваются в ленту при ее чтении
+HOME_TIMELINE_FANOUT_MAX_FOLLOWERS = env.int("HOME_TIMELINE_FANOUT_MAX_FOLLOWERS", 10000)
+
+# Максимальное количество авторов в кэше последних твитов движка ленты `recent`
+RECENT_TWEETS_CACHE_MAX_AUTHORS = env.int("RECENT_TWEETS_CACHE_MAX_AUTHORS", 10000)
+
+# Количество последних твитов автора, хранимых в кэше движка ленты `recent`
+RECENT_TWEETS_CACHE_AUTHOR_LENGTH = env.int("RECENT_TWEETS_CACHE_AUTHOR_LENGTH", 200)
+
+# Время жизни (в секундах) записи автора в кэше последних твитов.
+# Столько же максимум видны устаревшие данные, измененные другими процессами
+RECENT_TWEETS_CACHE_TTL = env.float("RECENT_TWEETS_CACHE_TTL", 30.0)
+
+# Максимальное количество страниц ленты в кэше отрендеренных страниц. При 0 кэш выключен
+FEED_CACHE_MAX_ENTRIES = env.int("FEED_CACHE_MAX_ENTRIES", 0)
+
+# Время жизни (в секундах) страницы в кэше ленты
+FEED_CACHE_TTL = env.float("FEED_CACHE_TTL", 60.0)
+
+# Количество последних событий, по которым проверяется, не устарела ли страница,
+# пока она рендерилась
+FEED_CACHE_EVENTS_WINDOW = env.int("FEED_CACHE_EVENTS_WINDOW", 1000)
+
+# Максимальное количество пользователей, для которых хранится загруженная заранее
+# следующая страница ленты (по одной на пользователя). При 0 загрузка выключена
+FEED_PREFETCH_MAX_USERS = env.int("FEED_PREFETCH_MAX_USERS", 0)
+
+# Время жизни (в секундах) загруженной заранее страницы ленты
+FEED_PREFETCH_TTL = env.float("FEED_PREFETCH_TTL", 10.0)
+
+# Максимальное количество одновременных фоновых загрузок страниц ленты на процесс API.
+# Сверх него загрузки не запускаются
+FEED_PREFETCH_MAX_PENDING = env.int("FEED_PREFETCH_MAX_PENDING", 4, validate=Range(min=1))
+
+# Максимальное количество твитов в кэше JSON-представлений твитов,
+# из которых собираются страницы ленты. При 0 кэш выключен
+TWEET_FRAGMENT_CACHE_MAX_ENTRIES = env.int("TWEET_FRAGMENT_CACHE_MAX_ENTRIES", 0)
+
+# Время жизни (в секундах) представления твита в кэше
+TWEET_FRAGMENT_CACHE_TTL = env.float("TWEET_FRAGMENT_CACHE_TTL", 300.0)
+
+# Количество последних измененных твитов, версии которых помнит кэш представлений твитов
+TWEET_FRAGMENT_CACHE_EVENTS_WINDOW = env.int("TWEET_FRAGMENT_CACHE_EVENTS_WINDOW", 1000)
+
+# Обработчики, в которых одновременные одинаковые запросы (тот же пользователь и те же
+# параметры) выполняются одним вычислением: get_tweets, get_me
+REQUEST_COALESCING_ROUTES = env.list(
+    "REQUEST_COALESCING_ROUTES", list(), validate=ContainsOnly(["get_tweets", "get_me"])
+)
+
+# Отдавать `ETag` ленты и профилей и отвечать `304 Not Modified`, если данные не менялись.
+# Версии данных считаются по событиям, поэтому при включении процесс слушает канал событий
+CONDITIONAL_RESPONSES = env.bool("CONDITIONAL_RESPONSES", False)
+
+# Минимальный размер (в байтах) ответа, который сжимается gzip или brotli, если клиент
+# принимает сжатие (`Accept-Encoding`). При 0 сжатие выключено
+RESPONSE_COMPRESSION_MIN_SIZE = env.int("RESPONSE_COMPRESSION_MIN_SIZE", 1024)
+
+# Уровень сжатия gzip (1-9)
+RESPONSE_GZIP_LEVEL = env.int("RESPONSE_GZIP_LEVEL", 6, validate=Range(1, 9))
+
+# Качество сжатия brotli (0-11). Качество выше 6 заметно дороже по CPU при небольшом выигрыше в размере
+RESPONSE_BROTLI_QUALITY = env.int("RESPONSE_BROTLI_QUALITY", 4, validate=Range(0, 11))
+
+# Количество последних событий твитов и лайков, которые процесс хранит для потока твитов
+# (`GET /api/tweets/stream`) и досылает клиентам, переподключившимся с `Last-Event-ID`.
+# При 0 поток выключен. Поток получает события других процессов через канал событий
+TWEET_STREAM_HISTORY = env.int("TWEET_STREAM_HISTORY", 0)
+
+# Период (в секундах), с которым поток твитов отправляет комментарий,
+# чтобы прокси не закрывали простаивающее соединение
+TWEET_STREAM_HEARTBEAT_INTERVAL = env.float("TWEET_STREAM_HEARTBEAT_INTERVAL", 15.0)
+
+# Максимальная длительность (в секундах) одного подключения к потоку твитов.
+# После нее клиент переподключается с `Last-Event-ID`, не теряя сообщений,
+# а подключения распределяются между процессами заново
+TWEET_STREAM_MAX_DURATION = env.float("TWEET_STREAM_MAX_DURATION", 300.0)
+
+# Период (в секундах) переподключения к каналу событий после потери соединения
+EVENTS_RECONNECT_INTERVAL = env.float("EVENTS_RECONNECT_INTERVAL", 1.0)
@@ -1,4 +1,4 @@
-from typing import BinaryIO, Optional, TypedDict
+from typing import BinaryIO, Optional, TypedDict, Union
 from urllib.parse import urlencode
 
 import pytest
@@ -48,17 +48,24 @@ class APITestClient:
         self._client = client
 
     @staticmethod
-    def tweets_route(tweet_id: Optional[int] = None, offset: Optional[int] = None, limit: Optional[int] = None) -> str:
+    def tweets_route(
+        tweet_id: Optional[int] = None,
+        offset: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+    ) -> str:
         """Возвращает роут твитов."""
         route = "/api/tweets"
         if tweet_id is not None:
             return f"{route}/{tweet_id}"
 
-        get_params = dict()
+        get_params: dict[str, Union[int, str]] = dict()
         if offset is not None:
             get_params["offset"] = offset
         if limit is not None:
             get_params["limit"] = limit
+        if cursor is not None:
+            get_params["cursor"] = cursor
 
         query_string = urlencode(get_params)
         if query_string:
@@ -94,6 +101,11 @@ class APITestClient:
         """Возвращает роут собственного профиля пользователя."""
         return "/api/users/me"
 
+    @staticmethod
+    def stats_route() -> str:
+        """Возвращает роут статистики."""
+        return "/api/stats"
+
     @staticmethod
     def api_key_header(api_key: str) -> APIKeyHeader:
         """Возвращает заголовок `api-key`."""
@@ -107,10 +119,12 @@ class APITestClient:
             headers=self.api_key_header(api_key),
         )
 
-    async def get_tweets(self, api_key: str, offset: Optional[int] = None, limit: Optional[int] = None) -> Response:
+    async def get_tweets(
+        self, api_key: str, offset: Optional[int] = None, limit: Optional[int] = None, cursor: Optional[str] = None
+    ) -> Response:
         """Получить список твитов."""
         return await self._client.get(
-            self.tweets_route(offset=offset, limit=limit),
+            self.tweets_route(offset=offset, limit=limit, cursor=cursor),
             headers=self.api_key_header(api_key),
         )
 
@@ -168,6 +182,10 @@ class APITestClient:
         """Получить собственный профиль пользователя."""
         return await self._client.get(self.me_route(), headers=self.api_key_header(api_key))
 
+    async def get_stats(self, api_key: str) -> Response:
+        """Получить статистику."""
+        return await self._client.get(self.stats_route(), headers=self.api_key_header(api_key))
+
 
 @pytest.fixture
 def api_client(client: AsyncClient):
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db import models as db_models
+from . import APITestClient
+
+pytestmark = [pytest.mark.anyio, pytest.mark.chronological, pytest.mark.usefixtures("own_db_sessions")]
+
+
+async def feed_page(api_client: APITestClient, api_key: str, **params) -> dict:
+    """Возвращает страницу ленты пользователя в порядке публикации."""
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"order": "chronological", **params},
+        headers=api_client.api_key_header(api_key),
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.parametrize("sql_json", [True, False])
+async def test_chronological_order(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+    sql_json: bool,
+):
+    """Проверка того, что лента упорядочена по дате-времени публикации независимо от лайков."""
+    mocker.patch("tweetty.settings.FEED_SQL_JSON", sql_json)
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    now = datetime.now()
+    tweets = [
+        db_models.Tweet(content="test", user_id=user.id, like_count=like_count, posted_at=now - timedelta(hours=hours))
+        for user, like_count, hours in [
+            (followed_user, 0, 1),
+            (test_user, 5, 2),
+            (followed_user, 10, 3),
+            (test_user, 0, 4),
+            (followed_user, 0, 5),
+        ]
+    ]
+    # твиты одного автора с одинаковой датой-временем упорядочены по id
+    tweets.append(db_models.Tweet(content="test", user_id=test_user.id, posted_at=tweets[-1].posted_at))
+    db_session.add_all(tweets)
+    await db_session.commit()
+    expected_ids = [tweet.id for tweet in tweets[:-2]] + [tweets[-1].id, tweets[-2].id]
+
+    resp = await feed_page(api_client, test_user.api_key)
+    assert [tweet["id"] for tweet in resp["tweets"]] == expected_ids
+
+    pages = list()
+    cursor = None
+    while True:
+        resp = await feed_page(api_client, test_user.api_key, limit=4, **({"cursor": cursor} if cursor else {}))
+        pages.append([tweet["id"] for tweet in resp["tweets"]])
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == [expected_ids[:4], expected_ids[4:]]
+
+    resp = await feed_page(api_client, test_user.api_key, offset=2, limit=2)
+    assert [tweet["id"] for tweet in resp["tweets"]] == expected_ids[2:4]
+
+
+async def test_chronological_statement(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    test_tweet: db_models.Tweet,
+    executed_statements: list[str],
+):
+    """Проверка того, что твиты авторов выбираются без лайков и сливаются после выборки по каждому автору."""
+    executed_statements.clear()
+    resp = await feed_page(api_client, test_user.api_key, likes="compact", fields="content")
+    assert [tweet["id"] for tweet in resp["tweets"]] == [test_tweet.id]
+
+    (page_statement,) = [statement for statement in executed_statements if "LATERAL" in statement]
+    assert '"like"' not in page_statement
+    assert "like_count" not in page_statement.split("LATERAL")[1]
@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from ...api.coalescing import SingleFlight, request_flights
+from ...db import events
+from ...db import models as db_models
+from . import APITestClient
+
+pytestmark = [pytest.mark.anyio, pytest.mark.request_coalescing]
+
+
+class SlowCall:
+    """Вычисление, которое завершается по сигналу."""
+
+    def __init__(self, result: object = None):
+        self.calls = 0
+        self.result = result
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> object:
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_coalesce_concurrent_calls():
+    """Проверка того, что одновременные вызовы с одним ключом выполняют одно вычисление."""
+    flight: SingleFlight = SingleFlight(enabled=True)
+    call = SlowCall("result")
+
+    tasks = [asyncio.create_task(flight.do("key", call)) for _ in range(3)]
+    other_task = asyncio.create_task(flight.do("other", call))
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks, other_task) == ["result"] * 4
+    assert call.calls == 2
+    assert flight.stats().dict() == dict(enabled=True, requests=4, coalesced=2)
+
+    # завершенное вычисление не переиспользуется
+    assert await flight.do("key", call) == "result"
+    assert call.calls == 3
+
+
+async def test_coalesce_errors():
+    """Проверка того, что ошибка вычисления передается всем объединенным запросам."""
+    flight: SingleFlight = SingleFlight(enabled=True)
+    call = SlowCall(ValueError("failed"))
+
+    tasks = [asyncio.create_task(flight.do("key", call)) for _ in range(2)]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert call.calls == 1
+
+
+async def test_coalesce_cancelled_leader():
+    """Проверка того, что после отмены первого запроса вычисление запускается заново."""
+    flight: SingleFlight = SingleFlight(enabled=True)
+    call = SlowCall("result")
+
+    leader = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await follower == "result"
+    assert leader.cancelled()
+    assert call.calls == 2
+    assert flight.coalesced == 0
+
+
+async def test_coalesce_disabled_and_detached():
+    """Проверка выключенного объединения и отсоединения запросов после событий."""
+    call = SlowCall("result")
+    call.release.set()
+    flight: SingleFlight = SingleFlight(enabled=False)
+    assert await asyncio.gather(flight.do("key", call), flight.do("key", call)) == ["result", "result"]
+    assert call.calls == 2
+
+    call = SlowCall("result")
+    flight = SingleFlight(enabled=True)
+    first = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    flight.handle_event(events.Event(events.LIKES_CHANGED, 1, 1))
+    second = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(first, second) == ["result", "result"]
+    assert call.calls == 2
+
+
+async def test_coalescing_routes(api_client: APITestClient, test_user: db_models.User, mocker: MockerFixture):
+    """Проверка обработчиков с включенным объединением запросов и его статистики."""
+    for flight in request_flights.values():
+        mocker.patch.object(flight, "enabled", True)
+        mocker.patch.object(flight, "requests", 0)
+        mocker.patch.object(flight, "coalesced", 0)
+
+    response = await api_client.publish_tweet({"tweet_data": "test"}, test_user.api_key)
+    assert response.status_code == 201
+
+    response = await api_client.get_tweets(test_user.api_key)
+    assert response.status_code == 200
+    assert len(response.json()["tweets"]) == 1
+
+    response = await api_client.get_me(test_user.api_key)
+    assert response.status_code == 200
+    assert response.json()["user"]["id"] == test_user.id
+
+    response = await api_client.get_stats(test_user.api_key)
+    assert response.status_code == 200
+    assert response.json()["request_coalescing"] == {
+        "get_tweets": dict(enabled=True, requests=1, coalesced=0),
+        "get_me": dict(enabled=True, requests=1, coalesced=0),
+    }
@@ -0,0 +1,186 @@
+import gzip
+from collections.abc import AsyncIterator
+from typing import Optional
+
+import brotli
+import msgpack
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient
+from pytest_mock import MockerFixture
+
+from ...api.caches import feed_cache
+from ...api.compression import BROTLI, GZIP, CompressionMiddleware, compress, select_encoding
+from ...api.negotiation import MSGPACK_MEDIA_TYPE
+from ...db import models as db_models
+from . import APITestClient
+
+pytestmark = [pytest.mark.anyio, pytest.mark.compression]
+
+BODY = b'{"result":true}' * 100
+
+
+@pytest.fixture
+def compressed_app() -> FastAPI:
+    """Приложение со сжатием ответов."""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/body")
+    async def get_body(size: int = len(BODY)) -> Response:
+        return Response(BODY[:size], media_type="application/json")
+
+    @app.get("/stream")
+    async def get_stream() -> StreamingResponse:
+        async def chunks() -> AsyncIterator[bytes]:
+            for _ in range(3):
+                yield BODY
+
+        return StreamingResponse(chunks(), media_type="application/json")
+
+    @app.get("/events")
+    async def get_events() -> StreamingResponse:
+        async def events() -> AsyncIterator[bytes]:
+            yield b"data: " + BODY + b"\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/encoded")
+    async def get_encoded() -> Response:
+        return Response(gzip.compress(BODY), media_type="application/json", headers={"Content-Encoding": GZIP})
+
+    return app
+
+
+async def get_raw(app: FastAPI, route: str, accept_encoding: str) -> tuple[dict[str, str], bytes]:
+    """Выполняет GET-запрос и возвращает заголовки и тело ответа без распаковки."""
+    async with AsyncClient(app=app, base_url="http://testserver") as client:
+        async with client.stream("GET", route, headers={"Accept-Encoding": accept_encoding}) as response:
+            assert response.status_code == 200
+            return dict(response.headers), b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+def decompress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Распаковывает тело ответа."""
+    if encoding == GZIP:
+        return gzip.decompress(body)
+    if encoding == BROTLI:
+        return brotli.decompress(body)
+    return body
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        (None, None),
+        ("", None),
+        ("identity", None),
+        ("gzip", GZIP),
+        ("br", BROTLI),
+        ("gzip, br", BROTLI),
+        ("gzip, deflate", GZIP),
+        ("br;q=0.5, gzip", GZIP),
+        ("gzip;q=0.5, br;q=0.8", BROTLI),
+        ("br;q=0, gzip;q=0", None),
+        ("*", BROTLI),
+        ("*;q=0.1, gzip", GZIP),
+        ("br;q=invalid, gzip;q=0.1", GZIP),
+    ],
+)
+def test_select_encoding(accept_encoding: Optional[str], expected: Optional[str]):
+    """Проверка выбора кодировки сжатия по заголовку `Accept-Encoding`."""
+    assert select_encoding(accept_encoding) == expected
+
+
+@pytest.mark.parametrize("encoding", [GZIP, BROTLI])
+async def test_compressed_response(compressed_app: FastAPI, encoding: str):
+    """Проверка сжатия ответов не меньше порогового размера."""
+    headers, body = await get_raw(compressed_app, "/body", encoding)
+    assert headers["content-encoding"] == encoding
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(body) < len(BODY)
+    assert decompress(body, encoding) == BODY
+
+    headers, body = await get_raw(compressed_app, "/stream", encoding)
+    assert headers["content-encoding"] == encoding
+    assert "content-length" not in headers
+    assert decompress(body, encoding) == BODY * 3
+
+
+async def test_uncompressed_response(compressed_app: FastAPI, mocker: MockerFixture):
+    """Проверка ответов, которые отправляются несжатыми."""
+    # клиент не принимает сжатие
+    headers, body = await get_raw(compressed_app, "/body", "identity")
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+    assert body == BODY
+
+    # ответ меньше порогового размера
+    headers, body = await get_raw(compressed_app, "/body?size=100", "gzip")
+    assert "content-encoding" not in headers
+    assert body == BODY[:100]
+
+    # поток событий
+    headers, body = await get_raw(compressed_app, "/events", "gzip")
+    assert "content-encoding" not in headers
+    assert body == b"data: " + BODY + b"\n\n"
+
+    # ответ уже сжат обработчиком
+    headers, body = await get_raw(compressed_app, "/encoded", "br")
+    assert headers["content-encoding"] == GZIP
+    assert gzip.decompress(body) == BODY
+
+    # сжатие выключено
+    mocker.patch("tweetty.settings.RESPONSE_COMPRESSION_MIN_SIZE", 0)
+    headers, body = await get_raw(compressed_app, "/body", "gzip")
+    assert "content-encoding" not in headers
+    assert "vary" not in headers
+    assert body == BODY
+
+
+async def test_cached_page_compressed_once(api_client: APITestClient, test_user: db_models.User, mocker: MockerFixture):
+    """Проверка того, что страница из кэша ленты сжимается один раз на кодировку."""
+    mocker.patch.object(feed_cache, "max_entries", 100)
+    mocker.patch("tweetty.settings.RESPONSE_COMPRESSION_MIN_SIZE", 1)
+    compress_spy = mocker.patch("tweetty.api.routers.tweets.compress", wraps=compress)
+    feed_cache.clear()
+
+    response = await api_client.publish_tweet({"tweet_data": "твит"}, test_user.api_key)
+    assert response.status_code == 201
+
+    try:
+        pages = list()
+        for encoding in [BROTLI, BROTLI, GZIP, GZIP, BROTLI]:
+            response = await api_client._client.get(
+                api_client.tweets_route(),
+                headers={**api_client.api_key_header(test_user.api_key), "Accept-Encoding": encoding},
+            )
+            assert response.status_code == 200
+            assert response.headers["Content-Encoding"] == encoding
+            assert "Accept-Encoding" in response.headers["Vary"]
+            pages.append(response.json())
+
+        assert [call.args[1] for call in compress_spy.call_args_list] == [BROTLI, GZIP]
+        assert all(page == pages[0] for page in pages)
+        assert feed_cache.stats().memory_bytes > 0
+    finally:
+        feed_cache.clear()
+
+
+async def test_compressed_msgpack(api_client: APITestClient, test_user: db_models.User, mocker: MockerFixture):
+    """Проверка того, что ответ в MessagePack сжимается после перекодирования."""
+    mocker.patch("tweetty.settings.RESPONSE_COMPRESSION_MIN_SIZE", 1)
+
+    response = await api_client._client.get(
+        api_client.me_route(),
+        headers={
+            **api_client.api_key_header(test_user.api_key),
+            "Accept": MSGPACK_MEDIA_TYPE,
+            "Accept-Encoding": GZIP,
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert response.headers["Content-Encoding"] == GZIP
+    assert msgpack.unpackb(response.content)["user"]["id"] == test_user.id
@@ -0,0 +1,134 @@
+from typing import Optional
+
+import pytest
+from httpx import Response
+from pytest_mock import MockerFixture
+
+from ...api.etags import ContentVersions, content_versions, etag_matches
+from ...db import events
+from ...db import models as db_models
+from . import APITestClient
+from .test_follows import followed_user  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.etags]
+
+
+@pytest.fixture(autouse=True)
+def enabled_conditional_responses(mocker: MockerFixture):
+    """Включает условные ответы."""
+    mocker.patch.object(content_versions, "enabled", True)
+    content_versions.reset()
+    yield content_versions
+
+
+async def get_conditional(api_client: APITestClient, route: str, api_key: str, etag: Optional[str]) -> Response:
+    """Выполняет GET-запрос с заголовком `If-None-Match`."""
+    headers = {"If-None-Match": etag} if etag is not None else dict()
+    return await api_client._client.get(route, headers={**api_client.api_key_header(api_key), **headers})
+
+
+async def assert_modified(api_client: APITestClient, route: str, api_key: str, etag: Optional[str]) -> str:
+    """Проверяет, что ответ изменился, и возвращает его новый `ETag`."""
+    response = await get_conditional(api_client, route, api_key, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+    response = await get_conditional(api_client, route, api_key, response.headers["ETag"])
+    assert response.status_code == 304
+    assert response.content == b""
+    return response.headers["ETag"]
+
+
+async def test_feed_etag(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+):
+    """Проверка `304 Not Modified` для неизменившейся ленты."""
+    route = api_client.tweets_route()
+    etag = await assert_modified(api_client, route, test_user.api_key, None)
+
+    # твит автора, на которого пользователь не подписан, ленту не меняет
+    response = await api_client.publish_tweet({"tweet_data": "followed"}, followed_user.api_key)
+    tweet_id = response.json()["tweet_id"]
+    response = await get_conditional(api_client, route, test_user.api_key, etag)
+    assert response.status_code == 304
+
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    etag = await assert_modified(api_client, route, test_user.api_key, etag)
+
+    response = await api_client.like(tweet_id, test_user.api_key)
+    assert response.status_code == 201
+    etag = await assert_modified(api_client, route, test_user.api_key, etag)
+
+    response = await api_client.delete_tweet(tweet_id, followed_user.api_key)
+    assert response.status_code == 200
+    etag = await assert_modified(api_client, route, test_user.api_key, etag)
+
+    # `*` совпадает с любой версией
+    response = await get_conditional(api_client, api_client.tweets_route(limit=1), test_user.api_key, "*")
+    assert response.status_code == 304
+
+
+async def test_profile_etag(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+):
+    """Проверка `304 Not Modified` для неизменившихся профилей."""
+    me_route = api_client.me_route()
+    user_route = api_client.users_route(followed_user.id)
+    me_etag = await assert_modified(api_client, me_route, test_user.api_key, None)
+    user_etag = await assert_modified(api_client, user_route, test_user.api_key, None)
+
+    # подписка меняет профили обоих пользователей
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    me_etag = await assert_modified(api_client, me_route, test_user.api_key, me_etag)
+    user_etag = await assert_modified(api_client, user_route, test_user.api_key, user_etag)
+
+    # твиты профиль не меняют
+    response = await api_client.publish_tweet({"tweet_data": "test"}, test_user.api_key)
+    assert response.status_code == 201
+    response = await get_conditional(api_client, me_route, test_user.api_key, me_etag)
+    assert response.status_code == 304
+
+    response = await get_conditional(api_client, api_client.users_route(100500), test_user.api_key, user_etag)
+    assert response.status_code == 404
+
+
+async def test_disabled_etag(api_client: APITestClient, test_user: db_models.User, mocker: MockerFixture):
+    """Проверка того, что без включенных условных ответов `ETag` не отдается."""
+    mocker.patch.object(content_versions, "enabled", False)
+
+    for route in [api_client.tweets_route(), api_client.me_route()]:
+        response = await get_conditional(api_client, route, test_user.api_key, "*")
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+
+
+def test_content_versions():
+    """Проверка версий данных и сравнения `ETag`."""
+    versions = ContentVersions(enabled=True)
+    feed_version = versions.feed_version(1, [1, 2])
+    profile_version = versions.profile_version(1)
+
+    versions.handle_event(events.Event(events.TWEETS_CHANGED, 3, 1))
+    assert versions.feed_version(1, [1, 2]) == feed_version
+
+    versions.handle_event(events.Event(events.LIKES_CHANGED, 2))
+    assert versions.feed_version(1, [1, 2]) > feed_version
+    assert versions.profile_version(1) == profile_version
+
+    feed_version = versions.feed_version(1, [1, 2])
+    versions.handle_event(events.Event(events.TWEETS_CHANGED, 3))
+    assert versions.feed_version(1, [1, 2]) > feed_version
+    assert versions.profile_version(1) > profile_version
+
+    etag = versions.etag(feed_version)
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"other"', etag)
+    assert not etag_matches(None, etag)
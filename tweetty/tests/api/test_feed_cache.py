@@ -0,0 +1,131 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from ...api.caches import FeedCache, FeedPage, feed_cache
+from ...db import events
+from ...db import models as db_models
+from . import APITestClient
+from .test_follows import followed_user  # noqa: F401
+from .test_tweets import test_tweet  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.feed_cache]
+
+
+@pytest.fixture(autouse=True)
+def enabled_feed_cache(mocker: MockerFixture):
+    """Включает кэш страниц ленты."""
+    mocker.patch.object(feed_cache, "max_entries", 100)
+    feed_cache.clear()
+    yield feed_cache
+    feed_cache.clear()
+
+
+async def get_feed(api_client: APITestClient, api_key: str, **params) -> tuple[list[int], bool]:
+    """Возвращает id твитов страницы ленты и признак того, что страница взята из кэша."""
+    hits = feed_cache.hits
+    response = await api_client.get_tweets(api_key, **params)
+    assert response.status_code == 200
+    return [tweet["id"] for tweet in response.json()["tweets"]], feed_cache.hits > hits
+
+
+async def test_cached_page(api_client: APITestClient, test_user: db_models.User):
+    """Проверка того, что повторный запрос страницы отдается из кэша."""
+    response = await api_client.publish_tweet({"tweet_data": "test"}, test_user.api_key)
+    tweet_id = response.json()["tweet_id"]
+
+    assert await get_feed(api_client, test_user.api_key) == ([tweet_id], False)
+    assert await get_feed(api_client, test_user.api_key) == ([tweet_id], True)
+
+    # другие параметры страницы - другая запись кэша
+    assert await get_feed(api_client, test_user.api_key, limit=1) == ([tweet_id], False)
+    assert await get_feed(api_client, test_user.api_key, limit=1) == ([tweet_id], True)
+
+
+async def test_invalidation(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+    test_tweet: db_models.Tweet,  # noqa: F811
+):
+    """Проверка удаления страниц при изменении подписок, твитов и лайков."""
+    assert await get_feed(api_client, test_user.api_key) == ([test_tweet.id], False)
+
+    # подписка меняет ленту
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    assert await get_feed(api_client, test_user.api_key) == ([test_tweet.id], False)
+
+    # твит читаемого автора
+    response = await api_client.publish_tweet({"tweet_data": "followed"}, followed_user.api_key)
+    followed_tweet_id = response.json()["tweet_id"]
+    assert await get_feed(api_client, test_user.api_key) == ([followed_tweet_id, test_tweet.id], False)
+
+    # лайк твита из ленты меняет порядок
+    response = await api_client.like(test_tweet.id, followed_user.api_key)
+    assert response.status_code == 201
+    assert await get_feed(api_client, test_user.api_key) == ([test_tweet.id, followed_tweet_id], False)
+
+    response = await api_client.unlike(test_tweet.id, followed_user.api_key)
+    assert response.status_code == 200
+    assert await get_feed(api_client, test_user.api_key) == ([followed_tweet_id, test_tweet.id], False)
+
+    # удаление твита читаемого автора
+    response = await api_client.delete_tweet(followed_tweet_id, followed_user.api_key)
+    assert response.status_code == 200
+    assert await get_feed(api_client, test_user.api_key) == ([test_tweet.id], False)
+
+    # отписка
+    await api_client.follow(followed_user.id, test_user.api_key)
+    await api_client.publish_tweet({"tweet_data": "followed"}, followed_user.api_key)
+    assert len((await get_feed(api_client, test_user.api_key))[0]) == 2
+    response = await api_client.unfollow(followed_user.id, test_user.api_key)
+    assert response.status_code == 200
+    assert await get_feed(api_client, test_user.api_key) == ([test_tweet.id], False)
+
+    # события других пользователей страницу не удаляют
+    events.dispatch(events.Event(events.TWEETS_CHANGED, 100500, 100500))
+    events.dispatch(events.Event(events.FOLLOWINGS_CHANGED, followed_user.id))
+    assert await get_feed(api_client, test_user.api_key) == ([test_tweet.id], True)
+
+
+async def test_stats(api_client: APITestClient, test_user: db_models.User):
+    """Проверка статистики кэша."""
+    await get_feed(api_client, test_user.api_key)
+    await get_feed(api_client, test_user.api_key)
+
+    response = await api_client.get_stats(test_user.api_key)
+    assert response.status_code == 200
+
+    stats = response.json()["feed_cache"]
+    assert stats["entries"] == 1
+    assert stats["memory_bytes"] > 0
+    assert stats["hits"] >= 1
+    assert 0 < stats["hit_rate"] <= 1
+
+
+def test_eviction_and_skipped_stale_pages():
+    """Проверка вытеснения страниц и пропуска страниц, устаревших во время рендеринга."""
+    cache = FeedCache(max_entries=2, ttl=60, events_window=2)
+
+    for user_id in range(3):
+        assert cache.set(cache.begin(), user_id, user_id, [user_id], FeedPage(b"page", None))
+    assert len(cache) == 2
+    assert cache.evictions == 1
+    assert cache.get(0) is None
+
+    # событие по автору страницы во время рендеринга
+    token = cache.begin()
+    cache.handle_event(events.Event(events.LIKES_CHANGED, 10, 1))
+    assert not cache.set(token, "stale", 5, [5, 10], FeedPage(b"page", None))
+    # событие по другому автору странице не мешает
+    assert cache.set(token, "fresh", 6, [6], FeedPage(b"page", None))
+
+    # события с начала рендеринга не помещаются в окно
+    token = cache.begin()
+    for _ in range(3):
+        cache.handle_event(events.Event(events.TWEETS_CHANGED, 100, 1))
+    assert not cache.set(token, "window", 7, [7], FeedPage(b"page", None))
+
+    cache.handle_event(events.Event(events.EVENTS_RESET, 0))
+    assert len(cache) == 0
+    assert cache.stats().memory_bytes == 0
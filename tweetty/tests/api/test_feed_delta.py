@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api.cursors import DeltaCursor
+from ...db import models as db_models
+from . import APITestClient, assert_http_error
+from .test_follows import followed_user  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.feed_delta]
+
+
+async def get_delta(api_client: APITestClient, api_key: str, **params) -> dict:
+    """Возвращает изменения ленты."""
+    response = await api_client._client.get(
+        api_client.tweets_route(), params=params, headers=api_client.api_key_header(api_key)
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def test_feed_delta(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+):
+    """Проверка опроса ленты на новые твиты и изменения лайков."""
+    mocker.patch("tweetty.settings.FEED_DELTA_OVERLAP", 0)
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    response = await api_client.publish_tweet({"tweet_data": "old"}, followed_user.api_key)
+    old_tweet_id = response.json()["tweet_id"]
+    # в тестовой БД время транзакции не меняется, поэтому полученный клиентом твит сдвигаем в прошлое
+    await db_session.execute(
+        update(db_models.Tweet).where(db_models.Tweet.id == old_tweet_id).values(posted_at=datetime(2000, 1, 1))
+    )
+
+    # первый опрос по id последнего полученного твита
+    delta = await get_delta(api_client, test_user.api_key, since_id=old_tweet_id)
+    assert delta["tweets"] == list()
+    assert delta["likes"] == list()
+    since_cursor = delta["next_since_cursor"]
+    assert DeltaCursor.decode(since_cursor).id == old_tweet_id
+
+    response = await api_client.like(old_tweet_id, test_user.api_key)
+    assert response.status_code == 201
+    new_tweet_ids = list()
+    for user in [followed_user, test_user]:
+        response = await api_client.publish_tweet({"tweet_data": "new"}, user.api_key)
+        new_tweet_ids.append(response.json()["tweet_id"])
+
+    delta = await get_delta(api_client, test_user.api_key, since_cursor=since_cursor)
+    assert [tweet["id"] for tweet in delta["tweets"]] == new_tweet_ids
+    assert delta["tweets"][0]["author"]["id"] == followed_user.id
+    assert delta["likes"] == [{"id": old_tweet_id, "like_count": 1}]
+    assert DeltaCursor.decode(delta["next_since_cursor"]).id == new_tweet_ids[-1]
+
+    # новых твитов больше, чем `limit`
+    delta = await get_delta(api_client, test_user.api_key, since_cursor=since_cursor, limit=1)
+    assert [tweet["id"] for tweet in delta["tweets"]] == new_tweet_ids[:1]
+    next_cursor = DeltaCursor.decode(delta["next_since_cursor"])
+    assert next_cursor.id == new_tweet_ids[0]
+    assert next_cursor.at == DeltaCursor.decode(since_cursor).at
+
+    delta = await get_delta(api_client, test_user.api_key, since_id=new_tweet_ids[-1])
+    assert delta["tweets"] == list()
+
+
+async def test_feed_delta_overlap(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+):
+    """Проверка того, что твиты, опубликованные незадолго до опроса, возвращаются повторно."""
+    response = await api_client.publish_tweet({"tweet_data": "test"}, test_user.api_key)
+    tweet_id = response.json()["tweet_id"]
+    await db_session.execute(
+        update(db_models.Tweet)
+        .where(db_models.Tweet.id == tweet_id)
+        .values(posted_at=func.now() - timedelta(minutes=30))
+    )
+
+    since_cursor = (await get_delta(api_client, test_user.api_key, since_id=tweet_id))["next_since_cursor"]
+
+    mocker.patch("tweetty.settings.FEED_DELTA_OVERLAP", 0)
+    delta = await get_delta(api_client, test_user.api_key, since_cursor=since_cursor)
+    assert delta["tweets"] == list()
+
+    mocker.patch("tweetty.settings.FEED_DELTA_OVERLAP", 3600)
+    delta = await get_delta(api_client, test_user.api_key, since_cursor=since_cursor)
+    assert [tweet["id"] for tweet in delta["tweets"]] == [tweet_id]
+
+
+async def test_feed_delta_invalid_cursor(api_client: APITestClient, test_user: db_models.User):
+    """Проверка некорректного курсора опроса."""
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"since_cursor": "invalid"},
+        headers=api_client.api_key_header(test_user.api_key),
+    )
+    assert response.status_code == 422
+    assert_http_error(response.json())
@@ -57,6 +57,10 @@ async def test_follow(
     assert len(follows) == 1
     assert follows[0] is not None
 
+    # проверяем счетчик подписчиков
+    await db_session.refresh(followed_user)
+    assert followed_user.followers_count == 1
+
 
 @pytest.mark.post_follow
 async def test_follow_again(
@@ -84,6 +88,10 @@ async def test_follow_again(
     assert len(follows) == 1
     assert follows[0] is not None
 
+    # проверяем счетчик подписчиков
+    await db_session.refresh(followed_user)
+    assert followed_user.followers_count == 1
+
 
 @pytest.mark.post_follow
 async def test_follow_self(api_client: APITestClient, test_user: db_models.User):
@@ -127,6 +135,7 @@ async def test_unfollow(
         follower_id=test_user.id,
     )
     db_session.add(follow)
+    followed_user.followers_count = 1
     await db_session.commit()
 
     response = await api_client.unfollow(followed_user.id, test_user.api_key)
@@ -143,6 +152,10 @@ async def test_unfollow(
     )
     assert len(follow_qs.scalars().all()) == 0
 
+    # проверяем счетчик подписчиков
+    await db_session.refresh(followed_user)
+    assert followed_user.followers_count == 0
+
 
 @pytest.mark.delete_follow
 @pytest.mark.parametrize("follow_himself", [True, False])
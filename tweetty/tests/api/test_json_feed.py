@@ -0,0 +1,99 @@
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api.recent_tweets import recent_tweets_cache
+from ...db import models as db_models
+from ...settings import STATIC_DIR
+from . import APITestClient
+
+pytestmark = [pytest.mark.anyio, pytest.mark.json_feed, pytest.mark.usefixtures("own_db_sessions")]
+
+
+@pytest.fixture(params=["query", "timeline", "recent"])
+def feed_engine(request: pytest.FixtureRequest, mocker: MockerFixture):
+    """Движок ленты твитов."""
+    mocker.patch("tweetty.settings.FEED_ENGINE", request.param)
+    recent_tweets_cache.clear()
+    yield request.param
+    recent_tweets_cache.clear()
+
+
+@pytest.fixture
+async def feed_tweets(
+    feed_engine: str,
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: AsyncSession,
+):
+    """Твиты ленты пользователя `test_user` с вложениями и лайками."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    tweet_ids = list()
+    for i, user in enumerate([test_user, followed_user, followed_user, test_user]):
+        media = db_models.TweetMedia(rel_uri=STATIC_DIR + f"/test{i}.png")
+        db_session.add(media)
+        await db_session.commit()
+
+        response = await api_client.publish_tweet(
+            {"tweet_data": f'"tweet" {i} \\ ё', "tweet_media_ids": [media.id] if i % 2 else []}, user.api_key
+        )
+        assert response.status_code == 201
+        tweet_ids.append(response.json()["tweet_id"])
+
+    for tweet_id, likers in zip(tweet_ids, [[test_user], [test_user, followed_user], [], [followed_user]]):
+        for liker in likers:
+            response = await api_client.like(tweet_id, liker.api_key)
+            assert response.status_code == 201
+
+    yield tweet_ids
+
+
+async def test_json_feed_same_as_orm(
+    api_client: APITestClient, test_user: db_models.User, feed_tweets: list[int], mocker: MockerFixture
+):
+    """Проверка того, что лента, собранная в БД, совпадает с лентой, собранной через ORM."""
+    pages_params: list[dict] = [dict(), dict(limit=3), dict(limit=2, offset=2)]
+    while pages_params:
+        params = pages_params.pop(0)
+
+        mocker.patch("tweetty.settings.FEED_SQL_JSON", False)
+        orm_response = await api_client.get_tweets(test_user.api_key, **params)
+        assert orm_response.status_code == 200
+
+        mocker.patch("tweetty.settings.FEED_SQL_JSON", True)
+        json_response = await api_client.get_tweets(test_user.api_key, **params)
+        assert json_response.status_code == 200
+        assert json_response.headers["content-type"] == "application/json"
+
+        resp = json_response.json()
+        assert resp == orm_response.json()
+        if not params:
+            assert {tweet["id"] for tweet in resp["tweets"]} == set(feed_tweets)
+
+        # следующая страница по курсору тоже должна совпадать
+        if resp["next_cursor"] is not None:
+            pages_params.append(dict(limit=params["limit"], cursor=resp["next_cursor"]))
+
+
+async def test_json_feed_own_session(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    feed_tweets: list[int],
+    db_session: AsyncSession,
+    own_db_sessions: list[AsyncSession],
+    mocker: MockerFixture,
+):
+    """Проверка того, что лента, собранная в БД, читается в своей сессии, а не в сессии запроса."""
+    mocker.patch("tweetty.settings.FEED_SQL_JSON", True)
+    request_stream = mocker.spy(db_session, "stream")
+
+    response = await api_client.get_tweets(test_user.api_key)
+    assert response.status_code == 200
+    assert {tweet["id"] for tweet in response.json()["tweets"]} == set(feed_tweets)
+
+    assert request_stream.call_count == 0
+    assert len(own_db_sessions) == 1
+    assert not own_db_sessions[0].in_transaction()
@@ -1,9 +1,10 @@
 import pytest
+from pytest_mock import MockerFixture
 from sqlalchemy import and_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db import models as db_models
-from . import APITestClient, assert_http_error
+from . import APITestClient, assert_http_error, assert_tweet_list
 
 pytestmark = [pytest.mark.anyio, pytest.mark.likes]
 
@@ -69,6 +70,10 @@ async def test_like_tweet(
     assert len(likes) == 1
     assert likes[0] is not None
 
+    # проверяем, что увеличился счетчик лайков твита
+    await db_session.refresh(test_tweet, attribute_names=["like_count"])
+    assert test_tweet.like_count == 1
+
 
 @pytest.mark.post_like
 @pytest.mark.parametrize("own_tweet", [True, False])
@@ -107,6 +112,10 @@ async def test_like_tweet_again(
     assert len(likes) == 1
     assert likes[0] is not None
 
+    # повторный лайк не увеличивает счетчик лайков
+    await db_session.refresh(test_tweet, attribute_names=["like_count"])
+    assert test_tweet.like_count == 1
+
 
 @pytest.mark.post_like
 async def test_like_not_existed_tweet(api_client: APITestClient, test_user: db_models.User):
@@ -156,6 +165,7 @@ async def test_unlike_tweet(
         user_id=user.id,
     )
     db_session.add(like)
+    test_tweet.like_count = 1
     await db_session.commit()
 
     response = await api_client.unlike(test_tweet.id, user.api_key)
@@ -170,6 +180,10 @@ async def test_unlike_tweet(
     )
     assert len(like_qs.scalars().all()) == 0
 
+    # проверяем, что уменьшился счетчик лайков твита
+    await db_session.refresh(test_tweet, attribute_names=["like_count"])
+    assert test_tweet.like_count == 0
+
 
 @pytest.mark.delete_like
 @pytest.mark.parametrize("own_tweet", [True, False])
@@ -195,6 +209,7 @@ async def test_unlike_tweet_again(
         user_id=user.id,
     )
     db_session.add(like)
+    test_tweet.like_count = 1
     await db_session.commit()
 
     # дизлайкаем
@@ -209,6 +224,10 @@ async def test_unlike_tweet_again(
     resp = response.json()
     assert resp["result"] is True
 
+    # повторный дизлайк не уменьшает счетчик лайков
+    await db_session.refresh(test_tweet, attribute_names=["like_count"])
+    assert test_tweet.like_count == 0
+
 
 @pytest.mark.delete_like
 async def test_unlike_not_existed_tweet(api_client: APITestClient, test_user: db_models.User):
@@ -217,3 +236,85 @@ async def test_unlike_not_existed_tweet(api_client: APITestClient, test_user: db
     assert response.status_code == 404
 
     assert_http_error(response.json())
+
+
+@pytest.mark.get_likes
+async def test_get_tweet_likes(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    test_tweet: db_models.Tweet,
+    liker_user: db_models.User,
+):
+    """Проверка постраничного списка лайкнувших твит."""
+    for user in [liker_user, test_user]:
+        response = await api_client.like(test_tweet.id, user.api_key)
+        assert response.status_code == 201
+
+    route = api_client.likes_route(test_tweet.id)
+    response = await api_client._client.get(
+        route, params={"limit": 1}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 200
+    resp = response.json()
+    assert resp["users"] == [{"id": liker_user.id, "name": liker_user.nickname}]
+
+    response = await api_client._client.get(
+        route, params={"limit": 1, "cursor": resp["next_cursor"]}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    resp = response.json()
+    assert resp["users"] == [{"id": test_user.id, "name": test_user.nickname}]
+
+    response = await api_client._client.get(
+        route, params={"limit": 1, "cursor": resp["next_cursor"]}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.json() == {"result": True, "users": [], "next_cursor": None}
+
+    response = await api_client._client.get(
+        route, params={"cursor": "invalid"}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 422
+    assert_http_error(response.json())
+
+    response = await api_client._client.get(
+        api_client.likes_route(100500), headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 404
+    assert_http_error(response.json())
+
+
+@pytest.mark.get_likes
+async def test_compact_likes(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    test_tweet: db_models.Tweet,
+    liker_user: db_models.User,
+    mocker: MockerFixture,
+):
+    """Проверка краткого представления лайков в ленте."""
+    mocker.patch("tweetty.settings.LIKES_PREVIEW_SIZE", 1)
+    for user in [liker_user, test_user]:
+        response = await api_client.like(test_tweet.id, user.api_key)
+        assert response.status_code == 201
+
+    response = await api_client._client.get(
+        api_client.tweets_route(), params={"likes": "compact"}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 200
+    resp = response.json()
+    assert_tweet_list(resp, 1)
+    tweet = resp["tweets"][0]
+    assert "likes" not in tweet
+    assert tweet["id"] == test_tweet.id
+    assert tweet["author"] == {"id": test_user.id, "name": test_user.nickname}
+    assert tweet["like_count"] == 2
+    assert tweet["liked_by_me"] is True
+    assert tweet["first_likers"] == [{"id": liker_user.id, "name": liker_user.nickname}]
+
+    response = await api_client.unlike(test_tweet.id, test_user.api_key)
+    assert response.status_code == 200
+    response = await api_client._client.get(
+        api_client.tweets_route(), params={"likes": "compact"}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    tweet = response.json()["tweets"][0]
+    assert tweet["like_count"] == 1
+    assert tweet["liked_by_me"] is False
@@ -0,0 +1,112 @@
+from typing import Optional
+
+import msgpack
+import pytest
+from httpx import Response
+
+from ...api.negotiation import MSGPACK_MEDIA_TYPE, prefers_msgpack
+from ...db import models as db_models
+from . import APITestClient, assert_http_error, assert_tweet_list
+from .test_follows import followed_user  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.negotiation]
+
+
+async def get_msgpack(api_client: APITestClient, route: str, api_key: str) -> Response:
+    """Выполняет GET-запрос с заголовком `Accept: application/msgpack`."""
+    return await api_client._client.get(
+        route, headers={**api_client.api_key_header(api_key), "Accept": MSGPACK_MEDIA_TYPE}
+    )
+
+
+async def post_msgpack(api_client: APITestClient, route: str, content: bytes, api_key: str) -> Response:
+    """Выполняет POST-запрос с телом и ответом в MessagePack."""
+    return await api_client._client.post(
+        route,
+        content=content,
+        headers={
+            **api_client.api_key_header(api_key),
+            "Accept": MSGPACK_MEDIA_TYPE,
+            "Content-Type": MSGPACK_MEDIA_TYPE,
+        },
+    )
+
+
+def assert_msgpack(response: Response) -> dict:
+    """Проверяет, что ответ в MessagePack, и возвращает его данные."""
+    assert response.headers["Content-Type"] == MSGPACK_MEDIA_TYPE
+    assert "Accept" in response.headers["Vary"]
+    return msgpack.unpackb(response.content)
+
+
+@pytest.mark.parametrize(
+    "accept,expected",
+    [
+        (None, False),
+        ("application/json", False),
+        ("*/*", False),
+        ("application/msgpack", True),
+        ("application/x-msgpack", True),
+        ("application/msgpack, application/json", False),
+        ("application/json;q=0.5, application/msgpack", True),
+        ("application/msgpack;q=0.5, */*", False),
+        ("application/msgpack;q=invalid", False),
+    ],
+)
+def test_prefers_msgpack(accept: Optional[str], expected: bool):
+    """Проверка выбора MessagePack по заголовку `Accept`."""
+    assert prefers_msgpack(accept) is expected
+
+
+async def test_msgpack_feed(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+):
+    """Проверка того, что тело запроса и ответы в MessagePack содержат те же данные, что и в JSON."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    response = await post_msgpack(
+        api_client, api_client.tweets_route(), msgpack.packb({"tweet_data": "твит"}), followed_user.api_key
+    )
+    assert response.status_code == 201
+    tweet_id = assert_msgpack(response)["tweet_id"]
+
+    response = await api_client.like(tweet_id, test_user.api_key)
+    assert response.status_code == 201
+
+    for route in [api_client.tweets_route(), api_client.tweets_route() + "?shape=normalized", api_client.me_route()]:
+        json_response = await api_client._client.get(route, headers=api_client.api_key_header(test_user.api_key))
+        assert json_response.headers["Content-Type"] == "application/json"
+        assert "Accept" in json_response.headers["Vary"]
+
+        response = await get_msgpack(api_client, route, test_user.api_key)
+        assert response.status_code == 200
+        assert assert_msgpack(response) == json_response.json()
+        assert len(response.content) < len(json_response.content)
+
+    response = await get_msgpack(api_client, api_client.tweets_route(), test_user.api_key)
+    assert_tweet_list(assert_msgpack(response), 1)
+
+
+async def test_msgpack_errors(api_client: APITestClient, test_user: db_models.User):
+    """Проверка ошибок в MessagePack."""
+    response = await post_msgpack(api_client, api_client.tweets_route(), b"\xc1", test_user.api_key)
+    assert response.status_code == 400
+    assert_http_error(assert_msgpack(response))
+
+    # значения, которых нет в JSON, не принимаются
+    response = await post_msgpack(
+        api_client, api_client.tweets_route(), msgpack.packb({"tweet_data": b"bytes"}), test_user.api_key
+    )
+    assert response.status_code == 400
+    assert_http_error(assert_msgpack(response))
+
+    response = await post_msgpack(api_client, api_client.tweets_route(), msgpack.packb(dict()), test_user.api_key)
+    assert response.status_code == 422
+    assert "detail" in assert_msgpack(response)
+
+    response = await get_msgpack(api_client, api_client.users_route(test_user.id + 1000), test_user.api_key)
+    assert response.status_code == 404
+    assert_http_error(assert_msgpack(response))
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db import models as db_models
+from . import APITestClient
+
+pytestmark = [pytest.mark.anyio, pytest.mark.personalized]
+
+
+async def feed_page(api_client: APITestClient, api_key: str, **params) -> dict:
+    """Возвращает страницу персональной ленты пользователя."""
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"order": "personalized", **params},
+        headers=api_client.api_key_header(api_key),
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def feed_tweet_ids(api_client: APITestClient, api_key: str, **params) -> list[int]:
+    """Возвращает id твитов страницы персональной ленты пользователя."""
+    return [tweet["id"] for tweet in (await feed_page(api_client, api_key, **params))["tweets"]]
+
+
+async def get_affinity(db_session: AsyncSession, user_id: int, author_id: int) -> Optional[int]:
+    """Возвращает количество твитов автора, лайкнутых пользователем."""
+    return await db_session.scalar(
+        select(db_models.AuthorAffinity.like_count).where(
+            db_models.AuthorAffinity.user_id == user_id,
+            db_models.AuthorAffinity.author_id == author_id,
+        )
+    )
+
+
+async def test_personalized_order(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+):
+    """Проверка того, что твиты авторов, которых пользователь лайкает, поднимаются в персональной ленте."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    now = datetime.now()
+    own, followed, *liked = tweets = [
+        db_models.Tweet(content="test", user_id=user.id, posted_at=now - age)
+        for user, age in [
+            (test_user, timedelta()),
+            (followed_user, timedelta(days=1)),
+            (followed_user, timedelta(days=10)),
+            (followed_user, timedelta(days=11)),
+        ]
+    ]
+    db_session.add_all(tweets)
+    await db_session.commit()
+
+    # без лайков лента упорядочена по возрасту твитов
+    assert await feed_tweet_ids(api_client, test_user.api_key) == [tweet.id for tweet in tweets]
+
+    for tweet in liked:
+        response = await api_client.like(tweet.id, test_user.api_key)
+        assert response.status_code == 201
+
+    # близость к автору (log2(1 + 2)) перевешивает сутки разницы в возрасте
+    expected_ids = [followed.id, own.id, liked[0].id, liked[1].id]
+    assert await feed_tweet_ids(api_client, test_user.api_key) == expected_ids
+    # порядок по рейтингу от близости не зависит
+    response = await api_client.get_tweets(test_user.api_key)
+    assert [tweet["id"] for tweet in response.json()["tweets"]] == [liked[0].id, liked[1].id, own.id, followed.id]
+
+    received_ids: list[int] = list()
+    cursor = None
+    while True:
+        resp = await feed_page(api_client, test_user.api_key, limit=1, **({"cursor": cursor} if cursor else {}))
+        received_ids.extend(tweet["id"] for tweet in resp["tweets"])
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+    assert received_ids == expected_ids
+    assert await feed_tweet_ids(api_client, test_user.api_key, offset=2, limit=2) == expected_ids[2:]
+
+    # персональная лента собирается только из последних твитов
+    mocker.patch("tweetty.settings.FEED_PERSONALIZED_CANDIDATES", 2)
+    assert await feed_tweet_ids(api_client, test_user.api_key) == [followed.id, own.id]
+
+
+async def test_author_affinity(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: AsyncSession,
+):
+    """Проверка изменения близости к автору вместе с лайками и удалением твитов."""
+    tweet_ids = list()
+    for _ in range(2):
+        response = await api_client.publish_tweet({"tweet_data": "test"}, followed_user.api_key)
+        assert response.status_code == 201
+        tweet_ids.append(response.json()["tweet_id"])
+
+    for tweet_id in tweet_ids:
+        response = await api_client.like(tweet_id, test_user.api_key)
+        assert response.status_code == 201
+    # повторный лайк не учитывается
+    response = await api_client.like(tweet_ids[0], test_user.api_key)
+    assert response.status_code == 200
+    assert await get_affinity(db_session, test_user.id, followed_user.id) == 2
+
+    response = await api_client.unlike(tweet_ids[0], test_user.api_key)
+    assert response.status_code == 200
+    response = await api_client.unlike(tweet_ids[0], test_user.api_key)
+    assert response.status_code == 200
+    assert await get_affinity(db_session, test_user.id, followed_user.id) == 1
+
+    response = await api_client.delete_tweet(tweet_ids[1], followed_user.api_key)
+    assert response.status_code == 200
+    assert await get_affinity(db_session, test_user.id, followed_user.id) == 0
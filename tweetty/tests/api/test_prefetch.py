@@ -0,0 +1,159 @@
+import asyncio
+from typing import Optional
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api.caches import FeedPage
+from ...api.prefetch import FeedPrefetcher, feed_prefetcher
+from ...api.routers import tweets as tweets_router
+from ...db import models as db_models
+from . import APITestClient
+from .test_follows import followed_user  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.prefetch, pytest.mark.usefixtures("own_db_sessions")]
+
+
+@pytest.fixture(autouse=True)
+def enabled_feed_prefetcher(mocker: MockerFixture):
+    """Включает загрузку страниц ленты заранее."""
+    mocker.patch.object(feed_prefetcher, "max_entries", 100)
+    feed_prefetcher.clear()
+    yield feed_prefetcher
+    feed_prefetcher.clear()
+
+
+@pytest.fixture
+async def test_tweets(test_user: db_models.User, db_session: AsyncSession) -> list[db_models.Tweet]:
+    tweets = [db_models.Tweet(content=f"test {i}", user_id=test_user.id) for i in range(5)]
+    db_session.add_all(tweets)
+    await db_session.commit()
+    return tweets
+
+
+async def get_feed(
+    api_client: APITestClient, api_key: str, cursor: Optional[str] = None
+) -> tuple[list[int], Optional[str], bool]:
+    """Возвращает id твитов страницы ленты, курсор следующей страницы и признак того, что страница загружена заранее."""
+    hits = feed_prefetcher.hits
+    response = await api_client.get_tweets(api_key, limit=2, cursor=cursor)
+    assert response.status_code == 200
+    resp = response.json()
+    return [tweet["id"] for tweet in resp["tweets"]], resp["next_cursor"], feed_prefetcher.hits > hits
+
+
+async def test_prefetched_page(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    test_tweets: list[db_models.Tweet],
+    mocker: MockerFixture,
+):
+    """Проверка того, что следующая страница отдается из загруженных заранее без рендеринга."""
+    # страницы без загрузки заранее
+    feed_prefetcher.max_entries = 0
+    expected_pages = list()
+    cursor = None
+    while True:
+        ids, cursor, _ = await get_feed(api_client, test_user.api_key, cursor)
+        expected_pages.append(ids)
+        if cursor is None:
+            break
+    feed_prefetcher.max_entries = 100
+    assert len(expected_pages) == 3
+
+    render_feed_page = mocker.spy(tweets_router, "render_feed_page")
+    # курсор следующей страницы хранится вместе со страницей, а не читается из ее JSON
+    loads = mocker.spy(tweets_router.orjson, "loads")
+    first_ids, cursor, prefetched = await get_feed(api_client, test_user.api_key)
+    assert not prefetched
+    # первая страница и загрузка второй
+    assert render_feed_page.call_count == 2
+    assert len(feed_prefetcher) == 1
+
+    second_ids, cursor, prefetched = await get_feed(api_client, test_user.api_key, cursor)
+    assert prefetched
+    # только загрузка третьей страницы
+    assert render_feed_page.call_count == 3
+
+    third_ids, cursor, prefetched = await get_feed(api_client, test_user.api_key, cursor)
+    assert prefetched
+    assert cursor is None
+    # у последней страницы нет следующей: загружать нечего
+    assert render_feed_page.call_count == 3
+    assert len(feed_prefetcher) == 0
+
+    assert [first_ids, second_ids, third_ids] == expected_pages
+    assert loads.call_count == 0
+
+    # страница отдается один раз
+    _, cursor, _ = await get_feed(api_client, test_user.api_key)
+    assert (await get_feed(api_client, test_user.api_key, cursor))[2]
+    assert not (await get_feed(api_client, test_user.api_key, cursor))[2]
+
+
+async def test_invalidation(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+    test_tweets: list[db_models.Tweet],
+):
+    """Проверка того, что загруженная заранее страница удаляется при изменении ленты."""
+    _, cursor, _ = await get_feed(api_client, test_user.api_key)
+    assert len(feed_prefetcher) == 1
+
+    response = await api_client.like(test_tweets[0].id, followed_user.api_key)
+    assert response.status_code == 201
+    assert len(feed_prefetcher) == 0
+    assert not (await get_feed(api_client, test_user.api_key, cursor))[2]
+
+    # другая страница заменяет загруженную
+    _, cursor, _ = await get_feed(api_client, test_user.api_key)
+    assert len(feed_prefetcher) == 1
+    assert not (await get_feed(api_client, test_user.api_key, None))[2]
+    assert len(feed_prefetcher) == 1
+
+    # загрузки видны в статистике
+    response = await api_client.get_stats(test_user.api_key)
+    assert response.status_code == 200
+    stats = response.json()["feed_prefetch"]
+    assert stats["entries"] == 1
+    assert stats["pending"] == 0
+
+
+async def test_dropped_and_cancelled_prefetches():
+    """Проверка пропуска загрузок сверх лимита и отмены загрузки при запросе другой страницы."""
+    prefetcher = FeedPrefetcher(max_entries=10, ttl=60, events_window=10, max_pending=1)
+    started = asyncio.Event()
+
+    async def render_slowly() -> tuple[list[int], FeedPage]:
+        started.set()
+        await asyncio.sleep(60)
+        return [], FeedPage(b"slow", None)
+
+    renders = list()
+
+    async def render() -> tuple[list[int], FeedPage]:
+        renders.append(1)
+        return [], FeedPage(b"page", None)
+
+    slow = asyncio.ensure_future(prefetcher.prefetch(1, "slow", render_slowly))
+    await started.wait()
+
+    # загрузка сверх `max_pending` не запускается и не рендерится
+    await prefetcher.prefetch(2, "page", render)
+    assert prefetcher.dropped == 1
+    assert not renders
+    assert await prefetcher.take(2, "page") is None
+
+    # запрос другой страницы отменяет загрузку пользователя
+    assert await prefetcher.take(1, "other") is None
+    await slow
+    assert prefetcher.cancelled == 1
+    assert prefetcher.stats().pending == 0
+
+    # загруженную страницу запрос дожидается
+    pending = asyncio.ensure_future(prefetcher.prefetch(2, "page", render))
+    await asyncio.sleep(0)
+    assert await prefetcher.take(2, "page") == FeedPage(b"page", None)
+    await pending
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api.cursors import TweetCursor
+from ...api.recent_tweets import recent_tweets_cache
+from ...db import models as db_models
+from ...db.ranking import recompute_scores, rescore_stmt
+from . import APITestClient, assert_http_error
+
+pytestmark = [pytest.mark.anyio, pytest.mark.ranking]
+
+
+@pytest.fixture(autouse=True)
+def score_ranking(mocker: MockerFixture):
+    """Включает ранжирование ленты по рейтингу твитов."""
+    mocker.patch("tweetty.settings.FEED_RANKING", "score")
+    recent_tweets_cache.clear()
+    yield
+    recent_tweets_cache.clear()
+
+
+async def feed_tweet_ids(api_client: APITestClient, api_key: str, **params) -> list[int]:
+    """Возвращает id твитов страницы ленты пользователя."""
+    response = await api_client.get_tweets(api_key, **params)
+    assert response.status_code == 200
+    return [tweet["id"] for tweet in response.json()["tweets"]]
+
+
+@pytest.mark.parametrize("feed_engine", ["query", "recent"])
+async def test_score_order(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+    feed_engine: str,
+):
+    """Проверка того, что вес лайков в рейтинге затухает с возрастом твита."""
+    mocker.patch("tweetty.settings.FEED_ENGINE", feed_engine)
+
+    now = datetime.now()
+    # веса (1 + лайки) * 2 ^ (-возраст в сутках): 8 / 4, 1 / 2, 1, 30 / 32
+    old_popular, old, new, oldest_viral = tweets = [
+        db_models.Tweet(content="test", user_id=test_user.id, like_count=like_count, posted_at=now - age)
+        for like_count, age in [
+            (7, timedelta(days=2)),
+            (0, timedelta(days=1)),
+            (0, timedelta()),
+            (29, timedelta(days=5)),
+        ]
+    ]
+    db_session.add_all(tweets)
+    await db_session.commit()
+    await db_session.execute(rescore_stmt())
+    await db_session.commit()
+    # запрос обновляет рейтинги в обход объектов сессии, которую тест разделяет с API
+    for tweet in tweets:
+        db_session.expire(tweet, ["score"])
+
+    expected_ids = [old_popular.id, new.id, oldest_viral.id, old.id]
+    assert await feed_tweet_ids(api_client, test_user.api_key) == expected_ids
+
+    received_ids: list[int] = list()
+    cursor = None
+    while True:
+        response = await api_client.get_tweets(test_user.api_key, limit=1, cursor=cursor)
+        assert response.status_code == 200
+        resp = response.json()
+        received_ids.extend(tweet["id"] for tweet in resp["tweets"])
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+        assert TweetCursor.decode(cursor).score is not None
+    assert received_ids == expected_ids
+
+
+async def test_cursor_without_score(api_client: APITestClient, test_user: db_models.User):
+    """Проверка того, что курсор без рейтинга не принимается при ранжировании по рейтингу."""
+    cursor = TweetCursor(likes=0, posted_at=datetime.now(), id=1)
+    response = await api_client.get_tweets(test_user.api_key, cursor=cursor.encode())
+    assert response.status_code == 422
+    assert_http_error(response.json())
+
+    cursor.score = 1.0
+    response = await api_client.get_tweets(test_user.api_key, cursor=cursor.encode())
+    assert response.status_code == 200
+
+
+async def test_recompute_scores(api_client: APITestClient, test_user: db_models.User, db_session: AsyncSession):
+    """Проверка того, что лайк поднимает твит в ленте после пересчета рейтингов."""
+    tweet_ids = list()
+    for _ in range(2):
+        response = await api_client.publish_tweet({"tweet_data": "test"}, test_user.api_key)
+        assert response.status_code == 201
+        tweet_ids.append(response.json()["tweet_id"])
+
+    # твиты опубликованы в одной транзакции, поэтому их рейтинги равны
+    assert await feed_tweet_ids(api_client, test_user.api_key) == tweet_ids[::-1]
+
+    response = await api_client.like(tweet_ids[0], test_user.api_key)
+    assert response.status_code == 201
+    assert await feed_tweet_ids(api_client, test_user.api_key) == tweet_ids[::-1]
+
+    assert await recompute_scores(db_session) == 1
+    assert await feed_tweet_ids(api_client, test_user.api_key) == tweet_ids
+
+    # рейтинги опубликованных твитов совпадают с пересчитанными
+    assert await recompute_scores(db_session) == 0
+    assert (await db_session.execute(rescore_stmt())).scalars().all() == []
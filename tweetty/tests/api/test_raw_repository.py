@@ -0,0 +1,75 @@
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db import models as db_models
+from ...db import repository
+from . import APITestClient
+from .test_json_feed import feed_engine, feed_tweets  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.raw_repository]
+
+
+async def test_get_tweets_same_as_orm(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    feed_tweets: list[int],  # noqa: F811
+    mocker: MockerFixture,
+):
+    """Проверка того, что лента, прочитанная через репозиторий, совпадает с лентой, прочитанной через ORM."""
+    pages_params: list[dict] = [dict(), dict(limit=3), dict(limit=2, offset=2)]
+    for params in pages_params:
+        mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", False)
+        orm_response = await api_client.get_tweets(test_user.api_key, **params)
+        assert orm_response.status_code == 200
+
+        mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", True)
+        raw_response = await api_client.get_tweets(test_user.api_key, **params)
+        assert raw_response.status_code == 200
+
+        assert raw_response.json() == orm_response.json()
+
+
+async def test_get_user_same_as_orm(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    mocker: MockerFixture,
+):
+    """Проверка того, что профиль, прочитанный через репозиторий, совпадает с профилем, прочитанным через ORM."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    for get_user in [
+        lambda: api_client.get_user(followed_user.id, test_user.api_key),
+        lambda: api_client.get_me(test_user.api_key),
+    ]:
+        mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", False)
+        orm_response = await get_user()
+        assert orm_response.status_code == 200
+
+        mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", True)
+        raw_response = await get_user()
+        assert raw_response.status_code == 200
+
+        assert raw_response.json() == orm_response.json()
+
+    mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", True)
+    response = await api_client.get_user(100500, test_user.api_key)
+    assert response.status_code == 404
+
+
+async def test_get_tweets_records(db_session: AsyncSession, test_user: db_models.User):
+    """Проверка чтения твитов через репозиторий в порядке переданных id."""
+    tweets = [db_models.Tweet(content=f"test{i}", user_id=test_user.id) for i in range(3)]
+    db_session.add_all(tweets)
+    await db_session.commit()
+
+    tweet_ids = [tweets[2].id, tweets[0].id]
+    records = await repository.get_tweets(db_session, tweet_ids)
+    assert [record.id for record in records] == tweet_ids
+    assert records[0].user == repository.UserRecord(test_user.id, test_user.nickname)
+    assert records[0].medias == list()
+    assert records[0].likes == list()
+
+    assert await repository.get_tweets(db_session, list()) == list()
@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api.recent_tweets import RecentTweetsCache, recent_tweets_cache
+from ...db import models as db_models
+from . import APITestClient, assert_tweet_list
+
+pytestmark = [pytest.mark.anyio, pytest.mark.recent_tweets, pytest.mark.usefixtures("own_db_sessions")]
+
+
+@pytest.fixture(autouse=True)
+def recent_engine(mocker: MockerFixture):
+    """Включает движок ленты на основе кэша последних твитов авторов."""
+    mocker.patch("tweetty.settings.FEED_ENGINE", "recent")
+    recent_tweets_cache.clear()
+    yield
+    recent_tweets_cache.clear()
+
+
+async def feed_tweet_ids(api_client: APITestClient, api_key: str, **params) -> list[int]:
+    """Возвращает id твитов страницы ленты пользователя."""
+    response = await api_client.get_tweets(api_key, **params)
+    assert response.status_code == 200
+    return [tweet["id"] for tweet in response.json()["tweets"]]
+
+
+async def test_get_tweets(api_client: APITestClient, test_user: db_models.User, followed_user: db_models.User):
+    """Проверка сборки ленты из твитов пользователя и его подписок."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    tweet_ids = list()
+    for user in [test_user, followed_user, test_user]:
+        response = await api_client.publish_tweet({"tweet_data": "test"}, user.api_key)
+        tweet_ids.append(response.json()["tweet_id"])
+
+    # лайкнутый твит поднимается в начало ленты
+    response = await api_client.like(tweet_ids[0], followed_user.api_key)
+    assert response.status_code == 201
+
+    response = await api_client.get_tweets(test_user.api_key)
+    assert response.status_code == 200
+
+    resp = response.json()
+    assert_tweet_list(resp, 3)
+    assert [tweet["id"] for tweet in resp["tweets"]] == [tweet_ids[0], tweet_ids[2], tweet_ids[1]]
+    assert resp["tweets"][0]["likes"] == [{"id": followed_user.id, "name": followed_user.nickname}]
+
+    # после снятия лайка порядок возвращается
+    response = await api_client.unlike(tweet_ids[0], followed_user.api_key)
+    assert response.status_code == 200
+    assert await feed_tweet_ids(api_client, test_user.api_key) == tweet_ids[::-1]
+
+
+async def test_get_tweets_pagination(api_client: APITestClient, test_user: db_models.User):
+    """Проверка постраничного чтения ленты по курсору и по номеру страницы."""
+    tweet_ids = list()
+    for i in range(5):
+        response = await api_client.publish_tweet({"tweet_data": f"test{i}"}, test_user.api_key)
+        tweet_ids.append(response.json()["tweet_id"])
+    tweet_ids.reverse()
+
+    pages = list()
+    cursor = None
+    while True:
+        response = await api_client.get_tweets(test_user.api_key, limit=2, cursor=cursor)
+        assert response.status_code == 200
+
+        resp = response.json()
+        pages.append([tweet["id"] for tweet in resp["tweets"]])
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == [tweet_ids[0:2], tweet_ids[2:4], tweet_ids[4:]]
+
+    assert await feed_tweet_ids(api_client, test_user.api_key, offset=2, limit=2) == tweet_ids[2:4]
+
+
+@pytest.mark.parametrize(
+    "sql_json, params",
+    [
+        (False, {}),
+        (True, {}),
+        (False, {"likes": "compact"}),
+        (False, {"shape": "normalized"}),
+        (False, {"fields": "content"}),
+    ],
+)
+async def test_pagination_with_stale_cache(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+    sql_json: bool,
+    params: dict,
+):
+    """
+    Проверка того, что страницы не теряют твиты, если лайки изменились в другом процессе
+    и кэш еще хранит прежние ключи твитов.
+    """
+    mocker.patch("tweetty.settings.FEED_SQL_JSON", sql_json)
+    now = datetime.now()
+    tweets = [
+        db_models.Tweet(
+            content="test", user_id=test_user.id, like_count=like_count, posted_at=now - timedelta(hours=hours)
+        )
+        for like_count, hours in [(1, 3), (0, 2), (0, 1)]
+    ]
+    db_session.add_all(tweets)
+    await db_session.commit()
+    tweet_ids = [tweets[0].id, tweets[2].id, tweets[1].id]
+    assert await feed_tweet_ids(api_client, test_user.api_key) == tweet_ids
+
+    # лайк удален в другом процессе: событие до этого процесса не дошло
+    await db_session.execute(update(db_models.Tweet).where(db_models.Tweet.id == tweets[0].id).values(like_count=0))
+    await db_session.commit()
+
+    pages = list()
+    cursor = None
+    while True:
+        response = await api_client._client.get(
+            api_client.tweets_route(),
+            params={"limit": 2, **params, **({"cursor": cursor} if cursor else {})},
+            headers=api_client.api_key_header(test_user.api_key),
+        )
+        assert response.status_code == 200
+
+        resp = response.json()
+        pages.append([tweet["id"] for tweet in resp["tweets"]])
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+    # страницы собираются в порядке кэша, и курсор продолжает тот же порядок
+    assert pages == [tweet_ids[0:2], tweet_ids[2:]]
+
+
+async def test_cache_invalidation(api_client: APITestClient, test_user: db_models.User, followed_user: db_models.User):
+    """Проверка того, что лента учитывает новые и удаленные твиты и изменения подписок."""
+    response = await api_client.publish_tweet({"tweet_data": "first"}, followed_user.api_key)
+    first_tweet_id = response.json()["tweet_id"]
+    assert await feed_tweet_ids(api_client, test_user.api_key) == []
+
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    assert await feed_tweet_ids(api_client, test_user.api_key) == [first_tweet_id]
+
+    response = await api_client.publish_tweet({"tweet_data": "second"}, followed_user.api_key)
+    second_tweet_id = response.json()["tweet_id"]
+    assert await feed_tweet_ids(api_client, test_user.api_key) == [second_tweet_id, first_tweet_id]
+
+    response = await api_client.delete_tweet(first_tweet_id, followed_user.api_key)
+    assert response.status_code == 200
+    assert await feed_tweet_ids(api_client, test_user.api_key) == [second_tweet_id]
+
+    response = await api_client.unfollow(followed_user.id, test_user.api_key)
+    assert response.status_code == 200
+    assert await feed_tweet_ids(api_client, test_user.api_key) == []
+
+
+def test_cache_eviction(mocker: MockerFixture):
+    """Проверка вытеснения давно не читанных и устаревших авторов из кэша."""
+    now = datetime.now()
+    cache = RecentTweetsCache(max_authors=2, author_length=10, ttl=10)
+    monotonic = mocker.patch("tweetty.api.recent_tweets.time.monotonic", return_value=0)
+
+    cache.set(1, [(0, now, 1), (1, now, 2)])
+    cache.set(2, [(0, now - timedelta(seconds=1), 3)])
+    assert cache.get(1) == [(1, now, 2), (0, now, 1)]
+
+    # вытесняется автор 2, потому что автор 1 читали позже
+    cache.set(3, list())
+    assert len(cache) == 2
+    assert cache.get(2) is None
+
+    cache.change_like_count(1, 1, 2)
+    assert cache.get(1) == [(2, now, 1), (1, now, 2)]
+
+    monotonic.return_value = 10
+    assert cache.get(1) is None
+    assert cache.get(3) is None
+    assert len(cache) == 0
+
+
+def test_skipped_stale_loads():
+    """Проверка того, что твиты автора, изменившегося во время загрузки, не сохраняются."""
+    now = datetime.now()
+    cache = RecentTweetsCache(max_authors=10, author_length=10, ttl=60, changes_window=2)
+
+    token = cache.begin()
+    cache.invalidate(1)
+    cache.change_like_count(2, 3, 1)
+    assert not cache.set(1, [(0, now, 1)], token)
+    assert not cache.set(2, [(0, now, 3)], token)
+    assert cache.set(3, [(0, now, 4)], token)
+    assert cache.get(1) is None
+
+    # изменения не помещаются в окно
+    token = cache.begin()
+    for author_id in range(10, 13):
+        cache.invalidate(author_id)
+    assert not cache.set(4, list(), token)
+
+    # очистка кэша
+    token = cache.begin()
+    cache.clear()
+    assert not cache.set(5, list(), token)
+    assert cache.set(5, list(), cache.begin())
@@ -0,0 +1,57 @@
+import pytest
+from fastapi import FastAPI, routing
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pytest_mock import MockerFixture
+
+from ...api.models import NewTweetOut, TweetListOut, UserResultOut
+from ...db import models as db_models
+from . import APITestClient
+from .test_follows import followed_user  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.responses]
+
+
+def fastapi_body(model: type[BaseModel], content: bytes) -> bytes:
+    """Возвращает тело ответа, которое FastAPI отправил бы для той же модели без `FastJSONResponse`."""
+    return JSONResponse(jsonable_encoder(model.parse_raw(content))).body
+
+
+async def test_validated_models_not_revalidated(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+    mocker: MockerFixture,
+):
+    """Проверка того, что модели ответов сериализуются без повторной валидации и так же, как в FastAPI."""
+    serialize_response = mocker.spy(routing, "serialize_response")
+
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    response = await api_client.publish_tweet({"tweet_data": "тестовый твит"}, followed_user.api_key)
+    assert response.status_code == 201
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.content == fastapi_body(NewTweetOut, response.content)
+
+    response = await api_client.like(response.json()["tweet_id"], test_user.api_key)
+    assert response.status_code == 201
+
+    response = await api_client.get_tweets(api_key=test_user.api_key)
+    assert response.status_code == 200
+    assert len(response.json()["tweets"]) == 1
+    assert response.content == fastapi_body(TweetListOut, response.content)
+
+    response = await api_client.get_me(test_user.api_key)
+    assert response.status_code == 200
+    assert response.content == fastapi_body(UserResultOut, response.content)
+
+    serialize_response.assert_not_called()
+
+
+async def test_response_models_in_openapi(api: FastAPI):
+    """Проверка того, что модели ответов остаются в схеме OpenAPI."""
+    schema = api.openapi()
+    response = schema["paths"]["/api/users/me"]["get"]["responses"]["200"]
+    assert response["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/UserResultOut"}
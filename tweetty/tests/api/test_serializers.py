@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from ...api.models import BaseUser, TweetOut, UserWithFollowers
+from ...api.responses import render_model
+from ...api.serializers import serialize_tweet, serialize_user_with_followers
+from ...api.static import static_uri
+from ...db import models as db_models
+from ...db.repository import TweetRecord, UserRecord, UserWithFollowersRecord
+
+pytestmark = [pytest.mark.serializers]
+
+
+def test_serialize_tweet():
+    """Проверка того, что твит из ORM и из репозитория сериализуется так же, как модель `TweetOut`."""
+    author = db_models.User(id=1, nickname="author")
+    liker = db_models.User(id=2, nickname="liker")
+    tweet = db_models.Tweet(
+        id=10,
+        content="твит",
+        user=author,
+        medias=[db_models.TweetMedia(rel_uri="static/1.png")],
+        likes=[db_models.Like(user=liker)],
+    )
+    record = TweetRecord(
+        10, "твит", 1, datetime.now(), UserRecord(1, "author"), ["static/1.png"], [UserRecord(2, "liker")]
+    )
+    expected = TweetOut(
+        id=10,
+        content="твит",
+        author=BaseUser(id=1, name="author"),
+        attachments=[static_uri("static/1.png")],
+        likes=[BaseUser(id=2, name="liker")],
+    )
+
+    assert serialize_tweet(tweet) == serialize_tweet(record)
+    assert render_model(serialize_tweet(tweet)) == render_model(expected)
+    assert TweetOut.from_orm(serialize_tweet(tweet)) == expected
+    assert serialize_tweet.many([tweet, tweet]) == [serialize_tweet(tweet)] * 2
+
+
+def test_serialize_user_with_followers():
+    """Проверка того, что пользователь из ORM и из репозитория сериализуется так же, как модель `UserWithFollowers`."""
+    user = db_models.User(id=1, nickname="user")
+    follower = db_models.User(id=2, nickname="follower")
+    following = db_models.User(id=3, nickname="following")
+    user.followers = [db_models.Follower(follower=follower)]
+    user.followings = [db_models.Follower(user=following)]
+    record = UserWithFollowersRecord(1, "user", [UserRecord(2, "follower")], [UserRecord(3, "following")])
+    expected = UserWithFollowers(
+        id=1,
+        name="user",
+        followers=[BaseUser(id=2, name="follower")],
+        following=[BaseUser(id=3, name="following")],
+    )
+
+    assert serialize_user_with_followers(user) == serialize_user_with_followers(record)
+    assert render_model(serialize_user_with_followers(user)) == render_model(expected)
+
+
+def test_serialize_unknown_source():
+    """Проверка того, что источник неизвестного типа не сериализуется."""
+    with pytest.raises(TypeError):
+        serialize_tweet(object())
+    with pytest.raises(TypeError):
+        serialize_tweet.many([object()])
+    assert serialize_tweet.many(list()) == list()
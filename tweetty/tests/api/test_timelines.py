@@ -0,0 +1,209 @@
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...db import models as db_models
+from . import APITestClient, assert_tweet_list
+
+pytestmark = [pytest.mark.anyio, pytest.mark.timelines]
+
+
+@pytest.fixture(autouse=True)
+def timeline_engine(mocker: MockerFixture):
+    """Включает движок ленты на основе домашних лент."""
+    mocker.patch("tweetty.settings.FEED_ENGINE", "timeline")
+    mocker.patch("tweetty.settings.HOME_TIMELINE_TRIM_EVERY", 1)
+
+
+@pytest.fixture
+async def followers(db_session: AsyncSession, followed_user: db_models.User):
+    """Подписчики пользователя `followed_user`."""
+    users = [db_models.User(nickname=f"follower{i}", api_key=f"{i}" * 30) for i in range(3)]
+    db_session.add_all(users)
+    await db_session.commit()
+
+    db_session.add_all([db_models.Follower(user_id=followed_user.id, follower_id=user.id) for user in users])
+    followed_user.followers_count = len(users)
+    await db_session.commit()
+
+    yield users
+
+
+async def timeline_tweet_ids(db_session: AsyncSession, user_id: int) -> set[int]:
+    """Возвращает id твитов домашней ленты пользователя."""
+    timeline_qs = await db_session.execute(
+        select(db_models.HomeTimeline.tweet_id).where(db_models.HomeTimeline.user_id == user_id)
+    )
+    return set(timeline_qs.scalars().all())
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 1000])
+async def test_fan_out_new_tweet(
+    api_client: APITestClient,
+    followed_user: db_models.User,
+    followers: list[db_models.User],
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+    batch_size: int,
+):
+    """Проверка раскладки нового твита по лентам автора и подписчиков."""
+    mocker.patch("tweetty.settings.HOME_TIMELINE_FANOUT_BATCH_SIZE", batch_size)
+
+    response = await api_client.publish_tweet({"tweet_data": "fan out"}, followed_user.api_key)
+    assert response.status_code == 201
+    tweet_id = response.json()["tweet_id"]
+
+    for user in [followed_user, *followers]:
+        assert await timeline_tweet_ids(db_session, user.id) == {tweet_id}
+
+        response = await api_client.get_tweets(user.api_key)
+        assert response.status_code == 200
+
+        resp = response.json()
+        assert_tweet_list(resp, 1)
+        assert resp["tweets"][0]["id"] == tweet_id
+
+
+async def test_delete_tweet_from_timelines(
+    api_client: APITestClient,
+    followed_user: db_models.User,
+    followers: list[db_models.User],
+    db_session: AsyncSession,
+):
+    """Проверка удаления твита из домашних лент."""
+    response = await api_client.publish_tweet({"tweet_data": "deleted"}, followed_user.api_key)
+    tweet_id = response.json()["tweet_id"]
+
+    response = await api_client.delete_tweet(tweet_id, followed_user.api_key)
+    assert response.status_code == 200
+
+    for user in [followed_user, *followers]:
+        assert await timeline_tweet_ids(db_session, user.id) == set()
+
+
+async def test_unfollow_and_follow(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: AsyncSession,
+):
+    """Проверка удаления твитов автора из ленты при отписке и добавления при подписке."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    tweet_ids = set()
+    for i in range(2):
+        response = await api_client.publish_tweet({"tweet_data": f"test{i}"}, followed_user.api_key)
+        tweet_ids.add(response.json()["tweet_id"])
+    assert await timeline_tweet_ids(db_session, test_user.id) == tweet_ids
+
+    response = await api_client.unfollow(followed_user.id, test_user.api_key)
+    assert response.status_code == 200
+    assert await timeline_tweet_ids(db_session, test_user.id) == set()
+
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    assert await timeline_tweet_ids(db_session, test_user.id) == tweet_ids
+
+
+async def test_trim_timeline(
+    api_client: APITestClient, test_user: db_models.User, db_session: AsyncSession, mocker: MockerFixture
+):
+    """Проверка обрезания домашней ленты до максимальной длины."""
+    max_length = 2
+    mocker.patch("tweetty.settings.HOME_TIMELINE_MAX_LENGTH", max_length)
+
+    tweet_ids = list()
+    for i in range(max_length + 2):
+        response = await api_client.publish_tweet({"tweet_data": f"test{i}"}, test_user.api_key)
+        tweet_ids.append(response.json()["tweet_id"])
+
+    # в ленте остаются самые новые твиты
+    assert await timeline_tweet_ids(db_session, test_user.id) == set(tweet_ids[-max_length:])
+
+
+async def test_untrimmed_timeline_read(
+    api_client: APITestClient, test_user: db_models.User, db_session: AsyncSession, mocker: MockerFixture
+):
+    """Проверка того, что лента, которую еще не обрезали, читается не длиннее максимальной длины."""
+    mocker.patch("tweetty.settings.HOME_TIMELINE_TRIM_EVERY", 1000)
+
+    tweet_ids = list()
+    for i in range(4):
+        response = await api_client.publish_tweet({"tweet_data": f"test{i}"}, test_user.api_key)
+        tweet_ids.append(response.json()["tweet_id"])
+    assert len(await timeline_tweet_ids(db_session, test_user.id)) == 4
+
+    mocker.patch("tweetty.settings.HOME_TIMELINE_MAX_LENGTH", 2)
+    response = await api_client.get_tweets(test_user.api_key)
+    assert response.status_code == 200
+    assert [tweet["id"] for tweet in response.json()["tweets"]] == tweet_ids[:-3:-1]
+
+
+async def test_fan_out_on_read(
+    api_client: APITestClient,
+    followed_user: db_models.User,
+    followers: list[db_models.User],
+    db_session: AsyncSession,
+):
+    """Проверка подмешивания в ленту твитов автора, которые не раскладываются по лентам подписчиков."""
+    followed_user.fanout_on_read = True
+    await db_session.commit()
+
+    response = await api_client.publish_tweet({"tweet_data": "fan out on read"}, followed_user.api_key)
+    assert response.status_code == 201
+    tweet_id = response.json()["tweet_id"]
+
+    # твит есть только в ленте автора
+    assert await timeline_tweet_ids(db_session, followed_user.id) == {tweet_id}
+    for user in followers:
+        assert await timeline_tweet_ids(db_session, user.id) == set()
+
+    # но подписчики видят его в ленте
+    for user in [followed_user, *followers]:
+        response = await api_client.get_tweets(user.api_key)
+        assert response.status_code == 200
+
+        resp = response.json()
+        assert_tweet_list(resp, 1)
+        assert resp["tweets"][0]["id"] == tweet_id
+
+
+async def test_fan_out_on_read_threshold(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    followers: list[db_models.User],
+    db_session: AsyncSession,
+    mocker: MockerFixture,
+):
+    """Проверка отключения раскладки твитов автора по лентам при превышении порога подписчиков."""
+    mocker.patch("tweetty.settings.HOME_TIMELINE_FANOUT_MAX_FOLLOWERS", len(followers))
+
+    response = await api_client.publish_tweet({"tweet_data": "before"}, followed_user.api_key)
+    before_tweet_id = response.json()["tweet_id"]
+
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    await db_session.refresh(followed_user)
+    assert followed_user.fanout_on_read is True
+
+    response = await api_client.publish_tweet({"tweet_data": "after"}, followed_user.api_key)
+    after_tweet_id = response.json()["tweet_id"]
+
+    # после превышения порога твиты раскладываются только в ленту автора
+    assert await timeline_tweet_ids(db_session, followers[1].id) == {before_tweet_id}
+    assert await timeline_tweet_ids(db_session, test_user.id) == set()
+
+    # при отписке флаг не сбрасывается, чтобы не потерять нераскладанные твиты
+    response = await api_client.unfollow(followed_user.id, followers[1].api_key)
+    assert response.status_code == 200
+    await db_session.refresh(followed_user)
+    assert followed_user.fanout_on_read is True
+
+    for user in [test_user, followers[2]]:
+        response = await api_client.get_tweets(user.api_key)
+        assert response.status_code == 200
+        assert {tweet["id"] for tweet in response.json()["tweets"]} >= {after_tweet_id}
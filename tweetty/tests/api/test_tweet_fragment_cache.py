@@ -0,0 +1,115 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from ...api.caches import TweetFragmentCache, tweet_fragment_cache
+from ...db import events
+from ...db import models as db_models
+from . import APITestClient
+from .test_json_feed import feed_engine, feed_tweets  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.tweet_fragment_cache]
+
+
+@pytest.fixture
+def enabled_fragment_cache(mocker: MockerFixture):
+    """Включает кэш JSON-представлений твитов."""
+    mocker.patch.object(tweet_fragment_cache, "max_entries", 100)
+    tweet_fragment_cache.clear()
+    yield tweet_fragment_cache
+    tweet_fragment_cache.clear()
+
+
+@pytest.mark.parametrize("raw_repository", [False, True])
+async def test_fragments_page_same_as_orm(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    feed_tweets: list[int],  # noqa: F811
+    enabled_fragment_cache: TweetFragmentCache,
+    raw_repository: bool,
+    mocker: MockerFixture,
+):
+    """Проверка того, что страница, собранная из представлений твитов, совпадает со страницей ORM байт в байт."""
+    mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", raw_repository)
+
+    pages_params: list[dict] = [dict(), dict(limit=3), dict(limit=2, offset=2)]
+    while pages_params:
+        params = pages_params.pop(0)
+
+        mocker.patch.object(enabled_fragment_cache, "max_entries", 0)
+        orm_response = await api_client.get_tweets(test_user.api_key, **params)
+        assert orm_response.status_code == 200
+
+        mocker.patch.object(enabled_fragment_cache, "max_entries", 100)
+        # первый раз твиты сериализуются, второй раз берутся из кэша
+        for _ in range(2):
+            fragments_response = await api_client.get_tweets(test_user.api_key, **params)
+            assert fragments_response.status_code == 200
+            assert fragments_response.content == orm_response.content
+
+        resp = fragments_response.json()
+        if resp["next_cursor"] is not None:
+            pages_params.append(dict(limit=params["limit"], cursor=resp["next_cursor"]))
+
+    assert enabled_fragment_cache.hits >= len(feed_tweets)
+
+
+async def test_fragments_invalidation(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    feed_tweets: list[int],  # noqa: F811
+    enabled_fragment_cache: TweetFragmentCache,
+):
+    """Проверка обновления представлений твитов после лайков и удаления."""
+    response = await api_client.get_tweets(test_user.api_key)
+    assert len(enabled_fragment_cache) == len(feed_tweets)
+
+    tweet_id = feed_tweets[2]
+    response = await api_client.like(tweet_id, test_user.api_key)
+    assert response.status_code == 201
+    assert enabled_fragment_cache.get(tweet_id) is None
+
+    tweets = {tweet["id"]: tweet for tweet in (await api_client.get_tweets(test_user.api_key)).json()["tweets"]}
+    assert [like["id"] for like in tweets[tweet_id]["likes"]] == [test_user.id]
+
+    response = await api_client.unlike(tweet_id, test_user.api_key)
+    assert response.status_code == 200
+    tweets = {tweet["id"]: tweet for tweet in (await api_client.get_tweets(test_user.api_key)).json()["tweets"]}
+    assert tweets[tweet_id]["likes"] == list()
+
+    response = await api_client.delete_tweet(feed_tweets[0], test_user.api_key)
+    assert response.status_code == 200
+    assert enabled_fragment_cache.get(feed_tweets[0]) is None
+
+    tweets = {tweet["id"]: tweet for tweet in (await api_client.get_tweets(test_user.api_key)).json()["tweets"]}
+    assert set(tweets) == set(feed_tweets[1:])
+
+
+def test_fragment_versions():
+    """Проверка того, что представления, отрендеренные до изменения твита, не сохраняются."""
+    cache = TweetFragmentCache(max_entries=2, ttl=60, events_window=2)
+
+    token = cache.begin()
+    cache.handle_event(events.Event(events.LIKES_CHANGED, 1, 10))
+    assert not cache.set(token, 10, b"stale")
+    assert cache.set(token, 11, b"fresh")
+    assert cache.set(cache.begin(), 10, b"fresh")
+    assert cache.get(10) == b"fresh"
+
+    # вытеснение
+    assert cache.set(cache.begin(), 12, b"fresh")
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+    # версии твитов, измененных с начала рендеринга, уже забыты
+    token = cache.begin()
+    for tweet_id in (20, 21, 22):
+        cache.handle_event(events.Event(events.LIKES_CHANGED, 1, tweet_id))
+    assert not cache.set(token, 13, b"stale")
+
+    # событие без твита сбрасывает кэш и незавершенные рендеринги
+    token = cache.begin()
+    cache.handle_event(events.Event(events.TWEETS_CHANGED, 1))
+    assert len(cache) == 0
+    assert cache.stats().memory_bytes == 0
+    assert not cache.set(token, 14, b"stale")
+    assert cache.set(cache.begin(), 14, b"fresh")
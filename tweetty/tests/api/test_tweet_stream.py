@@ -0,0 +1,162 @@
+import json
+from typing import Optional
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ...api import streams
+from ...api.routers import tweets as tweet_routers
+from ...api.streams import TweetStreamHub
+from ...db import events
+from ...db import models as db_models
+from . import APITestClient, assert_http_error
+from .test_follows import followed_user  # noqa: F401
+
+pytestmark = [pytest.mark.anyio, pytest.mark.tweet_stream, pytest.mark.usefixtures("own_db_sessions")]
+
+
+@pytest.fixture
+def stream_hub(mocker: MockerFixture):
+    """Включенный хаб потока твитов."""
+    hub = TweetStreamHub(history=100)
+    mocker.patch.object(tweet_routers, "tweet_stream_hub", hub)
+    mocker.patch.object(events, "_handlers", [*events._handlers, hub.handle_event])
+    # подключение к потоку завершается сразу после отправки накопленных сообщений
+    mocker.patch("tweetty.settings.TWEET_STREAM_MAX_DURATION", 0)
+    yield hub
+
+
+async def read_stream(api_client: APITestClient, api_key: str, last_event_id: Optional[str]) -> list[dict]:
+    """Возвращает сообщения потока твитов."""
+    headers = {"Last-Event-ID": last_event_id} if last_event_id is not None else dict()
+    response = await api_client._client.get(
+        api_client.tweets_route() + "/stream", headers={**api_client.api_key_header(api_key), **headers}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/event-stream")
+
+    messages = list()
+    for block in response.text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            messages.append({"id": fields["id"], "event": fields["event"], "data": json.loads(fields["data"])})
+    return messages
+
+
+async def test_tweet_stream(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+    db_session: AsyncSession,
+    stream_hub: TweetStreamHub,
+):
+    """Проверка сообщений потока твитов и их повторной отправки по `Last-Event-ID`."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    last_event_id = stream_hub.event_id(stream_hub.last_seq)
+
+    response = await api_client.publish_tweet({"tweet_data": "followed"}, followed_user.api_key)
+    tweet_id = response.json()["tweet_id"]
+    response = await api_client.like(tweet_id, test_user.api_key)
+    assert response.status_code == 201
+
+    # твиты авторов, на которых пользователь не подписан, в поток не попадают
+    other_user = db_models.User(nickname="other", api_key="o" * 30)
+    db_session.add(other_user)
+    await db_session.commit()
+    response = await api_client.publish_tweet({"tweet_data": "other"}, other_user.api_key)
+    assert response.status_code == 201
+
+    messages = await read_stream(api_client, test_user.api_key, last_event_id)
+    assert [message["event"] for message in messages] == [streams.TWEET_MESSAGE, streams.LIKES_MESSAGE]
+    assert messages[0]["data"]["id"] == tweet_id
+    assert messages[0]["data"]["author"]["id"] == followed_user.id
+    assert messages[1]["data"] == {"id": tweet_id, "like_count": 1}
+
+    # переподключение продолжает поток с последнего полученного сообщения
+    response = await api_client.delete_tweet(tweet_id, followed_user.api_key)
+    assert response.status_code == 200
+    messages = await read_stream(api_client, test_user.api_key, messages[-1]["id"])
+    assert [message["event"] for message in messages] == [streams.TWEET_DELETED_MESSAGE]
+    assert messages[0]["data"] == {"id": tweet_id}
+
+    # без `Last-Event-ID` поток начинается с новых событий
+    assert await read_stream(api_client, test_user.api_key, None) == list()
+
+
+async def test_tweet_stream_sessions(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,  # noqa: F811
+    own_db_sessions: list[AsyncSession],
+    stream_hub: TweetStreamHub,
+):
+    """Проверка того, что поток и рендеринг сообщений хаба используют свои сессии с БД, а не сессию запроса."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+    last_event_id = stream_hub.event_id(stream_hub.last_seq)
+    response = await api_client.publish_tweet({"tweet_data": "followed"}, followed_user.api_key)
+    assert response.status_code == 201
+
+    own_db_sessions.clear()
+    messages = await read_stream(api_client, test_user.api_key, last_event_id)
+    assert [message["event"] for message in messages] == [streams.TWEET_MESSAGE]
+    # сессия потока и сессия рендеринга сообщения
+    assert len(own_db_sessions) == 2
+
+    # другой подписчик получает готовое сообщение, и открывается только сессия его потока
+    messages = await read_stream(api_client, followed_user.api_key, last_event_id)
+    assert [message["event"] for message in messages] == [streams.TWEET_MESSAGE]
+    assert len(own_db_sessions) == 3
+    assert not any(session.in_transaction() for session in own_db_sessions)
+
+
+async def test_tweet_stream_reset(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    stream_hub: TweetStreamHub,
+):
+    """Проверка того, что клиенту с неизвестным `Last-Event-ID` нужно перечитать ленту."""
+    for last_event_id in ["other process-1", "invalid", stream_hub.event_id(stream_hub.last_seq + 1)]:
+        messages = await read_stream(api_client, test_user.api_key, last_event_id)
+        assert [message["event"] for message in messages] == [streams.RESET_MESSAGE]
+        assert messages[0]["id"] == stream_hub.event_id(stream_hub.last_seq)
+
+
+async def test_tweet_stream_disabled(api_client: APITestClient, test_user: db_models.User):
+    """Проверка выключенного потока твитов."""
+    response = await api_client._client.get(
+        api_client.tweets_route() + "/stream", headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 404
+    assert_http_error(response.json())
+
+
+async def test_stream_hub_history():
+    """Проверка истории событий хаба и их сообщений."""
+    hub = TweetStreamHub(history=2)
+    for tweet_id in range(1, 4):
+        hub.handle_event(events.Event(events.TWEETS_CHANGED, 1, tweet_id))
+    # сворачивание шардов лайков в поток не попадает
+    hub.handle_event(events.Event(events.LIKES_CHANGED, 1))
+
+    assert hub.last_seq == 3
+    assert hub.entries_after(0) is None
+    assert [entry.event.tweet_id for entry in hub.entries_after(1) or list()] == [2, 3]
+    assert hub.entries_after(3) == list()
+    assert hub.parse_event_id(hub.event_id(2)) == 2
+
+    renders = list()
+
+    async def render(ev: events.Event) -> streams.StreamMessage:
+        renders.append(ev)
+        return streams.StreamMessage(streams.TWEET_MESSAGE, b"{}")
+
+    entry = (hub.entries_after(2) or list())[0]
+    assert await hub.message(entry, render) == await hub.message(entry, render)
+    assert len(renders) == 1
+
+    # событие без твита затрагивает любые твиты
+    hub.handle_event(events.Event(events.TWEETS_CHANGED, 1))
+    assert [entry.event.kind for entry in hub.entries_after(3) or list()] == [events.EVENTS_RESET]
@@ -5,12 +5,13 @@ from typing import BinaryIO, Optional, Union
 
 import aiofiles
 import pytest
+from pytest_mock import MockerFixture
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api import models as api_models
 from ...db import models as db_models
-from ...settings import STATIC_DIR, STATIC_URL
+from ...settings import STATIC_DIR, STATIC_URL, TWEETS_PAGE_MAX_LIMIT
 from . import APITestClient, assert_http_error, assert_tweet_list
 
 pytestmark = [pytest.mark.anyio, pytest.mark.tweets]
@@ -477,6 +478,7 @@ async def test_get_tweets_posted_at_and_likes_sorted_desc(
                 for user in users[: idx + 1]
             ]
             db_session.add_all(likes)
+            tweet.like_count = len(likes)
             await db_session.commit()
 
         await db_session.refresh(tweet, attribute_names=["likes", "posted_at"])
@@ -532,3 +534,165 @@ async def test_get_tweets_pagination(api_client: APITestClient, test_user: db_mo
 
         resp = response.json()
         assert_tweet_list(resp, limit)
+
+
+@pytest.mark.get_tweets
+@pytest.mark.parametrize("limit", [1, 2, 3])
+async def test_get_tweets_cursor_pagination(
+    api_client: APITestClient, test_user: db_models.User, db_session: AsyncSession, limit: int
+):
+    """Проверка пагинации по курсору."""
+    new_tweets = [
+        db_models.Tweet(
+            content=f"test{i}",
+            user_id=test_user.id,
+        )
+        for i in range(5)
+    ]
+    db_session.add_all(new_tweets)
+    await db_session.commit()
+
+    # лайк поднимает твит в начало ленты
+    response = await api_client.like(new_tweets[2].id, test_user.api_key)
+    assert response.status_code == 201
+
+    response = await api_client.get_tweets(test_user.api_key)
+    expected_ids = [tweet["id"] for tweet in response.json()["tweets"]]
+    assert expected_ids[0] == new_tweets[2].id
+
+    received_ids: list[int] = list()
+    cursor = None
+    while True:
+        response = await api_client.get_tweets(test_user.api_key, limit=limit, cursor=cursor)
+        assert response.status_code == 200
+
+        resp = response.json()
+        assert len(resp["tweets"]) <= limit
+        received_ids.extend(tweet["id"] for tweet in resp["tweets"])
+
+        cursor = resp["next_cursor"]
+        if cursor is None:
+            break
+
+    assert received_ids == expected_ids
+
+
+@pytest.mark.get_tweets
+async def test_get_tweets_last_page_without_cursor(
+    api_client: APITestClient, test_user: db_models.User, test_tweet: db_models.Tweet
+):
+    """Проверка отсутствия курсора следующей страницы на последней странице."""
+    response = await api_client.get_tweets(test_user.api_key, limit=2)
+    assert response.status_code == 200
+
+    resp = response.json()
+    assert_tweet_list(resp, 1)
+    assert resp["next_cursor"] is None
+
+
+@pytest.mark.get_tweets
+@pytest.mark.parametrize("cursor", ["invalid", "", "W10", "WzEsIngiLDNd"])
+async def test_get_tweets_invalid_cursor(api_client: APITestClient, test_user: db_models.User, cursor: str):
+    """Проверка ошибки при некорректном курсоре."""
+    response = await api_client.get_tweets(test_user.api_key, cursor=cursor)
+    assert response.status_code == 422
+    assert_http_error(response.json())
+
+
+@pytest.mark.get_tweets
+async def test_get_tweets_max_limit(api_client: APITestClient, test_user: db_models.User):
+    """Проверка ограничения максимального размера страницы."""
+    response = await api_client.get_tweets(test_user.api_key, limit=TWEETS_PAGE_MAX_LIMIT + 1)
+    assert response.status_code == 422
+
+
+@pytest.mark.get_tweets
+@pytest.mark.parametrize("likes", ["full", "compact"])
+@pytest.mark.parametrize("raw_repository", [True, False])
+async def test_get_tweets_normalized(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    prepare_tweets,
+    mocker: MockerFixture,
+    likes: str,
+    raw_repository: bool,
+):
+    """Проверка ленты, в которой твиты ссылаются на пользователей из общего справочника."""
+    mocker.patch("tweetty.settings.RAW_READ_REPOSITORY", raw_repository)
+    _, tweets = await prepare_tweets(own_tweets=False)
+    for tweet in tweets[:2]:
+        response = await api_client.like(tweet.id, test_user.api_key)
+        assert response.status_code == 201
+
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"shape": "normalized", "likes": likes},
+        headers=api_client.api_key_header(test_user.api_key),
+    )
+    assert response.status_code == 200
+
+    resp = response.json()
+    assert_tweet_list(resp, len(tweets))
+    # каждый пользователь передается один раз
+    assert resp["users"] == {
+        str(test_user.id): {"id": test_user.id, "name": test_user.nickname},
+        str(followed_user.id): {"id": followed_user.id, "name": followed_user.nickname},
+    }
+    assert {tweet["author_id"] for tweet in resp["tweets"]} == {followed_user.id}
+
+    liked_tweets = [tweet for tweet in resp["tweets"] if tweet["id"] in {tweet.id for tweet in tweets[:2]}]
+    assert len(liked_tweets) == 2
+    for tweet in liked_tweets:
+        if likes == "full":
+            assert tweet["likes"] == [test_user.id]
+        else:
+            assert tweet["first_likers"] == [test_user.id]
+            assert tweet["liked_by_me"] is True
+
+
+@pytest.mark.get_tweets
+@pytest.mark.parametrize("likes", ["full", "compact"])
+async def test_get_tweets_fields(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    test_tweet: db_models.Tweet,
+    executed_statements: list[str],
+    likes: str,
+):
+    """Проверка того, что в ленте только запрошенные поля, а остальные связи не загружаются."""
+    response = await api_client.like(test_tweet.id, test_user.api_key)
+    assert response.status_code == 201
+
+    executed_statements.clear()
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"fields": "content,author", "likes": likes},
+        headers=api_client.api_key_header(test_user.api_key),
+    )
+    assert response.status_code == 200
+    assert response.json()["tweets"] == [
+        {"id": test_tweet.id, "content": test_tweet.content, "author": {"id": test_user.id, "name": test_user.nickname}}
+    ]
+    assert not any("tweet_media" in statement or '"like"' in statement for statement in executed_statements)
+
+    fields = "likes" if likes == "full" else "like_count,liked_by_me,first_likers"
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"fields": fields, "likes": likes},
+        headers=api_client.api_key_header(test_user.api_key),
+    )
+    tweet = response.json()["tweets"][0]
+    user = {"id": test_user.id, "name": test_user.nickname}
+    if likes == "full":
+        assert tweet == {"id": test_tweet.id, "likes": [user]}
+    else:
+        assert tweet == {"id": test_tweet.id, "like_count": 1, "liked_by_me": True, "first_likers": [user]}
+
+    response = await api_client._client.get(
+        api_client.tweets_route(),
+        params={"fields": "content,unknown"},
+        headers=api_client.api_key_header(test_user.api_key),
+    )
+    assert response.status_code == 422
+    assert_http_error(response.json())
@@ -192,3 +192,43 @@ async def test_get_user_redirect(api_client: APITestClient, test_user: db_models
     """Проверка редиректа на `/api/users/me` при запросе собственного профиля по id."""
     response = await api_client.get_user(test_user.id, test_user.api_key)
     assert response.status_code == 308
+
+
+@pytest.mark.get_user
+@pytest.mark.parametrize("own_profile", [True, False])
+async def test_get_user_fields(
+    api_client: APITestClient,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    executed_statements: list[str],
+    own_profile: bool,
+):
+    """Проверка того, что в профиле только запрошенные поля, а остальные связи не загружаются."""
+    response = await api_client.follow(followed_user.id, test_user.api_key)
+    assert response.status_code == 201
+
+    route = api_client.me_route() if own_profile else api_client.users_route(followed_user.id)
+    executed_statements.clear()
+    response = await api_client._client.get(
+        route, params={"fields": "name"}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 200
+    user = test_user if own_profile else followed_user
+    assert response.json() == {"result": True, "user": {"id": user.id, "name": user.nickname}}
+    assert not any("FROM follower" in statement for statement in executed_statements)
+
+    response = await api_client._client.get(
+        route, params={"fields": "followers,following"}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    resp = response.json()
+    assert set(resp["user"]) == {"id", "followers", "following"}
+    if own_profile:
+        assert resp["user"]["following"] == [{"id": followed_user.id, "name": followed_user.nickname}]
+    else:
+        assert resp["user"]["followers"] == [{"id": test_user.id, "name": test_user.nickname}]
+
+    response = await api_client._client.get(
+        route, params={"fields": "api_key"}, headers=api_client.api_key_header(test_user.api_key)
+    )
+    assert response.status_code == 422
+    assert_http_error(response.json())
@@ -1,7 +1,8 @@
 import pytest
 import sqlalchemy_utils as sautils
 from httpx import AsyncClient
-from sqlalchemy import NullPool
+from pytest_mock import MockerFixture
+from sqlalchemy import NullPool, event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -68,6 +69,19 @@ async def conn(engine):
         await conn.close()
 
 
+@pytest.fixture
+def executed_statements(conn):
+    """SQL-запросы, выполненные на подключении теста."""
+    statements: list[str] = list()
+
+    def record_statement(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(conn.sync_connection, "before_cursor_execute", record_statement)
+    yield statements
+    event.remove(conn.sync_connection, "before_cursor_execute", record_statement)
+
+
 @pytest.fixture
 async def db_session(conn):
     async with TestSession(bind=conn) as test_session:
@@ -76,6 +90,23 @@ async def db_session(conn):
         await test_session.close()
 
 
+@pytest.fixture
+def own_db_sessions(conn, mocker: MockerFixture) -> list[AsyncSession]:
+    """
+    Сессии, которые код открывает сам (`models.Session(bind=models.engine)`),
+    на подключении теста вместо движка БД. Возвращает список открытых сессий.
+    """
+    sessions: list[AsyncSession] = list()
+
+    def open_session(bind) -> AsyncSession:
+        session = TestSession(bind=conn)
+        sessions.append(session)
+        return session
+
+    mocker.patch.object(models, "Session", open_session)
+    return sessions
+
+
 @pytest.fixture
 def api(db_session):
     _api = create_api()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import func, select
+
+from ...api import tasks
+from ...db import events, models
+
+pytestmark = [pytest.mark.anyio, pytest.mark.db, pytest.mark.events]
+
+
+@pytest.fixture
+def received_events(mocker: MockerFixture):
+    """События, полученные обработчиками текущего процесса."""
+    received: list[events.Event] = list()
+    mocker.patch.object(events, "_handlers", [received.append])
+    yield received
+
+
+async def test_dispatch_after_commit(db_session, received_events: list[events.Event]):
+    """Проверка того, что события передаются обработчикам только после фиксации транзакции."""
+    ev = events.Event(events.TWEETS_CHANGED, 1, 2)
+
+    await db_session.execute(events.publish(db_session, ev))
+    assert received_events == list()
+    await db_session.commit()
+    assert received_events == [ev]
+
+    await db_session.execute(events.publish(db_session, events.Event(events.FOLLOWINGS_CHANGED, 1)))
+    await db_session.rollback()
+    await db_session.commit()
+    assert received_events == [ev]
+
+
+def test_handle_notification(received_events: list[events.Event]):
+    """Проверка того, что обрабатываются только события других процессов."""
+    ev = events.Event(events.LIKES_CHANGED, 1, 2)
+
+    events.handle_notification(None, 0, events.EVENTS_CHANNEL, ev.to_payload())
+    events.handle_notification(None, 0, events.EVENTS_CHANNEL, "invalid")
+    assert received_events == list()
+
+    events.handle_notification(None, 0, events.EVENTS_CHANNEL, json.dumps([*ev, "other process"]))
+    assert received_events == [ev]
+
+
+async def test_listen_events_task(engine, received_events: list[events.Event], mocker: MockerFixture):
+    """Проверка получения событий других процессов через `LISTEN`."""
+    mocker.patch.object(models, "engine", engine)
+    mocker.patch.object(tasks, "EVENTS_RECONNECT_INTERVAL", 0.01)
+    ev = events.Event(events.TWEETS_CHANGED, 1, 2)
+
+    listener = asyncio.create_task(tasks.listen_events_task())
+    try:
+        for _ in range(100):
+            if received_events:
+                break
+            await asyncio.sleep(0.01)
+        assert received_events == [events.Event(events.EVENTS_RESET, 0)]
+
+        other_ev = events.Event(events.FOLLOWERS_CHANGED, 3)
+        async with engine.begin() as conn:
+            await conn.execute(select(func.pg_notify(events.EVENTS_CHANNEL, json.dumps([*ev, "other process"]))))
+            # несколько событий одним запросом
+            with mock.patch.object(events, "PROCESS_ID", "other process"):
+                await conn.execute(events.notify_stmt(ev, other_ev))
+
+        for _ in range(100):
+            if len(received_events) > 3:
+                break
+            await asyncio.sleep(0.01)
+        assert received_events[1:] == [ev, ev, other_ev]
+    finally:
+        listener.cancel()
+
+
+def test_listen_events_for_request_coalescing(mocker: MockerFixture):
+    """Проверка того, что события слушаются, если включено только объединение запросов."""
+    assert tasks.listen_events_task not in [task for task, _ in tasks.get_periodic_tasks()]
+
+    mocker.patch.object(tasks, "REQUEST_COALESCING_ROUTES", ["get_tweets"])
+    assert tasks.listen_events_task in [task for task, _ in tasks.get_periodic_tasks()]
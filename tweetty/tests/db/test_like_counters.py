@@ -0,0 +1,79 @@
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import func, select
+
+from ...db import counters, events, models
+
+pytestmark = [pytest.mark.anyio, pytest.mark.db, pytest.mark.like_counters]
+
+
+@pytest.fixture
+async def tweet(db_session):
+    """Тестовый твит."""
+    user = models.User(nickname="test1", api_key="a" * 30)
+    db_session.add(user)
+    await db_session.commit()
+
+    tweet = models.Tweet(content="test", user_id=user.id)
+    db_session.add(tweet)
+    await db_session.commit()
+
+    yield tweet
+
+
+async def shards_total(db_session, tweet_id: int) -> int:
+    """Возвращает суммарное изменение количества лайков твита в шардах."""
+    total_qs = await db_session.execute(
+        select(func.coalesce(func.sum(models.LikeCounterShard.count), 0)).where(
+            models.LikeCounterShard.tweet_id == tweet_id
+        )
+    )
+    return total_qs.scalar_one()
+
+
+async def test_change_like_count_without_shards(db_session, tweet: models.Tweet, mocker: MockerFixture):
+    """Проверка изменения счетчика лайков прямо в твите."""
+    mocker.patch.object(counters, "LIKE_COUNTER_SHARDS", 0)
+
+    for delta in (1, 1, -1):
+        await counters.change_like_count(db_session, tweet.id, delta)
+    await db_session.commit()
+
+    await db_session.refresh(tweet, attribute_names=["like_count"])
+    assert tweet.like_count == 1
+    assert await shards_total(db_session, tweet.id) == 0
+
+
+async def test_change_like_count_with_shards(db_session, tweet: models.Tweet, mocker: MockerFixture):
+    """Проверка изменения счетчика лайков через шарды и их сворачивания."""
+    shards = 4
+    mocker.patch.object(counters, "LIKE_COUNTER_SHARDS", shards)
+
+    for _ in range(20):
+        await counters.change_like_count(db_session, tweet.id, 1)
+    await counters.change_like_count(db_session, tweet.id, -1)
+    await db_session.commit()
+
+    # пока шарды не свернуты, счетчик твита не меняется
+    await db_session.refresh(tweet, attribute_names=["like_count"])
+    assert tweet.like_count == 0
+    assert await shards_total(db_session, tweet.id) == 19
+
+    shards_qs = await db_session.execute(
+        select(func.count()).select_from(models.LikeCounterShard).where(models.LikeCounterShard.tweet_id == tweet.id)
+    )
+    assert shards_qs.scalar_one() <= shards
+
+    dispatch_mock = mocker.patch.object(events, "dispatch")
+    assert await counters.compact_like_counters(db_session) == 1
+    # читатели автора узнают об изменении порядка твитов
+    dispatch_mock.assert_called_once_with(events.Event(events.LIKES_CHANGED, tweet.user_id))
+
+    await db_session.refresh(tweet, attribute_names=["like_count"])
+    assert tweet.like_count == 19
+    assert await shards_total(db_session, tweet.id) == 0
+
+    # повторное сворачивание ничего не меняет
+    assert await counters.compact_like_counters(db_session) == 0
+    await db_session.refresh(tweet, attribute_names=["like_count"])
+    assert tweet.like_count == 19
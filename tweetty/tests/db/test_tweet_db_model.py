@@ -23,6 +23,7 @@ async def test_add_tweet(db_session):
     assert added_tweet.content == new_tweet.content
     assert added_tweet.posted_at == new_tweet.posted_at
     assert added_tweet.user_id == new_tweet.user_id
+    assert added_tweet.like_count == 0
 
 
 async def test_cascade_delete_tweets(db_session):
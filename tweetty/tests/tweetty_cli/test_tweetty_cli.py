@@ -1,3 +1,4 @@
+from datetime import timezone
 from typing import Optional
 
 import pytest
@@ -6,17 +7,19 @@ from sqlalchemy import and_
 from sqlalchemy.orm import Session
 from typer.testing import CliRunner
 
+from ...db import events
 from ...db import models as db_models
 from ...settings import API_KEY_PREFIX
-from ...tweetty_cli import users
+from ...tweetty_cli import timelines, tweets, users
 
 pytestmark = [pytest.mark.cli]
 
 
 @pytest.fixture(autouse=True)
 def db_session_mocker(db_session: Session, mocker: MockerFixture):
-    mock = mocker.patch("tweetty.tweetty_cli.users.db_session")
-    mock.return_value.__enter__.return_value = db_session
+    for module in ("users", "tweets", "timelines"):
+        mock = mocker.patch(f"tweetty.tweetty_cli.{module}.db_session")
+        mock.return_value.__enter__.return_value = db_session
 
 
 @pytest.fixture(scope="session")
@@ -59,6 +62,37 @@ def test_remove_user(cli_runner: CliRunner, test_user: db_models.User, db_sessio
     assert f"User {test_user.nickname!r} deleted" in result.stdout
 
 
+def test_remove_user_decrements_like_count(
+    cli_runner: CliRunner,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: Session,
+    mocker: MockerFixture,
+):
+    """Проверка уменьшения счетчиков лайков у твитов, лайкнутых удаляемым пользователем."""
+    tweet = db_models.Tweet(content="test", user_id=followed_user.id, like_count=2)
+    db_session.add(tweet)
+    db_session.commit()
+    db_session.add_all(
+        [
+            db_models.Like(tweet_id=tweet.id, user_id=test_user.id),
+            db_models.Like(tweet_id=tweet.id, user_id=followed_user.id),
+        ]
+    )
+    db_session.commit()
+
+    dispatch_mock = mocker.patch.object(events, "dispatch")
+    result = cli_runner.invoke(users.users_app, ["remove", test_user.nickname])
+    assert result.exit_code == 0
+
+    db_session.refresh(tweet)
+    assert tweet.like_count == 1
+    # лайки твитов автора изменились, поэтому его страницы в кэшах устарели
+    dispatch_mock.assert_called_once_with(
+        events.Event(events.TWEETS_CHANGED, test_user.id), events.Event(events.LIKES_CHANGED, followed_user.id)
+    )
+
+
 def test_remove_user_idempotent(cli_runner: CliRunner, test_user: db_models.User, db_session: Session):
     """Проверка идемпотентности удаления пользователя."""
     for _ in range(2):
@@ -374,11 +408,19 @@ def test_search_users_with_page_and_limit(cli_runner: CliRunner, db_session: Ses
 
 
 def test_follow_to_user(
-    cli_runner: CliRunner, test_user: db_models.User, followed_user: db_models.User, db_session: Session
+    cli_runner: CliRunner,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: Session,
+    mocker: MockerFixture,
 ):
     """Проверка подписки одного пользователя на другого."""
+    dispatch_mock = mocker.patch.object(events, "dispatch")
     result = cli_runner.invoke(users.users_app, ["follow", followed_user.nickname, test_user.nickname])
     assert result.exit_code == 0
+    dispatch_mock.assert_called_once_with(
+        events.Event(events.FOLLOWINGS_CHANGED, test_user.id), events.Event(events.FOLLOWERS_CHANGED, followed_user.id)
+    )
 
     assert f"User {test_user.nickname!r} is now follow to user {followed_user.nickname!r}" in result.stdout
 
@@ -390,6 +432,9 @@ def test_follow_to_user(
     )
     assert follower_qs.one_or_none() is not None
 
+    db_session.refresh(followed_user)
+    assert followed_user.followers_count == 1
+
 
 def test_follow_to_self(cli_runner: CliRunner, test_user: db_models.User):
     """Проверка невозможности подписаться на себя."""
@@ -428,6 +473,7 @@ def test_unfollow_from_user(
             follower_id=test_user.id,
         )
     )
+    followed_user.followers_count = 1
     db_session.commit()
 
     result = cli_runner.invoke(users.users_app, ["unfollow", followed_user.nickname, test_user.nickname])
@@ -443,6 +489,9 @@ def test_unfollow_from_user(
     )
     assert follower_qs.one_or_none() is None
 
+    db_session.refresh(followed_user)
+    assert followed_user.followers_count == 0
+
 
 def test_unfollow_from_self(cli_runner: CliRunner, test_user: db_models.User):
     """Проверка отписки от себя."""
@@ -534,3 +583,116 @@ def test_followed_not_existed_users(cli_runner: CliRunner, test_user: db_models.
 
     expected_nickname = follower_nickname if user == "test" else user_nickname
     assert f"User {expected_nickname!r} not found" in result.stdout
+
+
+@pytest.mark.parametrize("for_one_tweet", [True, False])
+def test_recount_likes(cli_runner: CliRunner, test_user: db_models.User, db_session: Session, for_one_tweet: bool):
+    """Проверка пересчета счетчиков лайков."""
+    tweets_list = [db_models.Tweet(content=f"test{i}", user_id=test_user.id, like_count=10) for i in range(2)]
+    db_session.add_all(tweets_list)
+    db_session.commit()
+    db_session.add(db_models.Like(tweet_id=tweets_list[0].id, user_id=test_user.id))
+    db_session.commit()
+
+    args = ["recount_likes"]
+    if for_one_tweet:
+        args.extend(["--tweet-id", str(tweets_list[0].id)])
+
+    result = cli_runner.invoke(tweets.tweets_app, args)
+    assert result.exit_code == 0
+
+    for tweet in tweets_list:
+        db_session.refresh(tweet)
+    assert tweets_list[0].like_count == 1
+    assert tweets_list[1].like_count == (10 if for_one_tweet else 0)
+
+
+def test_compact_likes(cli_runner: CliRunner, test_user: db_models.User, db_session: Session):
+    """Проверка сворачивания шардов счетчиков лайков."""
+    tweet = db_models.Tweet(content="test", user_id=test_user.id, like_count=1)
+    db_session.add(tweet)
+    db_session.commit()
+    db_session.add_all([db_models.LikeCounterShard(tweet_id=tweet.id, shard=shard, count=2) for shard in range(3)])
+    db_session.commit()
+
+    result = cli_runner.invoke(tweets.tweets_app, ["compact_likes"])
+    assert result.exit_code == 0
+    assert "compacted for 1 tweets" in result.stdout
+
+    db_session.refresh(tweet)
+    assert tweet.like_count == 7
+    assert db_session.query(db_models.LikeCounterShard).count() == 0
+
+
+@pytest.mark.parametrize("for_one_tweet", [True, False])
+def test_rescore(cli_runner: CliRunner, test_user: db_models.User, db_session: Session, for_one_tweet: bool):
+    """Проверка пересчета рейтингов твитов."""
+    tweets_list = [db_models.Tweet(content=f"test{i}", user_id=test_user.id, like_count=3) for i in range(2)]
+    db_session.add_all(tweets_list)
+    db_session.commit()
+
+    args = ["rescore"]
+    if for_one_tweet:
+        args.extend(["--tweet-id", str(tweets_list[0].id)])
+
+    result = cli_runner.invoke(tweets.tweets_app, args)
+    assert result.exit_code == 0
+    assert f"recomputed for {1 if for_one_tweet else 2} tweets" in result.stdout
+
+    for tweet in tweets_list:
+        db_session.refresh(tweet)
+    # два лайка из трех (+1) - один период полураспада рейтинга
+    expected_score = 2 + tweets_list[0].posted_at.replace(tzinfo=timezone.utc).timestamp() / (24 * 3600)
+    assert tweets_list[0].score == pytest.approx(expected_score)
+    assert tweets_list[1].score == (0 if for_one_tweet else pytest.approx(expected_score))
+
+    # рейтинги, которые не изменились, не обновляются
+    result = cli_runner.invoke(tweets.tweets_app, ["rescore"])
+    assert result.exit_code == 0
+    assert f"recomputed for {1 if for_one_tweet else 0} tweets" in result.stdout
+
+
+def test_rebuild_timelines(
+    cli_runner: CliRunner,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: Session,
+    mocker: MockerFixture,
+):
+    """Проверка перестроения домашних лент."""
+    mocker.patch("tweetty.settings.HOME_TIMELINE_MAX_LENGTH", 2)
+
+    db_session.add(db_models.Follower(user_id=followed_user.id, follower_id=test_user.id))
+    tweets_list = [db_models.Tweet(content=f"test{i}", user_id=followed_user.id) for i in range(3)]
+    db_session.add_all(tweets_list)
+    db_session.commit()
+
+    result = cli_runner.invoke(timelines.timelines_app, ["rebuild"])
+    assert result.exit_code == 0
+
+    for user in (test_user, followed_user):
+        timeline = db_session.query(db_models.HomeTimeline.tweet_id).where(db_models.HomeTimeline.user_id == user.id)
+        assert {row.tweet_id for row in timeline} == {tweet.id for tweet in tweets_list[-2:]}
+
+
+def test_follow_crossing_fanout_threshold(
+    cli_runner: CliRunner,
+    test_user: db_models.User,
+    followed_user: db_models.User,
+    db_session: Session,
+    mocker: MockerFixture,
+):
+    """Проверка того, что подписка, переводящая автора в раскладку при чтении, не заполняет ленту подписчика."""
+    mocker.patch("tweetty.settings.FEED_ENGINE", "timeline")
+    mocker.patch("tweetty.settings.HOME_TIMELINE_FANOUT_MAX_FOLLOWERS", 0)
+
+    db_session.add(db_models.Tweet(content="test", user_id=followed_user.id))
+    db_session.commit()
+
+    result = cli_runner.invoke(users.users_app, ["follow", followed_user.nickname, test_user.nickname])
+    assert result.exit_code == 0
+
+    db_session.refresh(followed_user)
+    assert followed_user.fanout_on_read
+    timeline = db_session.query(db_models.HomeTimeline).where(db_models.HomeTimeline.user_id == test_user.id)
+    assert timeline.count() == 0
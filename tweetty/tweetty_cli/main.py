@@ -4,7 +4,7 @@ from typing import Annotated
 
 import typer
 
-from . import users
+from . import timelines, tweets, users
 
 __version__ = "0.1.1"
 __author__ = "Владимир Салтыков"
@@ -13,6 +13,8 @@ __license__ = "MIT"
 
 app = typer.Typer(invoke_without_command=True, no_args_is_help=True)
 app.add_typer(users.users_app, name="users")
+app.add_typer(tweets.tweets_app, name="tweets")
+app.add_typer(timelines.timelines_app, name="timelines")
 
 
 @app.callback()
@@ -0,0 +1,37 @@
+import typer
+from sqlalchemy import delete, func, select, update
+
+from ..db import models as db_models
+from ..db import timelines
+from .db import db_session
+
+timelines_app = typer.Typer(no_args_is_help=True, help="Manage home timelines")
+
+
+@timelines_app.callback()
+def main():
+    # явный callback нужен, чтобы единственная команда
+    # не становилась командой по умолчанию
+    pass
+
+
+@timelines_app.command()
+def rebuild():
+    """Rebuild home timelines of all users from followings"""
+    with db_session() as session:
+        session.execute(delete(db_models.HomeTimeline))
+        # заодно пересчитываем счетчики подписчиков, по которым
+        # решается, раскладывать ли твиты автора по лентам
+        followers_count = (
+            select(func.count(db_models.Follower.id))
+            .where(db_models.Follower.user_id == db_models.User.id)
+            .scalar_subquery()
+        )
+        session.execute(
+            update(db_models.User).values(followers_count=followers_count).execution_options(synchronize_session=False)
+        )
+        session.execute(timelines.reset_fanout_on_read_stmt().execution_options(synchronize_session=False))
+        result = session.execute(timelines.rebuild_stmt())
+        session.commit()
+
+        print(f"Home timelines rebuilt with {result.rowcount} tweets")  # type: ignore[attr-defined]
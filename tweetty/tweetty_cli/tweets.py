@@ -0,0 +1,73 @@
+from typing import Annotated, Optional
+
+import typer
+from sqlalchemy import func, select
+
+from ..db import events
+from ..db import models as db_models
+from ..db.counters import compact_like_counters_stmt
+from ..db.ranking import rescore_stmt
+from .db import db_session
+
+tweets_app = typer.Typer(no_args_is_help=True, help="Manage tweets")
+
+
+@tweets_app.command(name="recount_likes")
+def recount_likes(
+    tweet_id: Annotated[Optional[int], typer.Option("-t", "--tweet-id", help="Tweet id")] = None,
+):
+    """Recount likes of tweets"""
+    with db_session() as session:
+        like_count = (
+            select(func.count(db_models.Like.id)).where(db_models.Like.tweet_id == db_models.Tweet.id).scalar_subquery()
+        )
+
+        query = session.query(db_models.Tweet)
+        shards_query = session.query(db_models.LikeCounterShard)
+        if tweet_id is not None:
+            query = query.where(db_models.Tweet.id == tweet_id)
+            shards_query = shards_query.where(db_models.LikeCounterShard.tweet_id == tweet_id)
+        # несвернутые шарды уже учтены в пересчитанном значении
+        shards_query.delete(synchronize_session=False)
+        updated = query.update(
+            {db_models.Tweet.like_count: like_count, db_models.Tweet.likes_changed_at: func.now()},
+            synchronize_session=False,
+        )
+        session.commit()
+
+        print(f"Likes recounted for {updated} tweets")
+
+
+@tweets_app.command(name="compact_likes")
+def compact_likes():
+    """Compact sharded like counters into tweets"""
+    with db_session() as session:
+        author_ids = session.execute(compact_like_counters_stmt()).scalars().all()
+        if author_ids:
+            session.execute(
+                events.publish(
+                    session, *[events.Event(events.LIKES_CHANGED, author_id) for author_id in set(author_ids)]
+                )
+            )
+        session.commit()
+
+        print(f"Like counters compacted for {len(author_ids)} tweets")
+
+
+@tweets_app.command(name="rescore")
+def rescore(
+    tweet_id: Annotated[Optional[int], typer.Option("-t", "--tweet-id", help="Tweet id")] = None,
+):
+    """Recompute ranking scores of tweets"""
+    with db_session() as session:
+        whereclause = [db_models.Tweet.id == tweet_id] if tweet_id is not None else []
+        author_ids = session.execute(rescore_stmt(*whereclause)).scalars().all()
+        if author_ids:
+            session.execute(
+                events.publish(
+                    session, *[events.Event(events.LIKES_CHANGED, author_id) for author_id in set(author_ids)]
+                )
+            )
+        session.commit()
+
+        print(f"Scores recomputed for {len(author_ids)} tweets")
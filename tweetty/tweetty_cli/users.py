@@ -2,12 +2,14 @@ import secrets
 from typing import Annotated, Optional
 
 import typer
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
 
 from tweetty.settings import API_KEY_PREFIX, TOKEN_NBYTES
 
+from ..db import events
 from ..db import models as db_models
+from ..db import timelines
 from .db import db_session
 
 users_app = typer.Typer(no_args_is_help=True, help="Manage users")
@@ -68,6 +70,49 @@ def remove(
 ):
     """Remove user"""
     with db_session() as session:
+        # лайки пользователя удалятся каскадно, поэтому заранее
+        # уменьшаем счетчики лайков у лайкнутых им твитов
+        liked_tweet_ids = (
+            select(db_models.Like.tweet_id)
+            .join(db_models.User, db_models.User.id == db_models.Like.user_id)
+            .where(db_models.User.nickname == nickname)
+        )
+        liked_author_ids = session.scalars(
+            select(db_models.Tweet.user_id).where(db_models.Tweet.id.in_(liked_tweet_ids)).distinct()
+        ).all()
+        (
+            session.query(db_models.Tweet)
+            .where(db_models.Tweet.id.in_(liked_tweet_ids))
+            .update(
+                {
+                    db_models.Tweet.like_count: db_models.Tweet.like_count - 1,
+                    db_models.Tweet.likes_changed_at: func.now(),
+                },
+                synchronize_session=False,
+            )
+        )
+        # подписки пользователя тоже удалятся каскадно
+        followed_user_ids = (
+            select(db_models.Follower.user_id)
+            .join(db_models.User, db_models.User.id == db_models.Follower.follower_id)
+            .where(db_models.User.nickname == nickname)
+        )
+        (
+            session.query(db_models.User)
+            .where(db_models.User.id.in_(followed_user_ids))
+            .update({db_models.User.followers_count: db_models.User.followers_count - 1}, synchronize_session=False)
+        )
+        user_id = session.scalar(select(db_models.User.id).where(db_models.User.nickname == nickname))
+        if user_id is not None:
+            # твиты пользователя пропадут из лент его подписчиков,
+            # а у лайкнутых им твитов изменятся лайки
+            session.execute(
+                events.publish(
+                    session,
+                    events.Event(events.TWEETS_CHANGED, user_id),
+                    *[events.Event(events.LIKES_CHANGED, author_id) for author_id in liked_author_ids],
+                )
+            )
         (session.query(db_models.User).where(db_models.User.nickname == nickname).delete())
 
         session.commit()
@@ -195,6 +240,21 @@ def follow(
                 follower_id=follower.id,
             )
         )
+        # флаг читается после обновления счетчика: подписка могла перевести автора в раскладку при чтении
+        fanout_on_read = session.execute(
+            timelines.followers_count_stmt(user.id, 1).returning(db_models.User.fanout_on_read)
+        ).scalar_one()
+        if timelines.home_timeline_enabled() and not fanout_on_read:
+            session.flush()
+            session.execute(timelines.backfill_stmt(follower.id, user.id))
+            session.execute(timelines.trim_stmt([follower.id]))
+        session.execute(
+            events.publish(
+                session,
+                events.Event(events.FOLLOWINGS_CHANGED, follower.id),
+                events.Event(events.FOLLOWERS_CHANGED, user.id),
+            )
+        )
         session.commit()
 
         print(f"User {follower_nickname!r} is now follow to user {user_nickname!r}")
@@ -217,6 +277,16 @@ def unfollow(
         )
         if db_follower:
             session.delete(db_follower)
+            session.execute(timelines.followers_count_stmt(user.id, -1))
+            if timelines.home_timeline_enabled():
+                session.execute(timelines.retract_stmt(follower.id, user.id))
+            session.execute(
+                events.publish(
+                    session,
+                    events.Event(events.FOLLOWINGS_CHANGED, follower.id),
+                    events.Event(events.FOLLOWERS_CHANGED, user.id),
+                )
+            )
             session.commit()
 
         if user_nickname != follower_nickname: